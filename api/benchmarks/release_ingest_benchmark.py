@@ -0,0 +1,195 @@
+# benchmarks/release_ingest_benchmark.py
+"""
+Count the SQL statements needed to ingest one release's tracks.
+
+    python -m benchmarks.release_ingest_benchmark --tracks 30
+
+Builds a synthetic release (every recording has two tags and a credited
+artist) and ingests it twice against the configured database: once with the
+old per-track get-or-create loop, once with the set-based
+MusicBrainzService.create_tracks_and_versions. Each run happens in its own
+transaction and is rolled back. The second run creates its tags and artists
+through the entity cache, which commits them; they are deleted afterwards.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlmodel import delete, select
+
+from dependencies.database import async_session, engine
+from dependencies.musicbrainz_api import musicbrainz_api
+from models.sqlmodels import (
+    Album,
+    AlbumArtistBridge,
+    AlbumRelease,
+    Artist,
+    Tag,
+    Track,
+    TrackAlbumBridge,
+    TrackArtistBridge,
+    TrackVersion,
+    TrackVersionAlbumReleaseBridge,
+    TrackVersionExtraArtist,
+    TrackVersionTagBridge,
+)
+from services.entity_cache import entity_cache
+from services.musicbrainz_service import MusicBrainzService
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def synthetic_release(run: str, n_tracks: int) -> tuple[list[dict], list[dict]]:
+    media_tracks, recordings = [], []
+    for i in range(1, n_tracks + 1):
+        recording_id = str(uuid4())
+        media_tracks.append({
+            "title": f"Benchmark Track {i}",
+            "number": str(i),
+            "length": 180_000 + i,
+            "recording": {"id": recording_id},
+        })
+        recordings.append({
+            "recording_id": recording_id,
+            "title": f"Benchmark Track {i}",
+            "length": 180_000 + i,
+            "tags": [{"name": f"bench-{run}-{i % 5}", "count": 1}, {"name": f"bench-{run}", "count": 2}],
+            "artist_credits": [{
+                "name": f"Guest {i % 3}",
+                "artist_id": f"bench-{run}-guest-{i % 3}",
+                "artist_name": f"Guest {i % 3}",
+            }],
+        })
+    return media_tracks, recordings
+
+
+async def legacy_create_tracks_and_versions(service: MusicBrainzService, album, album_release, media_tracks, recordings_data):
+    """The per-track loop create_tracks_and_versions used before it went set-based."""
+    db = service.db
+    recordings_by_id = {r["recording_id"]: r for r in recordings_data}
+    for track_data in media_tracks:
+        title, length, track_number = track_data["title"], track_data.get("length"), track_data.get("number")
+        recording_id = track_data["recording"]["id"]
+        details = recordings_by_id.get(recording_id, {})
+
+        result = await db.execute(
+            select(Track).join(TrackAlbumBridge, Track.track_uuid == TrackAlbumBridge.track_uuid)
+            .where(Track.name == title, Track.duration == length, TrackAlbumBridge.album_uuid == album.album_uuid)
+        )
+        track = result.scalars().first()
+        if not track:
+            track = Track(name=title, duration=length)
+            db.add(track)
+            await db.flush()
+        result = await db.execute(select(TrackAlbumBridge).where(
+            TrackAlbumBridge.track_uuid == track.track_uuid, TrackAlbumBridge.album_uuid == album.album_uuid))
+        if not result.scalar_one_or_none():
+            db.add(TrackAlbumBridge(track_uuid=track.track_uuid, album_uuid=album.album_uuid, track_number=track_number))
+
+        result = await db.execute(select(TrackVersion).where(TrackVersion.recording_id == recording_id))
+        version = result.scalar_one_or_none()
+        if not version:
+            version = TrackVersion(recording_id=recording_id, track_uuid=track.track_uuid, duration=length, quality="normal")
+            db.add(version)
+            await db.flush()
+        result = await db.execute(select(TrackVersionAlbumReleaseBridge).where(
+            TrackVersionAlbumReleaseBridge.track_version_uuid == version.track_version_uuid,
+            TrackVersionAlbumReleaseBridge.album_release_uuid == album_release.album_release_uuid))
+        if not result.scalar_one_or_none():
+            db.add(TrackVersionAlbumReleaseBridge(
+                track_version_uuid=version.track_version_uuid,
+                album_release_uuid=album_release.album_release_uuid,
+                track_number=track_number))
+
+        result = await db.execute(
+            select(Artist).join(AlbumArtistBridge).where(AlbumArtistBridge.album_uuid == album.album_uuid))
+        for artist in result.scalars().all():
+            result = await db.execute(select(TrackArtistBridge).where(
+                TrackArtistBridge.track_uuid == track.track_uuid, TrackArtistBridge.artist_uuid == artist.artist_uuid))
+            if not result.scalar_one_or_none():
+                db.add(TrackArtistBridge(track_uuid=track.track_uuid, artist_uuid=artist.artist_uuid))
+
+        for credit in details.get("artist_credits", []):
+            result = await db.execute(select(Artist).where(Artist.musicbrainz_artist_id == credit["artist_id"]))
+            artist = result.scalar_one_or_none()
+            if not artist:
+                artist = Artist(name=credit["artist_name"], musicbrainz_artist_id=credit["artist_id"])
+                db.add(artist)
+                await db.flush()
+            result = await db.execute(select(TrackVersionExtraArtist).where(
+                TrackVersionExtraArtist.track_version_uuid == version.track_version_uuid,
+                TrackVersionExtraArtist.artist_uuid == artist.artist_uuid))
+            if not result.scalar_one_or_none():
+                db.add(TrackVersionExtraArtist(track_version_uuid=version.track_version_uuid, artist_uuid=artist.artist_uuid))
+
+        for tag in details.get("tags", []):
+            result = await db.execute(select(Tag).where(Tag.name == tag["name"]))
+            tag_obj = result.scalar_one_or_none()
+            if not tag_obj:
+                tag_obj = Tag(name=tag["name"])
+                db.add(tag_obj)
+                await db.flush()
+            result = await db.execute(select(TrackVersionTagBridge).where(
+                TrackVersionTagBridge.track_version_uuid == version.track_version_uuid,
+                TrackVersionTagBridge.tag_uuid == tag_obj.tag_uuid))
+            if not result.scalar_one_or_none():
+                db.add(TrackVersionTagBridge(
+                    track_version_uuid=version.track_version_uuid, tag_uuid=tag_obj.tag_uuid, count=tag.get("count", 0)))
+    await db.flush()
+
+
+async def run(label: str, ingest, n_tracks: int):
+    run_id = uuid4().hex[:8]
+    media_tracks, recordings = synthetic_release(run_id, n_tracks)
+    counter = StatementCounter()
+    async with async_session() as db:
+        album = Album(title="Benchmark Album")
+        album_artist = Artist(name="Benchmark Artist")
+        db.add_all([album, album_artist])
+        await db.flush()
+        db.add(AlbumArtistBridge(album_uuid=album.album_uuid, artist_uuid=album_artist.artist_uuid))
+        album_release = AlbumRelease(album_uuid=album.album_uuid, title="Benchmark Album")
+        db.add(album_release)
+        await db.flush()
+
+        service = MusicBrainzService(db, musicbrainz_api)
+        event.listen(engine.sync_engine, "before_cursor_execute", counter)
+        start = time.perf_counter()
+        try:
+            await ingest(service, album, album_release, media_tracks, recordings)
+            await db.flush()
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", counter)
+        elapsed = time.perf_counter() - start
+        await db.rollback()
+
+        await db.execute(delete(Tag).where(Tag.name.startswith(f"bench {run_id}")))
+        await db.execute(delete(Artist).where(Artist.musicbrainz_artist_id.startswith(f"bench-{run_id}-")))
+        await db.commit()
+
+    print(f"{label:<10} tracks={n_tracks} statements={counter.count} "
+          f"({counter.count / n_tracks:.1f}/track) time={elapsed * 1000:.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=30)
+    args = parser.parse_args()
+
+    await entity_cache.preload()  # steady state: the API and the worker preload tags and genres at startup
+    await run("before", legacy_create_tracks_and_versions, args.tracks)
+    await run("after", lambda s, *a: s.create_tracks_and_versions(*a), args.tracks)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+# benchmarks/scan_benchmark.py
+"""
+Compare the scan tag reader against plain mutagen on a real library.
+
+    python -m benchmarks.scan_benchmark /path/to/music --limit 2000
+
+Reports CPU time and bytes read (from /proc/self/io) per file. Run it twice
+and look at the second run if you want warm page-cache numbers.
+"""
+
+import argparse
+import os
+import time
+
+from mutagen import File as MutagenFile
+
+from services.tag_reader import read_tags
+
+AUDIO_EXTENSIONS = (".flac", ".mp3", ".ogg", ".m4a")
+
+
+def _bytes_read() -> int | None:
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def collect_files(music_dir: str, limit: int) -> list[str]:
+    files = []
+    for root, _, names in os.walk(music_dir):
+        for name in sorted(names):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                files.append(os.path.join(root, name))
+                if len(files) >= limit:
+                    return files
+    return files
+
+
+def run(label: str, reader, files: list[str]):
+    cpu_start, wall_start, io_start = time.process_time(), time.perf_counter(), _bytes_read()
+    tagged = 0
+    for path in files:
+        try:
+            meta = reader(path)
+        except Exception:
+            continue
+        if meta and meta.tags:
+            tagged += 1
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    io_end = _bytes_read()
+
+    n = max(len(files), 1)
+    line = (
+        f"{label:<10} files={len(files)} tagged={tagged} "
+        f"cpu={cpu * 1000 / n:.3f} ms/file wall={wall * 1000 / n:.3f} ms/file"
+    )
+    if io_start is not None and io_end is not None:
+        line += f" read={(io_end - io_start) / n / 1024:.1f} KiB/file"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("music_dir")
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    files = collect_files(args.music_dir, args.limit)
+    run("mutagen", MutagenFile, files)
+    run("fast", read_tags, files)
+
+
+if __name__ == "__main__":
+    main()
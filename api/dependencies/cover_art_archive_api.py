@@ -5,8 +5,7 @@ from functools import lru_cache
 from typing import Optional
 from config import settings
 import logging
-from config import settings
-import logging
+from dependencies.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -30,27 +29,51 @@ class CoverArtArchiveAPI:
         return self.session
 
     async def get_by_release_group(self, release_group_id: str) -> Optional[dict]:
-        return await self._fetch(f"/release-group/{release_group_id}")
+        _, data = await self._fetch(f"/release-group/{release_group_id}")
+        return data
 
     async def get_by_release(self, release_id: str) -> Optional[dict]:
+        _, data = await self._fetch(f"/release/{release_id}")
+        return data
+
+    async def lookup_release_group(self, release_group_id: str) -> tuple[Optional[int], Optional[dict]]:
+        """(status, body); status is None when the request itself failed."""
+        return await self._fetch(f"/release-group/{release_group_id}")
+
+    async def lookup_release(self, release_id: str) -> tuple[Optional[int], Optional[dict]]:
+        """(status, body); status is None when the request itself failed."""
         return await self._fetch(f"/release/{release_id}")
 
-    async def _fetch(self, endpoint: str) -> Optional[dict]:
+    async def _fetch(self, endpoint: str) -> tuple[Optional[int], Optional[dict]]:
+        cached = await response_cache.lookup("coverartarchive", endpoint)
+        if cached and cached.fresh:
+            return cached.status, cached.body if cached.status == 200 else None
+
         url = f"{BASE_URL}{endpoint}"
+        headers = cached.conditional_headers() if cached else None
         try:
             session = await self._get_session()
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    return await resp.json()
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 304 and cached:
+                    await response_cache.revalidated(cached)
+                    return cached.status, cached.body if cached.status == 200 else None
+                elif resp.status == 200:
+                    data = await resp.json()
+                    await response_cache.store(
+                        "coverartarchive", endpoint, None, data,
+                        etag=resp.headers.get("ETag"), last_modified=resp.headers.get("Last-Modified"),
+                    )
+                    return 200, data
                 elif resp.status == 404:
                     logger.info(f"🎨 No cover art found for {endpoint}")
-                    return None
+                    await response_cache.store("coverartarchive", endpoint, None, None, status=404)
+                    return 404, None
                 else:
                     logger.warning(f"⚠️ Unexpected response {resp.status} from {url}")
-                    return None
+                    return resp.status, None
         except Exception as e:
             logger.exception(f"❌ Failed to fetch from Cover Art Archive: {e}")
-            return None
+            return None, None
 
     async def close(self):
         if self.session and not self.session.closed:
@@ -6,11 +6,12 @@ Includes:
     - Async engine
     - Async sessionmaker
     - Dependency injection with yield
+    - Chunked unit of work for long-running jobs
 """
 
 import ssl
 import urllib.parse
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
 from config import settings
 from sqlalchemy import Engine
 from sqlmodel import SQLModel, create_engine
@@ -76,6 +77,56 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
                 await session.rollback()
             await session.close()
 
+class ChunkedSession:
+    """Unit of work that swaps in a fresh session every `chunk_size` steps.
+
+    Long-running jobs (library scans, collection imports) otherwise keep one
+    session whose identity map grows with every object ever loaded. Callers
+    commit their own work, call `step()` after each unit (a directory, a
+    release) and only carry small id caches across chunks.
+
+    Args:
+        chunk_size (int): Number of steps served by one session.
+        on_session (Callable): Called with every new session, including the
+            first, so services can rebind their `db` attribute.
+
+    """
+
+    def __init__(self, chunk_size: int = 50, on_session: Optional[Callable[[AsyncSession], None]] = None):
+        self.chunk_size = chunk_size
+        self.on_session = on_session
+        self.session: Optional[AsyncSession] = None
+        self.steps = 0
+        self.sessions_opened = 0
+
+    async def _open(self):
+        self.session = async_session()
+        self.sessions_opened += 1
+        if self.on_session:
+            self.on_session(self.session)
+
+    async def _close(self):
+        if self.session is None:
+            return
+        if self.session.in_transaction():
+            await self.session.rollback()
+        await self.session.close()
+        self.session = None
+
+    async def __aenter__(self) -> "ChunkedSession":
+        await self._open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._close()
+
+    async def step(self):
+        """Mark one unit of work as done; rotate the session when the chunk is full."""
+        self.steps += 1
+        if self.steps % self.chunk_size == 0:
+            await self._close()
+            await self._open()
+
 # Optional utility for SQLModel performance
 def set_inherit_cache():
     """Enable query caching for SQLModel to avoid performance warnings."""
@@ -1,309 +1,359 @@
-import time
-import requests
-from pydantic_core.core_schema import none_schema
+# dependencies/discogs_api.py
+
+import asyncio
+import httpx
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import parse_qsl
+from oauthlib.oauth1 import Client as OAuth1Client, SIGNATURE_PLAINTEXT
 
 from config import settings
-from requests_oauthlib import OAuth1Session
 import logging
-from typing import Optional, List
+from typing import Optional
+from dependencies.rate_limiter import LANE_INTERACTIVE, HeaderQuota, TokenBucketLimiter
+from dependencies.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://api.discogs.com"
+REQUEST_TOKEN_URL = f"{BASE_URL}/oauth/request_token"
+ACCESS_TOKEN_URL = f"{BASE_URL}/oauth/access_token"
+
+# Discogs allows 60 authenticated requests per minute per client IP, in a moving window
+DISCOGS_WINDOW = 60.0
+DISCOGS_RATE = float(settings.get("DISCOGS_RATE", 1.0))
+RATE_LIMITED_PAUSE = 10.0  # after a 429 without Retry-After
+COLLECTION_PAGE_SIZE = 100  # the most Discogs serves per page
+COLLECTION_PAGE_CONCURRENCY = int(settings.get("DISCOGS_PAGE_CONCURRENCY", 4))
+
+discogs_limiter = TokenBucketLimiter(
+    "discogs",
+    rate=DISCOGS_RATE,
+    capacity=int(settings.get("DISCOGS_BURST", 5)),
+)
+# what Discogs reports back on every response; paces all processes on the same IP
+discogs_quota = HeaderQuota("discogs", window=DISCOGS_WINDOW, reserve=int(settings.get("DISCOGS_RESERVE", 5)))
+
+
+@lru_cache(maxsize=256)
+def _signer(token: str, secret: str) -> OAuth1Client:
+    """HMAC-SHA1 signer for one user's access token."""
+    return OAuth1Client(
+        settings.DISCOGS_CONSUMER_KEY,
+        client_secret=settings.DISCOGS_SECRET_KEY,
+        resource_owner_key=token,
+        resource_owner_secret=secret,
+    )
+
+
+def collection_watermark(releases: list[dict], pending: set[int]) -> Optional[datetime]:
+    """
+    Where the next incremental sync of a collection listing may start: when
+    the oldest release still `pending` (failed or unmatched) was added, so it
+    is listed and tried again, or the newest release when everything made it
+    in. None when the listing can't tell, e.g. a CSV import without dates.
+    """
+    added = {}
+    for r in releases:
+        if r.get("date_added"):
+            added[r["discogs_release_id"]] = datetime.fromisoformat(r["date_added"])
+        elif r["discogs_release_id"] in pending:
+            return None
+    if not added:
+        return None
+    retry = [added[release_id] for release_id in pending if release_id in added]
+    return min(retry) if retry else max(added.values())
+
+
 class DiscogsAPI:
-    _instance = None
-
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance.rate_limit_max = 50  # Max requests per minute
-            cls._instance.rate_limit_window = 15  # seconds
-            cls._instance.requests_made = 0
-            cls._instance.last_request_time = []
-            cls._instance.base_url = "https://api.discogs.com"
-        return cls._instance
-
-    def _rate_limit(self, remaining_calls: int):
-        """Rate limit handler that pauses requests based on remaining calls."""
-        if remaining_calls <= 10:
-            logger.debug("Rate limit hit, sleeping for 60 seconds")
-            time.sleep(self.rate_limit_window)  # Sleep for the rate limit window time
-
-    def get_collection(self, token: str, secret: str) -> list[dict]:
-        """Fetch the full user's collection from Discogs using OAuth1, paginated and rate-limited."""
-        identity = self.get_oauth_identity(token, secret)
-        if not identity:
-            raise Exception("Failed to get user identity")
+    """
+    Async Discogs client. All instances share one connection pool; requests are
+    signed per user and paced by `discogs_limiter`, whose rate follows the
+    X-Discogs-Ratelimit headers, so an import never stalls the event loop and
+    never spends the quota interactive requests need.
+    """
+    HEADERS = {"User-Agent": "VinylScrobbler/1.0"}
+    _client: Optional[httpx.AsyncClient] = None
+
+    def __init__(self, max_retries: int = 3, lane: str = LANE_INTERACTIVE):
+        """`lane`: LANE_INTERACTIVE for user-facing calls, LANE_BULK for imports."""
+        self.max_retries = max_retries
+        self.lane = lane
+        self.limiter = discogs_limiter
+        self.quota = discogs_quota
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if DiscogsAPI._client is None:
+            DiscogsAPI._client = httpx.AsyncClient(
+                headers=self.HEADERS,
+                timeout=20.0,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return DiscogsAPI._client
+
+    @classmethod
+    async def close(cls):
+        """Close the shared connection pool (app and worker shutdown)."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    async def _pace(self):
+        wait, limit = await self.quota.pace()
+        if limit:
+            self.limiter.rate = min(DISCOGS_RATE, limit / DISCOGS_WINDOW)
+        if wait > 0:
+            logger.debug(f"Discogs quota low, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        await self.limiter.acquire(self.lane)
+
+    async def _observe(self, resp: httpx.Response):
+        limit = resp.headers.get("x-discogs-ratelimit")
+        remaining = resp.headers.get("x-discogs-ratelimit-remaining")
+        used = resp.headers.get("x-discogs-ratelimit-used")
+        if remaining is None and limit is not None and used is not None:
+            remaining = int(limit) - int(used)
+        await self.quota.observe(
+            int(limit) if limit is not None else None,
+            int(remaining) if remaining is not None else None,
+        )
 
-        username = identity['username']
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
+    async def _send(self, method: str, url: str, signer: OAuth1Client) -> httpx.Response:
+        """Signed request with pacing; retries 429 and 5xx, raises httpx.HTTPError otherwise."""
+        for attempt in range(self.max_retries):
+            await self._pace()
+            uri, headers, _ = signer.sign(url, http_method=method)
+            resp = await self._get_client().request(method, uri, headers=headers)
+            await self._observe(resp)
+
+            if resp.status_code == 429 and attempt < self.max_retries - 1:
+                pause = float(resp.headers.get("retry-after") or RATE_LIMITED_PAUSE)
+                logger.warning(f"429 from Discogs, pausing all workers for {pause}s: {url}")
+                await self.quota.cool_down(pause)
+                continue
+            if resp.status_code >= 500 and attempt < self.max_retries - 1:
+                backoff = 2 ** attempt
+                logger.warning(f"{resp.status_code} from Discogs, retry {attempt+1}/{self.max_retries} in {backoff}s: {url}")
+                await asyncio.sleep(backoff)
+                continue
+            resp.raise_for_status()
+            return resp
+
+    async def _get(self, path: str, token: str, secret: str, params: Optional[dict] = None, cache: bool = False) -> dict:
+        """`cache`: public catalogue data (releases, masters) goes through the response cache."""
+        if cache:
+            cached = await response_cache.lookup("discogs", path, params)
+            if cached and cached.fresh:
+                return cached.body
+
+        url = str(httpx.URL(f"{BASE_URL}{path}", params=params))
+        resp = await self._send("GET", url, _signer(token, secret))
+        data = resp.json()
+        if cache:
+            await response_cache.store("discogs", path, params, data)
+        return data
+
+    async def request_token(self) -> tuple[str, str]:
+        """Step 1 of the OAuth flow: (oauth_token, oauth_token_secret) for the authorize redirect."""
+        signer = OAuth1Client(
+            settings.DISCOGS_CONSUMER_KEY,
             client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
+            callback_uri=settings.DISCOGS_CALLBACK_URL,
+            signature_method=SIGNATURE_PLAINTEXT,
         )
+        resp = await self._send("GET", REQUEST_TOKEN_URL, signer)
+        content = dict(parse_qsl(resp.text))
+        return content["oauth_token"], content["oauth_token_secret"]
+
+    async def access_token(self, oauth_token: str, token_secret: str, verifier: str) -> tuple[str, str]:
+        """Step 3 of the OAuth flow: exchange the authorized request token for an access token."""
+        signer = OAuth1Client(
+            settings.DISCOGS_CONSUMER_KEY,
+            client_secret=settings.DISCOGS_SECRET_KEY,
+            resource_owner_key=oauth_token,
+            resource_owner_secret=token_secret,
+            verifier=verifier,
+            signature_method=SIGNATURE_PLAINTEXT,
+        )
+        resp = await self._send("POST", ACCESS_TOKEN_URL, signer)
+        content = dict(parse_qsl(resp.text))
+        return content["oauth_token"], content["oauth_token_secret"]
+
+    async def get_collection(
+            self, token: str, secret: str, added_since: Optional[datetime] = None,
+            concurrency: int = COLLECTION_PAGE_CONCURRENCY,
+    ) -> list[dict]:
+        """
+        The user's collection, most recently added first. With `added_since`
+        the sync is incremental: paging stops at the first release added
+        before it (see collection_watermark). Pages are fetched `concurrency`
+        at a time; the shared limiter keeps them within budget. A page that
+        fails raises httpx.HTTPError rather than returning a partial listing.
+        """
+        identity = await self.get_oauth_identity(token, secret)
+        if not identity:
+            raise Exception("Failed to get user identity")
 
-        all_releases = []
-        page = 1
-        while True:
-            # Request and check rate limit based on response headers
-            url = f"{self.base_url}/users/{username}/collection/folders/0/releases?page={page}&per_page=50"
+        path = f"/users/{identity['username']}/collection/folders/0/releases"
+
+        async def fetch_page(page: int) -> dict:
             try:
-                response = oauth.get(url)
-                response.raise_for_status()  # Raise for other HTTP errors
-                data = response.json()
-                headers = response.headers
-                remaining_calls = int(headers.get("x-discogs-ratelimit-remaining"))
-                # Use remaining calls from the response header to handle rate-limiting
-                self._rate_limit(remaining_calls)
-
-            except requests.exceptions.RequestException as e:
+                return await self._get(path, token, secret, {
+                    "page": page, "per_page": COLLECTION_PAGE_SIZE, "sort": "added", "sort_order": "desc",
+                })
+            except httpx.HTTPError as e:
                 logger.error(f"❌ Failed to fetch page {page} of collection: {e}")
-                break
-
-            releases = data.get("releases", [])
-            if not releases:
-                break
+                raise
 
-            all_releases.extend({"discogs_release_id": r["id"]} for r in releases)
-
-            pagination = data.get("pagination", {})
-            if page >= pagination.get("pages", 1):
-                break
-
-            page += 1
+        all_releases = []
 
-        logger.info(f"📀 Fetched {len(all_releases)} releases from Discogs collection.")
+        def take(data: dict) -> bool:
+            """Collect one page; False once paging should stop."""
+            releases = data.get("releases", [])
+            for r in releases:
+                if added_since and r.get("date_added") and datetime.fromisoformat(r["date_added"]) < added_since:
+                    return False
+                info = r.get("basic_information", {})
+                all_releases.append({
+                    "discogs_release_id": r["id"],
+                    "date_added": r.get("date_added"),
+                    "artist": (info.get("artists") or [{}])[0].get("name"),
+                    "title": info.get("title"),
+                })
+            return bool(releases)
+
+        first = await fetch_page(1)
+        pages = first.get("pagination", {}).get("pages", 1)
+        if take(first):
+            for wave_start in range(2, pages + 1, concurrency):
+                wave = range(wave_start, min(wave_start + concurrency, pages + 1))
+                results = await asyncio.gather(*(fetch_page(page) for page in wave))
+                # in page order, so a stop never leaves a gap
+                if not all(take(data) for data in results):
+                    break
+
+        logger.info(f"📀 Fetched {len(all_releases)} {'new ' if added_since else ''}releases from Discogs collection.")
         return all_releases
 
-    def get_oauth_identity(self, token: str, secret: str):
-        """Make the OAuth identity call using OAuth 1.0"""
+    async def get_oauth_identity(self, token: str, secret: str):
+        """The Discogs user behind an access token."""
         try:
-            oauth = OAuth1Session(
-                client_key=settings.DISCOGS_CONSUMER_KEY,
-                client_secret=settings.DISCOGS_SECRET_KEY,
-                resource_owner_key=token,
-                resource_owner_secret=secret,
-            )
-
-            url = f"{self.base_url}/oauth/identity"
-            response = oauth.get(url)
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(
-                    f"❌ Discogs OAuth identity call failed with status code {response.status_code}: {response.text}")
-                return None
-
-        except Exception as e:
-            logger.error(f"❌ Error during OAuth identity call: {e}")
+            return await self._get("/oauth/identity", token, secret)
+        except httpx.HTTPError as e:
+            logger.error(f"❌ Discogs OAuth identity call failed: {e}")
             return None
 
-    def get_release(self, release_id: int, token: str, secret: str) -> Optional[dict]:
+    async def get_release(self, release_id: int, token: str, secret: str) -> Optional[dict]:
         """Fetch raw release data from Discogs."""
-        url = f"{self.base_url}/releases/{release_id}"
-        headers = {
-            "User-Agent": "VinylScrobbler/1.0"
-        }
-
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
-            client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
-        )
-
         try:
-            response = oauth.get(url, headers=headers)
-            response.raise_for_status()
-
-            remaining_calls = int(response.headers.get("x-discogs-ratelimit-remaining", 50))
-            self._rate_limit(remaining_calls)
-
-            return response.json()
-
-        except requests.exceptions.RequestException as e:
+            return await self._get(f"/releases/{release_id}", token, secret, cache=True)
+        except httpx.HTTPError as e:
             logger.error(f"❌ Failed to fetch release {release_id}: {e}")
             return None
 
-    def get_full_release_details(self, release_id: int, token: str, secret: str) -> Optional[dict]:
+    async def get_full_release_details(self, release_id: int, token: str, secret: str) -> Optional[dict]:
         """Fetch full release details from Discogs and return the relevant data."""
-        url = f"{self.base_url}/releases/{release_id}"
-
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
-            client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
-        )
-
         try:
-            response = oauth.get(url, headers={"User-Agent": "VinylScrobbler/1.0"})
-            response.raise_for_status()
-
-            # Get remaining calls from the header
-            headers = response.headers
-            remaining_calls = int(headers.get("x-discogs-ratelimit-remaining"))
-
-            # Handle rate-limiting using remaining calls
-            self._rate_limit(remaining_calls)
-
-            release_data = response.json()
-
-            images =  [{"uri": image["uri"], "uri150": image["uri150"]} for image in
-                            release_data.get("images", [])]
-            image = None
-            image_thumbnail = None
-            if images:
-                if len(images) > 0:
-                    image = images[0]["uri"]
-                    image_thumbnail = images[0]["uri150"]
-            tracks = []
-            for track in release_data.get("tracklist", []):
-                # Construct track data
-                track_data = {
-                    "track_number": track.get("position"),  # Track position
-                    "title": track.get("title"),
-                    "duration": track.get("duration"),
-                    "extra_artists": [
-                        {
-                            "name": artist["name"],
-                            "role": artist.get("role", ""),
-                            "id": artist.get("id", "")
-                        }
-                        for artist in track.get("extraartists", [])
-                    ],
-                }
-                tracks.append(track_data)
-            return {
-                "discogs_release_id": release_data["id"],
-                "title": release_data.get("title"),
-                "styles": ", ".join(release_data.get("styles", [])) if release_data.get("styles") else None,
-                "country": release_data.get("country"),
-                "artists": [{"discogs_artist_id": artist["id"], "name": artist["name"]} for artist in
-                            release_data.get("artists", [])],
-                "tracklist": tracks,
-                "master_id": release_data.get("master_id"),
-                "quality": release_data.get("data_quality"),
-                "release_date": release_data.get("released"),
-                "image_url": image,
-                "thumbnail_url":image_thumbnail,
-            }
-
-        except requests.exceptions.RequestException as e:
+            release_data = await self._get(f"/releases/{release_id}", token, secret, cache=True)
+        except httpx.HTTPError as e:
             logger.info(f"❌ Failed to fetch full release details for {release_id}: {e}")
             return None
 
-    def get_artist(self, artist_id: int, token, secret) -> Optional[dict]:
-        """Fetch artist details from Discogs and return the relevant data."""
-        url = f"{self.base_url}/artists/{artist_id}"
-        headers = {
-            "User-Agent": "VinylScrobbler/1.0"
+        images = [{"uri": image["uri"], "uri150": image["uri150"]} for image in
+                  release_data.get("images", [])]
+        image = None
+        image_thumbnail = None
+        if images:
+            image = images[0]["uri"]
+            image_thumbnail = images[0]["uri150"]
+        tracks = []
+        for track in release_data.get("tracklist", []):
+            # Construct track data
+            track_data = {
+                "track_number": track.get("position"),  # Track position
+                "title": track.get("title"),
+                "duration": track.get("duration"),
+                "extra_artists": [
+                    {
+                        "name": artist["name"],
+                        "role": artist.get("role", ""),
+                        "id": artist.get("id", "")
+                    }
+                    for artist in track.get("extraartists", [])
+                ],
+            }
+            tracks.append(track_data)
+        return {
+            "discogs_release_id": release_data["id"],
+            "title": release_data.get("title"),
+            "styles": ", ".join(release_data.get("styles", [])) if release_data.get("styles") else None,
+            "country": release_data.get("country"),
+            "artists": [{"discogs_artist_id": artist["id"], "name": artist["name"]} for artist in
+                        release_data.get("artists", [])],
+            "tracklist": tracks,
+            "master_id": release_data.get("master_id"),
+            "quality": release_data.get("data_quality"),
+            "release_date": release_data.get("released"),
+            "image_url": image,
+            "thumbnail_url": image_thumbnail,
         }
 
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
-            client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
-        )
-
+    async def get_artist(self, artist_id: int, token, secret) -> Optional[dict]:
+        """Fetch artist details from Discogs and return the relevant data."""
         try:
-            response = oauth.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-
-            if "name" not in data or "profile" not in data:
-                logger.warning(f"⚠️ Incomplete artist data for {artist_id}: {data}")
-
-            return {
-                "discogs_artist_id": data.get("id"),
-                "name": data.get("name"),  # Safe now
-                "namevariations": data.get("namevariations", []),
-                "profile": data.get("profile"),  # Safe now
-                "quality": data.get("data_quality"),
-            }
-
-        except requests.exceptions.RequestException as e:
+            data = await self._get(f"/artists/{artist_id}", token, secret)
+        except httpx.HTTPError as e:
             logger.error(f"❌ Failed to fetch artist {artist_id}: {e}")
             return None
-        except Exception as e:
-            logger.exception(f"❌ Unexpected error fetching artist {artist_id}: {e}")
-            return None
 
-    def search(self, token, secret, type:str, query:str =None, artist:str = None, release_title:str = None, track: str= None) -> Optional[dict]:
-        """Fetch artist details from Discogs and return the relevant data."""
-        url = f"{self.base_url}/database/search?type={type}"
-        headers = {
-            "User-Agent": "VinylScrobbler/1.0"
+        if "name" not in data or "profile" not in data:
+            logger.warning(f"⚠️ Incomplete artist data for {artist_id}: {data}")
+
+        return {
+            "discogs_artist_id": data.get("id"),
+            "name": data.get("name"),
+            "namevariations": data.get("namevariations", []),
+            "profile": data.get("profile"),
+            "quality": data.get("data_quality"),
         }
+
+    async def search(self, token, secret, type: str, query: str = None, artist: str = None,
+                     release_title: str = None, track: str = None) -> Optional[list]:
+        """Search the Discogs database; None when nothing matched."""
+        params = {"type": type}
         if query:
-            url += f"&query={query}"
+            params["query"] = query
         if artist:
-            url += f"&artist={artist}"
+            params["artist"] = artist
         if track:
-            url += f"&track={track}"
+            params["track"] = track
         if release_title:
-            url += f"&release_title={release_title}"
-
-        logger.debug(f"url: {url}")
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
-            client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
-        )
+            params["release_title"] = release_title
 
         try:
-            response = oauth.get(url, headers={"User-Agent": "VinylScrobbler/1.0"})
-            response.raise_for_status()
-            data = response.json()
-            logger.debug(f"data: {data}")
-            if len(data.get("results", [])) > 0:
-                return data.get("results")
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"❌ Failed to fetch data")
+            data = await self._get("/database/search", token, secret, params)
+        except httpx.HTTPError as e:
+            logger.error(f"❌ Failed to search Discogs {params}: {e}")
             return None
+        return data.get("results") or None
 
-    def get_master(self, master_id: int, token, secret) -> Optional[dict]:
+    async def get_master(self, master_id: int, token, secret) -> Optional[dict]:
         """Fetch a master release (album-level abstraction) from Discogs."""
-        url = f"{self.base_url}/masters/{master_id}"
-        headers = {
-            "User-Agent": "VinylScrobbler/1.0"
-        }
-
-        oauth = OAuth1Session(
-            client_key=settings.DISCOGS_CONSUMER_KEY,
-            client_secret=settings.DISCOGS_SECRET_KEY,
-            resource_owner_key=token,
-            resource_owner_secret=secret
-        )
-
         try:
-            response = oauth.get(url, headers={"User-Agent": "VinylScrobbler/1.0"})
-            response.raise_for_status()
-
-            # Get remaining calls from the header
-            headers = response.headers
-            remaining_calls = int(headers.get("x-discogs-ratelimit-remaining"))
-
-            # Handle rate-limiting using remaining calls
-            self._rate_limit(remaining_calls)
-
-            data = response.json()
-            return {
-                "discogs_master_id": data.get("id"),
-                "title": data.get("title"),
-                "main_release": data.get("main_release"),
-                "country": data.get("country"),
-                "styles": data.get("styles", []),
-                "year": data.get("year"),
-                "artists": [{"discogs_artist_id": a["id"], "name": a["name"]} for a in data.get("artists", [])],
-                "tracklist": [{"title": t["title"]} for t in data.get("tracklist", [])],
-                "quality": data.get("data_quality"),
-            }
-
-        except requests.RequestException as e:
+            data = await self._get(f"/masters/{master_id}", token, secret, cache=True)
+        except httpx.HTTPError as e:
             logger.error(f"❌ Failed to fetch master {master_id}: {e}")
             return None
+
+        return {
+            "discogs_master_id": data.get("id"),
+            "title": data.get("title"),
+            "main_release": data.get("main_release"),
+            "country": data.get("country"),
+            "styles": data.get("styles", []),
+            "year": data.get("year"),
+            "artists": [{"discogs_artist_id": a["id"], "name": a["name"]} for a in data.get("artists", [])],
+            "tracklist": [{"title": t["title"]} for t in data.get("tracklist", [])],
+            "quality": data.get("data_quality"),
+            "images": data.get("images", []),
+        }
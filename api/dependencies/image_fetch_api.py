@@ -0,0 +1,57 @@
+# dependencies/image_fetch_api.py
+
+import httpx
+from typing import Optional
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+
+
+class ImageFetchAPI:
+    """
+    Fetches remote album art (Cover Art Archive, Discogs). CAA answers with a
+    chain of redirects to archive.org, so redirects are followed.
+    The image proxy takes any object with an async `fetch(url)`, so tests can
+    hand it a stub instead.
+    """
+    HEADERS = {
+        "User-Agent": f"{settings.get('APPNAME')}/{settings.get('APP_VERSION')} ( soren@sorenkoelbaek.com )"
+    }
+
+    def __init__(self, timeout: float = 20.0):
+        self.timeout = timeout
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=self.HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self.client
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        """Return the image bytes, or None if the image is missing or could not be fetched."""
+        try:
+            resp = await self._get_client().get(url)
+            if resp.status_code == 404:
+                logger.info(f"🎨 Image not found: {url}")
+                return None
+            resp.raise_for_status()
+            if len(resp.content) > MAX_IMAGE_BYTES:
+                logger.warning(f"⚠️ Image too large ({len(resp.content)} bytes): {url}")
+                return None
+            return resp.content
+        except httpx.HTTPError as e:
+            logger.warning(f"⚠️ Failed to fetch image {url}: {e}")
+            return None
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
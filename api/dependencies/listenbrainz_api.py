@@ -6,6 +6,7 @@ from typing import Optional
 from config import settings
 import logging
 from datetime import datetime
+from dependencies.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +24,12 @@ class ListenBrainzAPI:
         self._last_request = 0.0
 
     async def _get(self, endpoint: str, params: Optional[dict] = None) -> dict:
+        cached = await response_cache.lookup("listenbrainz", endpoint, params)
+        if cached and cached.fresh:
+            return cached.body
+
         url = f"{self.BASE_URL}/{endpoint}/json"
+        headers = cached.conditional_headers() if cached else None
 
         for attempt in range(self.max_retries):
             # enforce 1 req/sec
@@ -33,10 +39,18 @@ class ListenBrainzAPI:
                 await asyncio.sleep(self.min_delay - since_last)
 
             try:
-                resp = await self.client.get(url, params=params)
+                resp = await self.client.get(url, params=params, headers=headers)
                 self._last_request = asyncio.get_event_loop().time()
+                if resp.status_code == 304 and cached:
+                    await response_cache.revalidated(cached)
+                    return cached.body
                 resp.raise_for_status()
-                return resp.json()
+                data = resp.json()
+                await response_cache.store(
+                    "listenbrainz", endpoint, params, data,
+                    etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"),
+                )
+                return data
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 503 and attempt < self.max_retries - 1:
@@ -6,9 +6,22 @@ from typing import Optional
 from config import settings
 import logging
 from datetime import datetime
+from dependencies.rate_limiter import LANE_INTERACTIVE, TokenBucketLimiter
+from dependencies.request_coalescer import RequestCoalescer
+from dependencies.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
+# MusicBrainz allows ~1 req/s per client IP: one bucket for every process and host
+musicbrainz_limiter = TokenBucketLimiter(
+    "musicbrainz",
+    rate=float(settings.get("MUSICBRAINZ_RATE", 1.0)),
+    capacity=int(settings.get("MUSICBRAINZ_BURST", 1)),
+)
+
+# identical concurrent lookups (same album hydrated twice, same artist MBID) share one call
+musicbrainz_coalescer = RequestCoalescer(ttl=float(settings.get("MUSICBRAINZ_MEMO_SECONDS", 300)))
+
 
 class MusicBrainzAPI:
     BASE_URL = "https://musicbrainz.org/ws/2"
@@ -16,27 +29,41 @@ class MusicBrainzAPI:
         "User-Agent": f"{settings.get('APPNAME')}/{settings.get('APP_VERSION')} ( soren@sorenkoelbaek.com )"
     }
 
-    def __init__(self, max_retries: int = 3, min_delay: float = 1.0):
+    def __init__(self, max_retries: int = 3, lane: str = LANE_INTERACTIVE):
+        """`lane`: LANE_INTERACTIVE for user-facing hydration, LANE_BULK for imports and scans."""
         self.client = httpx.AsyncClient(headers=self.HEADERS, timeout=15.0)
         self.max_retries = max_retries
-        self.min_delay = min_delay
-        self._last_request = 0.0
+        self.lane = lane
+        self.limiter = musicbrainz_limiter
+        self.coalescer = musicbrainz_coalescer
 
     async def _get(self, endpoint: str, params: Optional[dict] = None) -> dict:
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        return await self.coalescer.do(key, lambda: self._fetch(endpoint, params))
+
+    async def _fetch(self, endpoint: str, params: Optional[dict] = None) -> dict:
+        cached = await response_cache.lookup("musicbrainz", endpoint, params)
+        if cached and cached.fresh:
+            return cached.body
+
         url = f"{self.BASE_URL}/{endpoint}"
+        headers = cached.conditional_headers() if cached else None
 
         for attempt in range(self.max_retries):
-            # enforce 1 req/sec
-            now = asyncio.get_event_loop().time()
-            since_last = now - self._last_request
-            if since_last < self.min_delay:
-                await asyncio.sleep(self.min_delay - since_last)
+            await self.limiter.acquire(self.lane)
 
             try:
-                resp = await self.client.get(url, params=params)
-                self._last_request = asyncio.get_event_loop().time()
+                resp = await self.client.get(url, params=params, headers=headers)
+                if resp.status_code == 304 and cached:
+                    await response_cache.revalidated(cached)
+                    return cached.body
                 resp.raise_for_status()
-                return resp.json()
+                data = resp.json()
+                await response_cache.store(
+                    "musicbrainz", endpoint, params, data,
+                    etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"),
+                )
+                return data
 
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 503 and attempt < self.max_retries - 1:
@@ -101,7 +128,7 @@ class MusicBrainzAPI:
         return official_releases[0]["id"]
 
     async def get_first_release_id_by_artist_and_album(
-        self, artist: str, album: str, favor_album: bool = True
+        self, artist: str, album: str, favor_album: bool = True, raise_errors: bool = False
     ) -> Optional[str]:
         query = f"artistname:{artist} AND release:{album}"
         params = {"query": query, "inc": "releases", "limit": 10, "fmt": "json"}
@@ -128,6 +155,8 @@ class MusicBrainzAPI:
                 return sorted_releases[0].get("id")
         except Exception as e:
             logger.error(f"Error fetching release ID for {artist} - {album}: {e}")
+            if raise_errors:
+                raise
         return None
 
     async def search_release_group(self, artist: str, release: str, limit: int = 5) -> dict:
@@ -143,6 +172,24 @@ class MusicBrainzAPI:
             return None
         return release_groups[0]
 
+    async def browse_artist_release_groups(self, artist_mbid: str, max_pages: int = 5) -> list[dict]:
+        """All release groups of an artist with tags and genres, 100 per request."""
+        release_groups: list[dict] = []
+        for page in range(max_pages):
+            params = {
+                "artist": artist_mbid,
+                "inc": "tags+genres",
+                "limit": 100,
+                "offset": page * 100,
+                "fmt": "json",
+            }
+            data = await self._get("release-group", params)
+            batch = data.get("release-groups", [])
+            release_groups.extend(batch)
+            if not batch or len(release_groups) >= data.get("release-group-count", 0):
+                break
+        return release_groups
+
     async def get_release(self, release_id: str) -> dict:
         params = {"inc": "recordings+tags+genres", "fmt": "json"}
         return await self._get(f"release/{release_id}", params)
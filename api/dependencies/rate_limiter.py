@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Dependencies for rate limiting.
+
+Token buckets for upstream APIs with a per-client (per-IP) limit.
+Includes:
+    - Redis-backed bucket shared by every process and host using the same Redis
+    - Priority lanes: bulk callers yield while an interactive caller is waiting
+    - In-process fallback bucket when Redis is not initialized or unreachable
+    - Header-reported quotas (limit/remaining in a moving window) shared the same way
+"""
+
+import asyncio
+import logging
+import time
+
+import dependencies.redis as redis_dep
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+# KEYS[1] bucket hash, KEYS[2] interactive waiter counter
+# ARGV[1] rate (tokens/s), ARGV[2] capacity, ARGV[3] lane
+# Returns 0 when a token was taken, otherwise the milliseconds to wait before retrying.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local wait = 0
+if ARGV[3] == 'bulk' and tonumber(redis.call('GET', KEYS[2]) or '0') > 0 then
+    -- an interactive caller is queued: leave the next token to it
+    wait = math.ceil(1000 / rate)
+elseif tokens < 1 then
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+else
+    tokens = tokens - 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+WAITER_TTL_MS = 5000  # interactive waiter marks expire if a process dies while waiting
+
+
+class TokenBucketLimiter:
+    """
+    Shared token bucket. `rate` tokens per second refill a bucket of `capacity`;
+    every upstream request takes one token via `acquire(lane)`.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int = 1):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._bucket_key = f"us:ratelimit:{name}"
+        self._waiters_key = f"us:ratelimit:{name}:interactive"
+        self._script = None
+        self._script_client = None
+        # local fallback state
+        self._tokens = float(capacity)
+        self._ts = time.monotonic()
+        self._local_waiters = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, lane: str = LANE_INTERACTIVE):
+        client = redis_dep.redis_client
+        if client is not None:
+            try:
+                await self._acquire_redis(client, lane)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Redis rate limiter for {self.name} unavailable, using local bucket: {e}")
+        await self._acquire_local(lane)
+
+    async def _acquire_redis(self, client, lane: str):
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(TOKEN_BUCKET_LUA)
+            self._script_client = client
+
+        interactive = lane == LANE_INTERACTIVE
+        if interactive:
+            await client.incr(self._waiters_key)
+            await client.pexpire(self._waiters_key, WAITER_TTL_MS)
+        try:
+            while True:
+                wait_ms = int(await self._script(
+                    keys=[self._bucket_key, self._waiters_key],
+                    args=[self.rate, self.capacity, lane],
+                ))
+                if wait_ms <= 0:
+                    return
+                if interactive:
+                    await client.pexpire(self._waiters_key, WAITER_TTL_MS)
+                await asyncio.sleep(wait_ms / 1000)
+        finally:
+            if interactive:
+                await client.decr(self._waiters_key)
+
+    async def _acquire_local(self, lane: str):
+        interactive = lane == LANE_INTERACTIVE
+        if interactive:
+            self._local_waiters += 1
+        try:
+            while True:
+                async with self._lock:
+                    now = time.monotonic()
+                    self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+                    self._ts = now
+                    if interactive or self._local_waiters == 0:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return
+                        wait = (1 - self._tokens) / self.rate
+                    else:
+                        wait = 1 / self.rate
+                await asyncio.sleep(wait)
+        finally:
+            if interactive:
+                self._local_waiters -= 1
+
+
+class HeaderQuota:
+    """
+    Upstream quota as reported on every response (limit and remaining requests
+    in a moving `window` of seconds). The latest report any process got is kept
+    in Redis, so every worker slows down as soon as one of them sees the quota
+    running out, and all of them pause after a 429.
+    """
+
+    def __init__(self, name: str, window: float, reserve: int):
+        self.name = name
+        self.window = window
+        self.reserve = reserve  # requests left unspent for the other callers
+        self._key = f"us:ratelimit:{name}:quota"
+        self._local: dict[str, float] = {}
+
+    async def observe(self, limit: int | None, remaining: int | None):
+        if limit is None or remaining is None:
+            return
+        await self._write({"limit": limit, "remaining": remaining, "ts": time.time()})
+
+    async def cool_down(self, seconds: float):
+        """Nobody sends until `seconds` from now (the upstream answered 429)."""
+        await self._write({"remaining": 0, "ts": time.time(), "until": time.time() + seconds})
+
+    async def pace(self) -> tuple[float, int | None]:
+        """(seconds to wait before the next request, last reported limit)."""
+        state = await self._read()
+        now = time.time()
+        limit = int(state["limit"]) if "limit" in state else None
+        wait = max(0.0, float(state.get("until", 0)) - now)
+        if limit and "remaining" in state:
+            short = self.reserve - int(state["remaining"])
+            if short > 0:
+                # one request ages out of the window every window/limit seconds
+                wait = max(wait, short * self.window / limit - (now - float(state["ts"])))
+        return wait, limit
+
+    async def _write(self, fields: dict):
+        self._local.update(fields)
+        client = redis_dep.redis_client
+        if client is None:
+            return
+        try:
+            await client.hset(self._key, mapping=fields)
+            await client.pexpire(self._key, int(self.window * 1000))
+        except Exception as e:
+            logger.warning(f"⚠️ Redis quota for {self.name} unavailable, pacing locally: {e}")
+
+    async def _read(self) -> dict:
+        client = redis_dep.redis_client
+        if client is not None:
+            try:
+                return await client.hgetall(self._key)
+            except Exception as e:
+                logger.warning(f"⚠️ Redis quota for {self.name} unavailable, pacing locally: {e}")
+        if self._local and time.time() - float(self._local["ts"]) > self.window:
+            self._local.clear()
+        return dict(self._local)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Dependencies for request coalescing.
+
+Singleflight for upstream API calls within one process.
+Includes:
+    - Concurrent identical requests share one in-flight call
+    - Short-lived memo of successful results, bounded in size
+"""
+
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class RequestCoalescer:
+    """
+    `await coalescer.do(key, fetch)` runs `fetch()` once per key at a time;
+    concurrent callers for the same key await the same task. Successful
+    results are memoized for `ttl` seconds. Errors are not memoized.
+    Every caller gets its own copy, so callers may mutate what they receive.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._memo: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._memo.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._memo[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._run(key, fetch))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # shield: a cancelled caller must not cancel the call the others are waiting on
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _run(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            if self.ttl > 0:
+                self._memo[key] = (time.monotonic() + self.ttl, value)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._memo.clear()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""Dependencies for caching upstream API responses.
+
+Persistent response cache in Postgres (api_response_cache) shared by the
+MusicBrainz, ListenBrainz, Cover Art Archive and Discogs clients.
+Includes:
+    - TTL per source and endpoint type
+    - Negative entries for 404s (missing cover art)
+    - Conditional revalidation (ETag / Last-Modified) of expired entries
+    - Hit-rate counters per source
+    - Purging of entries expired for longer than PURGE_GRACE
+"""
+
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from config import settings
+from dependencies.database import async_session
+from models.sqlmodels import ApiResponseCache
+
+logger = logging.getLogger(__name__)
+
+# (source, endpoint prefix) -> ttl; first match wins, "" matches everything
+TTLS: list[tuple[str, str, timedelta]] = [
+    ("musicbrainz", "release/", timedelta(days=30)),
+    ("musicbrainz", "artist/", timedelta(days=14)),
+    ("musicbrainz", "", timedelta(days=7)),  # searches: new releases show up
+    ("listenbrainz", "similar-artists", timedelta(days=7)),
+    ("coverartarchive", "", timedelta(days=30)),
+    ("discogs", "/masters/", timedelta(days=30)),
+    ("discogs", "/releases/", timedelta(days=30)),
+]
+DEFAULT_TTL = timedelta(days=1)
+NEGATIVE_TTL = timedelta(days=7)
+# expired entries are kept this long for conditional revalidation, then purged
+PURGE_GRACE = timedelta(days=30)
+PURGE_BATCH = 10_000  # rows per DELETE, keeps each transaction short
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def ttl_for(source: str, endpoint: str, status: int = 200) -> timedelta:
+    if status == 404:
+        return NEGATIVE_TTL
+    for ttl_source, prefix, ttl in TTLS:
+        if ttl_source == source and endpoint.startswith(prefix):
+            return ttl
+    return DEFAULT_TTL
+
+
+def cache_key(source: str, endpoint: str, params: Optional[dict] = None) -> str:
+    raw = f"{source}:{endpoint}?{urlencode(sorted((params or {}).items()))}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    key: str
+    source: str
+    endpoint: str
+    status: int
+    body: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: datetime
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > _now()
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    revalidated: int = 0
+    stores: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.stale
+        return (self.hits + self.revalidated) / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """
+    Look up before calling upstream, store after. Cache failures never
+    break a request: they are logged, counted and treated as a miss.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stats: dict[str, CacheStats] = {}
+
+    def _stats(self, source: str) -> CacheStats:
+        return self.stats.setdefault(source, CacheStats())
+
+    async def lookup(self, source: str, endpoint: str, params: Optional[dict] = None) -> Optional[CachedResponse]:
+        """The cached entry (fresh or expired), None on a miss."""
+        if not self.enabled:
+            return None
+        stats = self._stats(source)
+        key = cache_key(source, endpoint, params)
+        try:
+            async with async_session() as db:
+                result = await db.execute(select(ApiResponseCache).where(ApiResponseCache.cache_key == key))
+                row = result.scalar_one_or_none()
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ Response cache lookup failed for {source}/{endpoint}: {e}")
+            return None
+
+        if row is None:
+            stats.misses += 1
+            return None
+        entry = CachedResponse(
+            key=key, source=source, endpoint=endpoint, status=row.status, body=row.body,
+            etag=row.etag, last_modified=row.last_modified, expires_at=row.expires_at,
+        )
+        if entry.fresh:
+            stats.hits += 1
+        else:
+            stats.stale += 1
+        return entry
+
+    async def store(
+            self,
+            source: str,
+            endpoint: str,
+            params: Optional[dict],
+            body: Any,
+            status: int = 200,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+    ):
+        if not self.enabled:
+            return
+        stats = self._stats(source)
+        now = _now()
+        values = {
+            "cache_key": cache_key(source, endpoint, params),
+            "source": source,
+            "endpoint": endpoint,
+            "status": status,
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "expires_at": now + ttl_for(source, endpoint, status),
+        }
+        stmt = insert(ApiResponseCache).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={k: stmt.excluded[k] for k in values if k != "cache_key"},
+        )
+        try:
+            async with async_session() as db:
+                await db.execute(stmt)
+                await db.commit()
+            stats.stores += 1
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ Response cache store failed for {source}/{endpoint}: {e}")
+
+    async def revalidated(self, entry: CachedResponse):
+        """Upstream answered 304: extend the entry's lifetime."""
+        stats = self._stats(entry.source)
+        stats.revalidated += 1
+        now = _now()
+        try:
+            async with async_session() as db:
+                await db.execute(
+                    update(ApiResponseCache)
+                    .where(ApiResponseCache.cache_key == entry.key)
+                    .values(fetched_at=now, expires_at=now + ttl_for(entry.source, entry.endpoint, entry.status))
+                )
+                await db.commit()
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ Response cache refresh failed for {entry.source}/{entry.endpoint}: {e}")
+
+    async def purge_expired(self, grace: timedelta = PURGE_GRACE) -> int:
+        """Delete entries that expired more than `grace` ago; returns the number of rows removed."""
+        cutoff = _now() - grace
+        purged = 0
+        async with async_session() as db:
+            while True:
+                batch = (
+                    select(ApiResponseCache.cache_key)
+                    .where(ApiResponseCache.expires_at < cutoff)
+                    .limit(PURGE_BATCH)
+                )
+                result = await db.execute(
+                    delete(ApiResponseCache).where(ApiResponseCache.cache_key.in_(batch.scalar_subquery()))
+                )
+                await db.commit()
+                purged += result.rowcount
+                if result.rowcount < PURGE_BATCH:
+                    break
+        if purged:
+            logger.info(f"🧹 Purged {purged} expired API responses")
+        return purged
+
+    def report(self) -> dict:
+        return {
+            source: {**asdict(stats), "hit_rate": round(stats.hit_rate, 3)}
+            for source, stats in self.stats.items()
+        }
+
+
+# Singleton instance
+response_cache = ResponseCache(enabled=str(settings.get("API_RESPONSE_CACHE", "true")).lower() == "true")
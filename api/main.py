@@ -1,5 +1,5 @@
 from fastapi import FastAPI
-from routers import (auth_router, spotify, discogs, music, collection, healtcheck, playback_session, listen)
+from routers import (auth_router, spotify, discogs, music, collection, healtcheck, playback_session, listen, images)
 from fastapi.security import OAuth2PasswordBearer
 from routers import event
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,19 +8,35 @@ from dependencies.auth import get_current_user
 from contextlib import asynccontextmanager
 from dependencies.redis import init_redis, close_redis
 from services.redis_sse_service import redis_sse_service
+from services.library_watcher_service import library_watcher_service
+from services.artwork_service import artwork_service
+from services.image_proxy_service import image_proxy_service
+from dependencies.discogs_api import DiscogsAPI
+from services.entity_cache import entity_cache
 
 from config import settings
 import logging
 
 
+watch_library = str(settings.get("WATCH_LIBRARY", "false")).lower() == "true"
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_redis()
+    await entity_cache.preload()
     redis_sse_service.start()
+    if watch_library:
+        library_watcher_service.start()
     try:
         yield
     finally:
+        if watch_library:
+            library_watcher_service.stop()
         redis_sse_service.stop()
+        artwork_service.shutdown()
+        await image_proxy_service.close()
+        await DiscogsAPI.close()
         await close_redis()
 
 logger = logging.getLogger(__name__)
@@ -54,6 +70,7 @@ app.include_router(playback_session.router)
 app.include_router(event.router)
 app.include_router(auth_router.router)
 app.include_router(listen.router)
+app.include_router(images.router)
 
 logging.info(f"Starting with environment = {settings.current_env}")
 
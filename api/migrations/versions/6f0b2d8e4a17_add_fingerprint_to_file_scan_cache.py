@@ -0,0 +1,34 @@
+"""Add fingerprint to file_scan_cache
+
+Revision ID: 6f0b2d8e4a17
+Revises: 3e7a1c9d2b40
+Create Date: 2025-09-23 21:04:17.530912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f0b2d8e4a17'
+down_revision: Union[str, None] = '3e7a1c9d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('file_scan_cache', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_file_scan_cache_fingerprint'), ['fingerprint'], unique=False)
+
+    # Force every directory to be visited once so existing rows get their fingerprint backfilled
+    op.execute("DELETE FROM directory_scan_cache")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('file_scan_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_file_scan_cache_fingerprint'))
+        batch_op.drop_column('fingerprint')
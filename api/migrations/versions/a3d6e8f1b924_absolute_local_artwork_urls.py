@@ -0,0 +1,42 @@
+"""Store locally extracted artwork as absolute API urls
+
+Revision ID: a3d6e8f1b924
+Revises: f2b9c4d7a318
+Create Date: 2025-10-06 14:02:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d6e8f1b924'
+down_revision: Union[str, None] = 'f2b9c4d7a318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('album', 'album_release')
+COLUMNS = ('image_url', 'image_thumbnail_url')
+API_BASE_URL = settings.get("API_BASE_URL", "http://localhost:8000").rstrip("/")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        for column in COLUMNS:
+            op.execute(
+                sa.text(f"UPDATE {table} SET {column} = :base || {column} WHERE {column} LIKE '/images/art/%'")
+                .bindparams(base=API_BASE_URL)
+            )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        for column in COLUMNS:
+            op.execute(
+                sa.text(f"UPDATE {table} SET {column} = substr({column}, :start) WHERE {column} LIKE :prefix")
+                .bindparams(start=len(API_BASE_URL) + 1, prefix=f"{API_BASE_URL}/images/art/%")
+            )
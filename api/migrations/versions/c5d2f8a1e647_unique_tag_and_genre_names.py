@@ -0,0 +1,91 @@
+"""Deduplicate tags and genres, unique normalized names
+
+Revision ID: c5d2f8a1e647
+Revises: b7e1d4a9c352
+Create Date: 2025-10-03 10:18:44.502931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d2f8a1e647'
+down_revision: Union[str, None] = 'b7e1d4a9c352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same rules as services.entity_cache.normalize_tag_name
+NORMALIZED_NAME = r"""
+    btrim(replace(
+        regexp_replace(regexp_replace(lower(btrim(name)), '[.\-_]', ' ', 'g'), '\s+', ' ', 'g'),
+        '&', 'and'
+    ))
+"""
+
+# (table, uuid column, [(bridge table, owner column)])
+DIMENSIONS = [
+    ('tag', 'tag_uuid', [
+        ('album_tag_bridge', 'album_uuid'),
+        ('album_release_tag_bridge', 'album_release_uuid'),
+        ('track_version_tag_bridge', 'track_version_uuid'),
+        ('artist_tag_bridge', 'artist_uuid'),
+    ]),
+    ('genre', 'genre_uuid', [
+        ('album_genre_bridge', 'album_uuid'),
+        ('album_release_genre_bridge', 'album_release_uuid'),
+        ('track_version_genre_bridge', 'track_version_uuid'),
+    ]),
+]
+
+
+def upgrade() -> None:
+    for table, uuid_column, bridges in DIMENSIONS:
+        # oldest row per normalized name survives
+        op.execute(f"""
+            CREATE TEMP TABLE {table}_merge ON COMMIT DROP AS
+            SELECT {uuid_column} AS old_uuid,
+                   first_value({uuid_column}) OVER (
+                       PARTITION BY normalized ORDER BY created_at NULLS LAST, {uuid_column}
+                   ) AS keep_uuid,
+                   normalized
+            FROM (SELECT {uuid_column}, created_at, {NORMALIZED_NAME} AS normalized FROM {table}) t
+        """)
+
+        # move links to the survivor; links it already has keep their count
+        for bridge, owner in bridges:
+            op.execute(f"""
+                INSERT INTO {bridge} ({owner}, {uuid_column}, count)
+                SELECT b.{owner}, m.keep_uuid, b.count
+                FROM {bridge} b
+                JOIN {table}_merge m ON m.old_uuid = b.{uuid_column}
+                WHERE m.old_uuid <> m.keep_uuid
+                ON CONFLICT DO NOTHING
+            """)
+            op.execute(f"""
+                DELETE FROM {bridge} b
+                USING {table}_merge m
+                WHERE m.old_uuid = b.{uuid_column} AND m.old_uuid <> m.keep_uuid
+            """)
+
+        op.execute(f"""
+            DELETE FROM {table} t
+            USING {table}_merge m
+            WHERE m.old_uuid = t.{uuid_column} AND m.old_uuid <> m.keep_uuid
+        """)
+        op.execute(f"""
+            UPDATE {table} t
+            SET name = m.normalized
+            FROM {table}_merge m
+            WHERE m.old_uuid = t.{uuid_column} AND t.name <> m.normalized
+        """)
+
+    op.create_unique_constraint('uq_tag_name', 'tag', ['name'])
+    op.create_unique_constraint('uq_genre_name', 'genre', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_genre_name', 'genre', type_='unique')
+    op.drop_constraint('uq_tag_name', 'tag', type_='unique')
+    # ⚠️ merged duplicates are not restored
@@ -0,0 +1,28 @@
+"""Add release_groups_synced_at to artist
+
+Revision ID: d8a3b6e2f571
+Revises: c5d2f8a1e647
+Create Date: 2025-10-04 16:27:09.113406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3b6e2f571'
+down_revision: Union[str, None] = 'c5d2f8a1e647'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('artist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('release_groups_synced_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('artist', schema=None) as batch_op:
+        batch_op.drop_column('release_groups_synced_at')
@@ -0,0 +1,28 @@
+"""Add discogs_synced_through to collection
+
+Revision ID: f2b9c4d7a318
+Revises: e4f7a2c9b816
+Create Date: 2025-10-06 09:14:52.208331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b9c4d7a318'
+down_revision: Union[str, None] = 'e4f7a2c9b816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('collection', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('discogs_synced_through', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('collection', schema=None) as batch_op:
+        batch_op.drop_column('discogs_synced_through')
@@ -350,6 +350,23 @@ class CollectionSimpleRead(CollectionBase):
         from_attributes = True
 
 
+class BackgroundJobRead(BaseModel):
+    job_uuid: UUID
+    job_type: str
+    status: str
+    cursor: Optional[str] = None
+    progress: dict = {}
+    error: Optional[str] = None
+    attempts: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class PaginatedResponse(BaseModel, Generic[T]):
     total: int
     offset: int
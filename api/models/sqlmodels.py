@@ -7,7 +7,7 @@ from typing import Annotated
 from uuid import UUID, uuid4
 from datetime import datetime, date
 from sqlalchemy.dialects.postgresql import TSVECTOR
-from sqlalchemy.dialects.postgresql import UUID as PGUUID, FLOAT, INTEGER, DATE
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, FLOAT, INTEGER, DATE, JSONB
 from pgvector.sqlalchemy import Vector
 
 class RefreshToken(SQLModel, table=True):
@@ -124,6 +124,9 @@ class AlbumReleaseGenreBridge(SQLModel, table=True):
 
 class Tag(SQLModel, table=True):
     __tablename__ = "tag"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_tag_name"),
+    )
 
     tag_uuid: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
@@ -140,6 +143,9 @@ class Tag(SQLModel, table=True):
 
 class Genre(SQLModel, table=True):
     __tablename__ = "genre"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_genre_name"),
+    )
 
     genre_uuid: UUID = Field(default_factory=uuid4, primary_key=True)
     name: str
@@ -364,6 +370,10 @@ class Artist(SQLModel, table=True):
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
+    # full MusicBrainz discography stored; NULL while only shallow albums are staged
+    release_groups_synced_at: Optional[datetime] = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
 
     albums: List["Album"] = Relationship(back_populates="artists", link_model=AlbumArtistBridge)
     album_releases: Optional[List["AlbumRelease"]] = Relationship(back_populates="artists", link_model=AlbumReleaseArtistBridge)
@@ -523,6 +533,11 @@ class Collection(SQLModel, table=True):
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
+    # Discogs date_added the next incremental sync lists from; only advanced past
+    # releases that made it in, NULL until the first clean sync
+    discogs_synced_through: Optional[datetime] = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
 
 
 
@@ -556,10 +571,93 @@ class FileScanCache(SQLModel, table=True):
     path: str = Field(index=True, unique=True, nullable=False)
     size: int = Field(nullable=False)
     mtime: float = Field(nullable=False)  # store as UNIX timestamp
+    fingerprint: Optional[str] = Field(default=None, index=True)  # size + hash of first/last 64 KiB
     scanned_at:  datetime = Field(
         sa_column=Column(DateTime(timezone=True), server_default=func.now())
     )
 
+class DirectoryScanCache(SQLModel, table=True):
+    __tablename__ = "directory_scan_cache"
+
+    directory_scan_uuid: UUID = Field(default_factory=uuid4, primary_key=True)
+    path: str = Field(index=True, unique=True, nullable=False)
+    mtime: float = Field(nullable=False)  # directory mtime as UNIX timestamp
+    file_count: int = Field(nullable=False)  # audio files directly inside the directory
+    scanned_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+class ReleaseResolution(SQLModel, table=True):
+    """Persisted (artist, album) -> MusicBrainz release search result, negative results included."""
+    __tablename__ = "release_resolution"
+
+    release_resolution_uuid: UUID = Field(default_factory=uuid4, primary_key=True)
+    artist_key: str = Field(nullable=False)  # normalized artist tag
+    album_key: str = Field(nullable=False)  # normalized album tag
+    musicbrainz_release_id: Optional[str] = Field(default=None)  # None = searched, nothing found
+    resolved_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+
+    __table_args__ = (
+        UniqueConstraint("artist_key", "album_key", name="uq_release_resolution_artist_album"),
+    )
+
+class DiscogsReleaseLink(SQLModel, table=True):
+    """Discogs release -> MusicBrainz release, from the url relations in the MB release dump."""
+    __tablename__ = "discogs_release_link"
+
+    discogs_release_id: int = Field(sa_column=Column(BigInteger, primary_key=True, autoincrement=False))
+    musicbrainz_release_id: str = Field(primary_key=True)
+
+class CoverArtMiss(SQLModel, table=True):
+    """Release (group) the Cover Art Archive has no front cover for; the backfill skips it until checked_at expires."""
+    __tablename__ = "cover_art_miss"
+
+    entity_type: str = Field(primary_key=True)  # "release_group" or "release"
+    musicbrainz_id: str = Field(primary_key=True)
+    status: int = Field(default=404, nullable=False)  # 404, or 200 without a front image
+    checked_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+class BackgroundJob(SQLModel, table=True):
+    """Long-running job (library scan, imports, ...) claimed and run by scripts/job_worker.py."""
+    __tablename__ = "background_job"
+
+    job_uuid: UUID = Field(default_factory=uuid4, primary_key=True)
+    job_type: str = Field(index=True, nullable=False)  # e.g. "library_scan"
+    user_uuid: Optional[UUID] = Field(default=None, foreign_key="appuser.user_uuid", index=True)
+    status: str = Field(default="queued", index=True, nullable=False)  # queued, running, completed, failed
+    params: dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False, server_default="{}"))
+    cursor: Optional[str] = None  # job specific checkpoint, e.g. the last finished directory
+    progress: dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False, server_default="{}"))
+    error: Optional[str] = None
+    worker: Optional[str] = None  # host:pid of the worker running it
+    attempts: int = Field(default=0, nullable=False)
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    heartbeat_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+
+class ApiResponseCache(SQLModel, table=True):
+    """Cached upstream API response (MusicBrainz, ListenBrainz, Cover Art Archive), see dependencies/response_cache.py."""
+    __tablename__ = "api_response_cache"
+
+    cache_key: str = Field(primary_key=True)  # blake2b of source, endpoint and sorted params
+    source: str = Field(index=True, nullable=False)  # "musicbrainz", "listenbrainz", "coverartarchive"
+    endpoint: str = Field(nullable=False)
+    status: int = Field(default=200, nullable=False)  # 404s are cached as negative entries
+    body: Optional[dict | list] = Field(default=None, sa_column=Column(JSONB))
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), server_default=func.now())
+    )
+    expires_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False, index=True))
+
 class PlaybackQueue(SQLModel, table=True):
     __tablename__ = "playback_queue"
 
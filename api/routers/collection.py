@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.appmodels import CollectionRead, CollectionSimpleRead, PaginatedResponse, AlbumFlat
+from models.appmodels import CollectionRead, CollectionSimpleRead, PaginatedResponse, AlbumFlat, BackgroundJobRead
 from dependencies.auth import get_current_user
 from dependencies.database import get_async_session
 from models.sqlmodels import User
 from services.collection_service import CollectionService
+from services.job_service import JobService
 from sqlmodel import select
 from uuid import UUID
 from fastapi import Query
@@ -31,24 +32,29 @@ async def get_my_collections(
     return await collection_service.get_primary_collection(
         user.user_uuid, offset=offset, limit=limit, search=search)
 
-@router.post("/scan")
+@router.post("/scan", response_model=BackgroundJobRead)
 async def scan_collection_directory(
     overwrite: bool,
-    background_tasks: BackgroundTasks,
     collection_id: UUID | None = None,
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(get_current_user)
 ):
-    collection_service = CollectionService(db)
-    user_id = user.user_uuid
-
-    async def task():
-        logger.debug("Starting background scan...")
-        await collection_service.scan_directory(
-            user_uuid=user_id,
-            overwrite=overwrite
-        )
-        logger.debug("Background scan finished.")
-
-    background_tasks.add_task(task)
-    return {"status": "scan started in background"}
\ No newline at end of file
+    # picked up by the job worker (scripts/job_worker.py); returns the running scan if there is one
+    job = await JobService(db).enqueue(
+        "library_scan",
+        user_uuid=user.user_uuid,
+        params={"overwrite": overwrite},
+    )
+    return job
+
+
+@router.get("/scan/{job_uuid}", response_model=BackgroundJobRead)
+async def get_scan_job(
+    job_uuid: UUID,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user)
+):
+    job = await JobService(db).get_job(job_uuid, user_uuid=user.user_uuid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
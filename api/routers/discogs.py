@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import selectinload
 
 from services.discogs_service import DiscogsService
-from services.collection_service import CollectionService
-from fastapi import Depends, Request
+from services.job_service import JobService
+from services.discogs_enrichment_service import DISCOGS_ENRICH_CONCURRENCY
+from fastapi import Depends, Request, Query
 from dependencies.auth import get_current_user
 from dependencies.database import get_async_session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from models.sqlmodels import User
-from models.appmodels import DiscogsAuthRequest, TrackRead, AlbumRead
+from models.appmodels import DiscogsAuthRequest, TrackRead, AlbumRead, BackgroundJobRead
 from sqlmodel import Session, select
 from typing import Optional
 from models.sqlmodels import Album
@@ -47,15 +48,23 @@ async def authorize_discogs(
         db=db,
     )
 
-@router.post("/refresh/")
+@router.post("/refresh/", response_model=BackgroundJobRead)
 async def process_collection(
-    background_tasks: BackgroundTasks,
+    full: bool = False,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session),
 ):
-    collection_service = CollectionService(db=db)
-    background_tasks.add_task(collection_service.process_collection, user.user_uuid)
-    return {"message": "Discogs collection refresh triggered in background."}
+    # picked up by the job worker (scripts/job_worker.py); returns the running import if there is one
+    return await JobService(db).enqueue("discogs_import", user.user_uuid, params={"full": full})
+
+@router.post("/enrich/", response_model=BackgroundJobRead)
+async def enrich_albums_from_discogs(
+    concurrency: int = Query(DISCOGS_ENRICH_CONCURRENCY, ge=1, le=8),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Queue a job that links every album with a Discogs release to its Discogs master."""
+    return await JobService(db).enqueue("discogs_enrichment", user.user_uuid, params={"concurrency": concurrency})
 
 @router.post("/enrich/album/{album_uuid}", response_model=AlbumRead)
 async def enrich_album_from_discogs(
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from dependencies.redis import get_redis
 import redis.asyncio as redis
+from dependencies.response_cache import response_cache
 
 router = APIRouter(
     prefix="/healthcheck",
@@ -15,3 +16,9 @@ async def redis_test(r: redis.Redis = Depends(get_redis)):
 @router.get("/health")
 async def health():
     return {"health": "Yes, I am healthy!"}
+
+
+@router.get("/response-cache")
+async def response_cache_stats():
+    """Hit rates of the upstream API response cache (this process only)."""
+    return response_cache.report()
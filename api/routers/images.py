@@ -0,0 +1,87 @@
+# routers/images.py
+import os
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dependencies.auth import get_current_user
+from dependencies.database import get_async_session
+from models.appmodels import BackgroundJobRead
+from models.sqlmodels import User
+from services.artwork_service import artwork_digest, artwork_service
+from services.cover_art_backfill_service import COVER_ART_CONCURRENCY
+from services.image_proxy_service import image_proxy_service, url_key
+from services.job_service import JobService
+
+router = APIRouter(prefix="/images", tags=["images"])
+
+# artwork files are content-addressed, a given URL never changes
+IMMUTABLE = "public, max-age=31536000, immutable"
+# /images/{album_uuid} keeps its URL when the album's art changes (backfill, hydration,
+# enrichment): always revalidate, the ETag still turns a repeat into a 304
+REVALIDATE = "public, no-cache"
+
+
+def _cached_file(path: str, etag: str, request: Request, cache_control: str = IMMUTABLE):
+    headers = {"Cache-Control": cache_control, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+@router.get("/art/{digest}/{size}")
+async def get_artwork(digest: str, size: int, request: Request):
+    path = artwork_service.path_for(digest, size)
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Artwork not found")
+    return _cached_file(path, f'"{digest}-{size}"', request)
+
+
+@router.post("/warmup", response_model=BackgroundJobRead)
+async def warm_image_cache(
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user)
+):
+    """Queue a job that pre-fetches the art of every album in the user's collection."""
+    return await JobService(db).enqueue("artwork_warmup", user.user_uuid)
+
+
+@router.post("/backfill", response_model=BackgroundJobRead)
+async def backfill_cover_art(
+    concurrency: int = Query(COVER_ART_CONCURRENCY, ge=1, le=32),
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(get_current_user)
+):
+    """Queue a job that looks up missing album and release art on the Cover Art Archive."""
+    return await JobService(db).enqueue("cover_art_backfill", user.user_uuid, params={"concurrency": concurrency})
+
+
+@router.get("/{album_uuid}")
+async def get_album_image(
+    album_uuid: UUID,
+    request: Request,
+    size: int = Query(500),
+    db: AsyncSession = Depends(get_async_session),
+):
+    image_url = await image_proxy_service.get_album_image_url(db, album_uuid)
+    if not image_url:
+        raise HTTPException(status_code=404, detail="Album has no image")
+
+    digest = artwork_digest(image_url)
+    if digest:
+        # locally extracted art, already cached
+        path = artwork_service.path_for(digest, size)
+        if path and os.path.exists(path):
+            return _cached_file(path, f'"{digest}-{size}"', request, REVALIDATE)
+        raise HTTPException(status_code=404, detail="Artwork not found")
+
+    # the key is derived from the source URL, so the ETag changes when the album's art does
+    etag = f'"{url_key(image_url)}-{size}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"Cache-Control": REVALIDATE, "ETag": etag})
+    path = await image_proxy_service.get_variant(image_url, size)
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not available")
+    return _cached_file(path, etag, request, REVALIDATE)
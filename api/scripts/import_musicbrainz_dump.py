@@ -0,0 +1,49 @@
+# scripts/import_musicbrainz_dump.py
+"""
+Import a MusicBrainz JSON data dump (see services/musicbrainz_dump_service.py):
+
+    python -m scripts.import_musicbrainz_dump /data/release.tar.xz [--artists-from-db] [--discogs-ids ids.txt] [--all]
+
+Discogs links and (artist, album) resolutions are written for every release.
+Full albums/releases/tracks only for releases by artists already in the
+database (--artists-from-db), with a Discogs id listed in --discogs-ids
+(one id per line), or for everything (--all).
+"""
+
+import argparse
+import asyncio
+import logging
+
+from dependencies.database import async_session, engine
+from services.musicbrainz_dump_service import MusicBrainzDumpService, ReleaseFilter, open_dump_lines
+
+
+def _read_ids(path: str) -> set[int]:
+    with open(path) as f:
+        return {int(line) for line in (l.strip() for l in f) if line.isdigit()}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump")
+    parser.add_argument("--entity", default="release", help="member name inside a dump archive")
+    parser.add_argument("--artists-from-db", action="store_true")
+    parser.add_argument("--discogs-ids")
+    parser.add_argument("--all", action="store_true")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    async with async_session() as db:
+        service = MusicBrainzDumpService(db)
+        release_filter = ReleaseFilter(
+            discogs_ids=_read_ids(args.discogs_ids) if args.discogs_ids else set(),
+            artist_mbids=await service.load_known_artist_mbids() if args.artists_from_db else set(),
+            import_all=args.all,
+        )
+        await service.import_dump(open_dump_lines(args.dump, args.entity), release_filter, limit=args.limit)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
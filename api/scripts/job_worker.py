@@ -0,0 +1,17 @@
+# scripts/job_worker.py
+"""
+Background job worker, run next to the API (see services/job_worker_service.py):
+
+    python -m scripts.job_worker [job_type ...]
+
+Heavy jobs such as library scans run here instead of in the web workers.
+"""
+
+import asyncio
+import sys
+
+from services.job_worker_service import job_worker_service
+
+
+if __name__ == "__main__":
+    asyncio.run(job_worker_service.run(sys.argv[1:] or None))
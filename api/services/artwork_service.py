@@ -0,0 +1,148 @@
+# services/artwork_service.py
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from config import settings
+from services.tag_reader import read_picture
+
+logger = logging.getLogger(__name__)
+
+ARTWORK_DIR = settings.get("ARTWORK_DIR", "/var/cache/universalscrobbler/artwork")
+ARTWORK_WORKERS = int(settings.get("ARTWORK_WORKERS", 2))
+# public URL of this API; the UI renders stored image urls as they are, on its own origin
+API_BASE_URL = settings.get("API_BASE_URL", "http://localhost:8000").rstrip("/")
+THUMBNAIL_SIZES = (250, 500)  # same sizes the Cover Art Archive thumbnails use
+FOLDER_IMAGES = ("cover.jpg", "folder.jpg", "front.jpg", "cover.png", "folder.png", "front.png")
+MAX_EMBEDDED_CANDIDATES = 3  # audio files to try for an embedded picture
+DIGEST_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def artwork_path(cache_dir: str, digest: str, size: int) -> str:
+    return os.path.join(cache_dir, digest[:2], f"{digest}_{size}.jpg")
+
+
+def artwork_url(digest: str, size: int) -> str:
+    return f"{API_BASE_URL}/images/art/{digest}/{size}"
+
+
+def artwork_digest(image_url: str) -> str | None:
+    """Digest of a locally extracted artwork url (absolute or legacy relative), None for remote art."""
+    path = image_url.removeprefix(API_BASE_URL)
+    if not path.startswith("/images/art/"):
+        return None
+    digest = path.split("/")[3]
+    return digest if DIGEST_RE.match(digest) else None
+
+
+def _find_folder_image(directory: str) -> str | None:
+    try:
+        names = {name.lower(): name for name in os.listdir(directory)}
+    except OSError:
+        return None
+    for candidate in FOLDER_IMAGES:
+        if candidate in names:
+            return os.path.join(directory, names[candidate])
+    return None
+
+
+def extract_directory_artwork(directory: str, audio_paths: list[str], cache_dir: str) -> str | None:
+    """
+    Runs in the process pool. Finds the album art for a directory (folder
+    image first, then the first embedded picture), renders the thumbnails
+    into the content-addressed cache and returns the image digest.
+    """
+    data = None
+    folder_image = _find_folder_image(directory)
+    if folder_image:
+        with open(folder_image, "rb") as f:
+            data = f.read()
+    else:
+        for path in audio_paths[:MAX_EMBEDDED_CANDIDATES]:
+            data = read_picture(path)
+            if data:
+                break
+    if not data:
+        return None
+
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    targets = {size: artwork_path(cache_dir, digest, size) for size in THUMBNAIL_SIZES}
+    if not all(os.path.exists(path) for path in targets.values()):
+        render_thumbnails(data, targets)
+    # else: same image already rendered for another album
+    return digest
+
+
+def render_thumbnails(data: bytes, targets: dict[int, str]):
+    """Decode an image once and write a JPEG per {max edge: path}, atomically."""
+    largest = max(targets)
+    with Image.open(io.BytesIO(data)) as img:
+        # let the JPEG decoder downscale while decoding instead of decoding full size
+        img.draft("RGB", (largest, largest))
+        img = img.convert("RGB")
+        for size, path in targets.items():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            thumb = img.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            thumb.save(tmp_path, "JPEG", quality=85, optimize=True)
+            os.replace(tmp_path, path)
+
+
+class ArtworkService:
+    """
+    Singleton service for locally extracted album art.
+    - Extraction and thumbnailing run in a process pool, off the event loop
+    - Thumbnails are stored content-addressed (blake2b of the original image),
+      so identical art is rendered once and the files never change
+    """
+
+    def __init__(self, cache_dir: str = ARTWORK_DIR, workers: int = ARTWORK_WORKERS):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a process that runs an event loop and watcher threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def extract_directory_artwork(self, directory: str, audio_paths: list[str]) -> str | None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_pool(), extract_directory_artwork, directory, audio_paths, self.cache_dir
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not extract artwork for {directory}: {e}")
+            return None
+
+    async def render_thumbnails(self, data: bytes, targets: dict[int, str]):
+        """Resize `data` into the given {max edge: path} files in the process pool."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._get_pool(), render_thumbnails, data, targets)
+
+    def path_for(self, digest: str, size: int) -> str | None:
+        """Cache file for a digest/size pair, None if the request is not a valid artwork key."""
+        if not DIGEST_RE.match(digest) or size not in THUMBNAIL_SIZES:
+            return None
+        return artwork_path(self.cache_dir, digest, size)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Singleton instance
+artwork_service = ArtworkService()
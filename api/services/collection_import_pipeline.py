@@ -0,0 +1,386 @@
+# services/collection_import_pipeline.py
+"""
+Staged import of a Discogs collection.
+
+Releases move through bounded queues. Every stage has its own workers and,
+optionally, its own rate on top of the shared API limiters:
+
+    details -> mapping -> search -> fetch -> ingest
+
+(mapped releases skip the search, releases nobody found skip the fetch)
+
+- details: Discogs release details, only for rows without artist/title
+- mapping: MusicBrainz release through the Discogs URL relationship (links
+  from the imported dump are resolved up front, in one query)
+- search: MusicBrainz search by artist/title when the mapping found nothing
+- fetch: MusicBrainz release data, no database access
+- ingest: writes the release and links it to the collection, one release per
+  transaction. One writer by default, so two releases never race to create
+  the same album.
+
+A full queue blocks the stage feeding it, so memory stays bounded whatever the
+size of the collection. A release that fails in any stage is counted as failed
+and the stage moves on; `unlinked` lists the releases that did not make it
+into the collection, so the caller can keep them for the next sync.
+"""
+
+import asyncio
+import logging
+import re
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from dependencies.database import ChunkedSession, async_session
+from dependencies.discogs_api import DiscogsAPI
+from dependencies.musicbrainz_api import MusicBrainzAPI
+from dependencies.rate_limiter import LANE_BULK, TokenBucketLimiter
+from models.sqlmodels import Album, AlbumArtistBridge, AlbumRelease, DiscogsReleaseLink
+from services.musicbrainz_service import FetchedRelease, MusicBrainzService
+
+logger = logging.getLogger(__name__)
+
+IMPORT_QUEUE_SIZE = int(settings.get("IMPORT_QUEUE_SIZE", 50))
+IMPORT_SESSION_RELEASES = 25  # releases per writer session
+IN_CHUNK = 1000
+
+# stage -> (workers, own requests/s or None to rely on the API limiters)
+STAGE_DEFAULTS = {
+    "details": (2, None),
+    "mapping": (4, None),
+    "search": (2, 0.5),  # leaves MusicBrainz budget for mapping and fetch
+    "fetch": (3, None),
+    "ingest": (1, None),
+}
+
+OnProgress = Callable[[dict], Awaitable[None]]
+OnError = Callable[["ImportItem", str, Exception], Awaitable[None]]
+
+
+def stage_settings(name: str) -> tuple[int, Optional[float]]:
+    workers, rate = STAGE_DEFAULTS[name]
+    workers = int(settings.get(f"IMPORT_{name.upper()}_WORKERS", workers))
+    rate = settings.get(f"IMPORT_{name.upper()}_RATE", rate)
+    return workers, float(rate) if rate else None
+
+
+@dataclass
+class ImportItem:
+    """One Discogs release on its way through the pipeline."""
+    discogs_release_id: int
+    artist: Optional[str] = None
+    title: Optional[str] = None
+    details_missing: bool = False
+    musicbrainz_release_id: Optional[str] = None
+    searched: bool = False  # the MB release came from a search, not the URL relationship
+    fetched: Optional[FetchedRelease] = None
+
+
+class Stage:
+    """`workers` tasks draining one bounded queue; None is the end-of-input marker."""
+
+    def __init__(
+            self,
+            name: str,
+            handle: Callable[[ImportItem, Any], Awaitable[None]],
+            workers: int,
+            rate: Optional[float] = None,
+            scope: Optional[Callable[[], Any]] = None,
+            on_error: Optional[OnError] = None,
+    ):
+        self.name = name
+        self.handle = handle
+        self.on_error = on_error
+        self.workers = workers
+        self.scope = scope  # per-worker async context, e.g. a session of its own
+        self.limiter = TokenBucketLimiter(f"import:{name}", rate=rate) if rate else None
+        self.queue: asyncio.Queue[Optional[ImportItem]] = asyncio.Queue(maxsize=IMPORT_QUEUE_SIZE)
+
+    async def put(self, item: ImportItem):
+        await self.queue.put(item)
+
+    async def close(self):
+        for _ in range(self.workers):
+            await self.queue.put(None)
+
+    async def run(self):
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(self.workers):
+                tg.create_task(self._worker())
+
+    async def _worker(self):
+        async with self.scope() if self.scope else _no_scope() as scope:
+            while (item := await self.queue.get()) is not None:
+                if self.limiter:
+                    await self.limiter.acquire(LANE_BULK)
+                try:
+                    await self.handle(item, scope)
+                except Exception as e:
+                    # one bad release never takes the stage (and the import) down
+                    if not self.on_error:
+                        raise
+                    await self.on_error(item, self.name, e)
+
+
+@asynccontextmanager
+async def _no_scope() -> AsyncIterator[None]:
+    yield None
+
+
+@dataclass
+class _Writer:
+    """What one ingest worker owns: a rotating session and a service bound to it."""
+    service: Any
+    uow: ChunkedSession
+
+
+@dataclass
+class CollectionImportPipeline:
+    """
+    `service_factory(db)` builds a CollectionService for a session; every
+    ingest worker gets its own. Progress counters go to `on_progress` after
+    every ingested release.
+    """
+    service_factory: Callable[[AsyncSession], Any]
+    collection_uuid: UUID
+    token: str
+    secret: str
+    discogs_api: DiscogsAPI
+    musicbrainz_api: MusicBrainzAPI
+    on_progress: Optional[OnProgress] = None
+    progress: dict = field(init=False, default_factory=lambda: {
+        "releases": 0, "ingested": 0, "matched": 0, "discogs_only": 0, "placeholders": 0, "unmatched": 0,
+        "failed": 0,
+    })
+    unlinked: list[int] = field(init=False, default_factory=list)  # unmatched or failed
+    _release_locks: dict = field(init=False, repr=False, default_factory=lambda: defaultdict(asyncio.Lock))
+
+    def __post_init__(self):
+        self.musicbrainz = MusicBrainzService(None, self.musicbrainz_api)  # API only, fetch stage
+        self.details = Stage("details", self._details, *stage_settings("details"), on_error=self._failed)
+        self.mapping = Stage("mapping", self._mapping, *stage_settings("mapping"), on_error=self._failed)
+        self.search = Stage("search", self._search, *stage_settings("search"), on_error=self._failed)
+        self.fetch = Stage("fetch", self._fetch, *stage_settings("fetch"), on_error=self._failed)
+        self.ingest = Stage(
+            "ingest", self._ingest, *stage_settings("ingest"), scope=self._writer, on_error=self._failed
+        )
+
+    async def run(self, releases: list[dict]) -> dict:
+        """Import `releases` (rows of the Discogs collection listing or CSV)."""
+        items = [
+            ImportItem(r["discogs_release_id"], artist=r.get("artist") or None, title=r.get("title") or None)
+            for r in releases
+        ]
+        self.progress["releases"] = len(items)
+        await self._map_from_dump(items)
+
+        # each stage is closed once every stage feeding it has drained
+        chain = [self.details, self.mapping, self.search, self.fetch, self.ingest]
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._feed(items))
+            for stage, downstream in zip(chain, chain[1:] + [None]):
+                tg.create_task(self._run_stage(stage, downstream))
+
+        return self.progress
+
+    async def _feed(self, items: list[ImportItem]):
+        for item in items:
+            await self.details.put(item)
+        await self.details.close()
+
+    @staticmethod
+    async def _run_stage(stage: Stage, downstream: Optional[Stage]):
+        await stage.run()
+        if downstream:
+            await downstream.close()
+
+    async def _map_from_dump(self, items: list[ImportItem]):
+        ids = [item.discogs_release_id for item in items]
+        links: dict[int, str] = {}
+        async with async_session() as db:
+            for i in range(0, len(ids), IN_CHUNK):
+                result = await db.execute(
+                    select(DiscogsReleaseLink.discogs_release_id, DiscogsReleaseLink.musicbrainz_release_id)
+                    .where(DiscogsReleaseLink.discogs_release_id.in_(ids[i:i + IN_CHUNK]))
+                    .order_by(DiscogsReleaseLink.musicbrainz_release_id)
+                )
+                for discogs_release_id, musicbrainz_release_id in result.all():
+                    links.setdefault(discogs_release_id, musicbrainz_release_id)
+        for item in items:
+            item.musicbrainz_release_id = links.get(item.discogs_release_id)
+        logger.info(f"🗺 {len(links)}/{len(items)} releases mapped from the MusicBrainz dump")
+
+    # --- stages
+
+    async def _details(self, item: ImportItem, _):
+        if not item.artist or not item.title:
+            details = await self.discogs_api.get_full_release_details(item.discogs_release_id, self.token, self.secret)
+            if details:
+                item.artist = item.artist or (details.get("artists") or [{}])[0].get("name")
+                item.title = item.title or details.get("title")
+            else:
+                item.details_missing = True
+        await self.mapping.put(item)
+
+    async def _mapping(self, item: ImportItem, _):
+        if not item.musicbrainz_release_id:
+            try:
+                item.musicbrainz_release_id = await self.musicbrainz_api.get_release_by_discogs_url(
+                    item.discogs_release_id
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ MusicBrainz URL lookup failed for Discogs {item.discogs_release_id}: {e}")
+        if item.musicbrainz_release_id:
+            await self.fetch.put(item)
+        else:
+            await self.search.put(item)
+
+    async def _search(self, item: ImportItem, _):
+        if item.artist and item.title:
+            artist = re.sub(r'\s*\(\d+\)\s*$', '', item.artist)
+            try:
+                item.musicbrainz_release_id = await self.musicbrainz_api.get_first_release_id_by_artist_and_album(
+                    artist, item.title
+                )
+                item.searched = bool(item.musicbrainz_release_id)
+            except Exception as e:
+                logger.warning(f"⚠️ MusicBrainz search failed for Discogs {item.discogs_release_id}: {e}")
+        if item.musicbrainz_release_id:
+            await self.fetch.put(item)
+        else:
+            await self.ingest.put(item)
+
+    async def _fetch(self, item: ImportItem, _):
+        async with async_session() as db:
+            result = await db.execute(
+                select(AlbumRelease.album_release_uuid)
+                .where(AlbumRelease.musicbrainz_release_id == item.musicbrainz_release_id)
+                .limit(1)
+            )
+            known = result.first() is not None
+        if not known:
+            try:
+                item.fetched = await self.musicbrainz.fetch_musicbrainz_release(
+                    item.musicbrainz_release_id, defer_images=True
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Could not fetch MB release {item.musicbrainz_release_id}: {e}")
+                item.musicbrainz_release_id = None
+        await self.ingest.put(item)
+
+    @asynccontextmanager
+    async def _writer(self) -> AsyncIterator[_Writer]:
+        service = self.service_factory(None)
+        service.musicbrainz_service.api = self.musicbrainz_api
+        service.discogs_service.api = self.discogs_api
+        async with ChunkedSession(IMPORT_SESSION_RELEASES, on_session=service._bind_session) as uow:
+            yield _Writer(service, uow)
+
+    async def _ingest(self, item: ImportItem, writer: _Writer):
+        outcome = "failed"
+        try:
+            # two Discogs releases can map to one MB release
+            async with self._release_locks[item.musicbrainz_release_id or item.discogs_release_id]:
+                outcome = await self._ingest_release(item, writer.service)
+        except Exception as e:
+            logger.error(f"❌ Error processing release {item.discogs_release_id}: {e}")
+            await writer.service.db.rollback()
+        finally:
+            item.fetched = None
+            await writer.uow.step()
+        await self._finish(item, outcome)
+
+    async def _failed(self, item: ImportItem, stage: str, error: Exception):
+        logger.error(f"❌ Release {item.discogs_release_id} failed in the {stage} stage: {error}")
+        item.fetched = None
+        await self._finish(item, "failed")
+
+    async def _finish(self, item: ImportItem, outcome: str):
+        self.progress["ingested"] += 1
+        self.progress[outcome] += 1
+        if outcome in ("unmatched", "failed"):
+            self.unlinked.append(item.discogs_release_id)
+        if self.on_progress:
+            await self.on_progress(dict(self.progress))
+
+    async def _ingest_release(self, item: ImportItem, service) -> str:
+        """Write one release and link it; returns the progress counter it lands in."""
+        db = service.db
+        musicbrainz_service = service.musicbrainz_service
+        discogs_release_id = item.discogs_release_id
+
+        if item.musicbrainz_release_id:
+            if item.fetched:
+                album, albumrelease = await musicbrainz_service.store_musicbrainz_release(
+                    item.fetched, discogs_release_id, item.searched
+                )
+            else:
+                album, albumrelease = await musicbrainz_service.get_or_create_album_from_musicbrainz_release(
+                    item.musicbrainz_release_id, discogs_release_id, item.searched, defer_images=True
+                )
+
+            if albumrelease:
+                if item.searched and albumrelease.discogs_release_id is None:
+                    # no Discogs link yet → just update
+                    albumrelease.discogs_release_id = discogs_release_id
+                    db.add(albumrelease)
+                    await db.flush()
+                    logger.info(f"🔗 Added Discogs ID {discogs_release_id} to existing MB release {item.musicbrainz_release_id}")
+                elif item.searched and albumrelease.discogs_release_id != discogs_release_id:
+                    # conflicting Discogs IDs → clone, marked poor and without the MBID
+                    clone = await musicbrainz_service.clone_album_release_with_links(
+                        albumrelease.album_release_uuid, discogs_release_id
+                    )
+                    clone.quality = "poor"
+                    clone.musicbrainz_release_id = None
+                    db.add(clone)
+                    await db.flush()
+                    logger.warning(
+                        f"⚠️ Conflict: MB release {item.musicbrainz_release_id} already linked to Discogs "
+                        f"{albumrelease.discogs_release_id}, cloned for {discogs_release_id} as poor"
+                    )
+                    albumrelease = clone
+
+                await service._link_release_to_collection(self.collection_uuid, album, albumrelease, fmt="vinyl")
+                logger.info(f"✅ Linked MB {item.musicbrainz_release_id} to Discogs {discogs_release_id}")
+                return "matched"
+
+        if item.details_missing:
+            return "unmatched"
+
+        # Discogs only
+        album, albumrelease = await service.discogs_service.get_or_create_album_from_release(
+            discogs_release_id, self.token, self.secret
+        )
+        if albumrelease:
+            await service._link_release_to_collection(self.collection_uuid, album, albumrelease, fmt="vinyl")
+            logger.info(f"✅ Linked via Discogs only {discogs_release_id}")
+            return "discogs_only"
+
+        # Placeholder with quality="poor"
+        logger.warning(f"⚠️ Discogs release {discogs_release_id} not found in API — creating placeholder")
+        title = item.title or f"Unknown Release {discogs_release_id}"
+        artist = await musicbrainz_service.get_or_create_artist_by_name(item.artist or "Unknown Artist")
+
+        album = Album(title=title, quality="poor")
+        db.add(album)
+        await db.flush()
+        db.add(AlbumArtistBridge(album_uuid=album.album_uuid, artist_uuid=artist.artist_uuid))
+        albumrelease = AlbumRelease(
+            album_uuid=album.album_uuid,
+            title=title,
+            discogs_release_id=discogs_release_id,
+            quality="poor",
+        )
+        db.add(albumrelease)
+        await db.flush()
+
+        await service._link_release_to_collection(self.collection_uuid, album, albumrelease, fmt="vinyl")
+        logger.info(f"✅ Created placeholder album/release for Discogs {discogs_release_id}")
+        return "placeholders"
@@ -1,39 +1,276 @@
-from sqlalchemy import func, or_, exists
+from sqlalchemy import func, or_, and_, exists, literal_column, tuple_
 from sqlalchemy.orm import selectinload
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from models.sqlmodels import Collection, Album, CollectionAlbumReleaseBridge, Artist, AlbumRelease, \
     AlbumReleaseArtistBridge, AlbumArtistBridge, CollectionAlbumBridge, CollectionAlbumFormat, Track, \
     TrackArtistBridge, TrackAlbumBridge, TrackVersion, TrackVersionAlbumReleaseBridge, DiscogsToken, \
-    Collection, LibraryTrack, FileScanCache
+    Collection, LibraryTrack, FileScanCache, DirectoryScanCache, ReleaseResolution
 from models.appmodels import CollectionSimple, CollectionSimpleRead, PaginatedResponse, AlbumFlat
-from uuid import UUID
+from uuid import UUID, uuid4
 from fastapi import HTTPException
 import csv
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, delete
+from sqlmodel import select, delete, update
 from sqlalchemy.dialects.postgresql import insert
-from mutagen import File as MutagenFile
 import os
-import asyncio
+import hashlib
 import re
 from dependencies.musicbrainz_api import MusicBrainzAPI
-from dependencies.discogs_api import DiscogsAPI
+from dependencies.rate_limiter import LANE_BULK
+from dependencies.discogs_api import DiscogsAPI, collection_watermark
+from dependencies.database import ChunkedSession
 from services.musicbrainz_service import MusicBrainzService
+from services.track_matcher import FileCandidate, parse_track_number
 from services.discogs_service import DiscogsService
+from services.collection_import_pipeline import CollectionImportPipeline
+from services.tag_reader import AudioTags, read_tags
+from services.artwork_service import artwork_service, artwork_url, THUMBNAIL_SIZES
 from config import settings
 import logging
 import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
 
 logger = logging.getLogger(__name__)
 
 discogs_api = DiscogsAPI()
 
+AUDIO_EXTENSIONS = (".flac", ".mp3", ".ogg", ".m4a")
+MAX_RELEASE_SECONDS = 60.0
+SCAN_SESSION_DIRECTORIES = 50  # directories per session during a library scan
+RELEASE_RESOLUTION_TTL = timedelta(days=180)  # found releases
+RELEASE_RESOLUTION_MISS_TTL = timedelta(days=30)  # searches that found nothing, MB keeps growing
+FINGERPRINT_CHUNK = 64 * 1024
+INSERT_CHUNK = 1000  # rows per multi-row INSERT, keeps well below the bind parameter limit
+PRE_READ_LIMIT = 10_000  # tags the pre-pass keeps for the scan to reuse
+
+
+class ReleaseLookupFailed(Exception):
+    """The MB search for an untagged (artist, album) failed; its files stay pending."""
+
+
+def normalize(s: str | None) -> str | None:
+    if not s:
+        return None
+    return re.sub(r"\s+", " ", s.strip().lower())
+
+
+def file_fingerprint(path: str, size: int) -> str:
+    """Cheap content fingerprint: file size plus a hash of the first and last 64 KiB."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return f"{size}:{digest.hexdigest()}"
+
+
+def _start_memory_trace() -> bool:
+    """Start tracemalloc for a long-running job; returns True if we started it."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start()
+    return True
+
+
+def _memory_report() -> str:
+    """Summarise traced memory (current/peak and top allocation sites) for the job's summary log."""
+    if not tracemalloc.is_tracing():
+        return ""
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("filename")[:3]
+    sites = ", ".join(
+        f"{os.path.basename(stat.traceback[0].filename)} {stat.size / 2**20:.1f} MiB" for stat in top
+    )
+    return f"Memory: {current / 2**20:.1f} MiB current, {peak / 2**20:.1f} MiB peak (top: {sites})."
+
+
+def _path_key(path: str) -> tuple[str, ...]:
+    """Sort key matching _walk_music_dir's order: directories compare component by component."""
+    return tuple(os.path.normpath(path).split(os.sep))
+
+
+def _chunked(rows: list, size: int = INSERT_CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+@dataclass
+class LibraryScanState:
+    """Caches and counters shared by every directory of one library scan run."""
+    scan_cache: dict[str, tuple[int, float]]
+    dir_cache: dict[str, tuple[float, int]]
+    # fingerprint -> cached paths; None means look fingerprints up in the DB on demand
+    fingerprints: dict[str, list[str]] | None = None
+    unfingerprinted: set[str] = field(default_factory=set)
+    # (artist, album) -> MB release id, None for a known miss; only the keys this
+    # scan met, ReleaseResolution holds millions of rows once a dump is imported
+    release_cache: dict[tuple[str, str], str | None] = field(default_factory=dict)
+    # keys whose MB search failed in this run; not asked again until the next scan
+    release_failures: set[tuple[str, str]] = field(default_factory=set)
+    # path -> (size, mtime, tags) read by the pre-pass, taken by the scan instead of reading again
+    pre_read: dict[str, tuple[int, float, AudioTags | None]] = field(default_factory=dict)
+    # (artist, album) -> (album_uuid, album_release_uuid) of committed placeholders
+    placeholder_cache: dict[tuple[str, str], tuple[UUID, UUID]] = field(default_factory=dict)
+    seen_paths: set[str] = field(default_factory=set)
+    seen_dirs: set[str] = field(default_factory=set)
+    attempts: int = 0
+    successes: int = 0
+    unchanged: int = 0
+    pruned_dirs: int = 0
+    relinked: int = 0
+    mb_searches: int = 0
+    rows_written: int = 0
+    write_seconds: float = 0.0
+
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_written / self.write_seconds if self.write_seconds else 0.0
+
+    def progress(self) -> dict:
+        """Counters and throughput, as stored on a scan job and published to the user."""
+        elapsed = time.time() - self.started_at
+        files = self.attempts + self.unchanged + self.relinked
+        return {
+            "directories": len(self.seen_dirs),
+            "files": files,
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "unchanged": self.unchanged,
+            "pruned_dirs": self.pruned_dirs,
+            "relinked": self.relinked,
+            "mb_searches": self.mb_searches,
+            "rows_written": self.rows_written,
+            "elapsed_seconds": round(elapsed, 1),
+            "files_per_second": round(files / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+@dataclass
+class PendingFile:
+    """An audio file whose release is known, waiting to be matched with its siblings."""
+    path: str
+    ext: str
+    size: int
+    mtime: float
+    fingerprint: str
+    meta: Any
+    candidate: FileCandidate
+
+
+@dataclass
+class DirectoryWriteBatch:
+    """
+    Rows collected while scanning one directory. UUIDs are generated client
+    side, so nothing has to be flushed to learn a primary key; the whole batch
+    is written with multi-row INSERTs in a single transaction.
+    """
+    albums: list[dict] = field(default_factory=list)
+    album_artists: list[dict] = field(default_factory=list)
+    album_releases: list[dict] = field(default_factory=list)
+    tracks: list[dict] = field(default_factory=list)
+    track_albums: list[dict] = field(default_factory=list)
+    track_versions: list[dict] = field(default_factory=list)
+    track_version_releases: list[dict] = field(default_factory=list)
+    # keyed by track_version_uuid: one LibraryTrack per track version
+    library_tracks: dict[UUID, dict] = field(default_factory=dict)
+    scanned_files: list[dict] = field(default_factory=list)
+    resolutions: list[dict] = field(default_factory=list)
+    placeholders: dict[tuple[str, str], tuple[UUID, UUID]] = field(default_factory=dict)
+    # (album_uuid, album_release_uuid) pairs that may still lack art, filled from the directory's own art
+    artwork_targets: set[tuple[UUID, UUID]] = field(default_factory=set)
+    artwork_digest: str | None = None
+
+    @property
+    def row_count(self) -> int:
+        return (
+            len(self.albums) + len(self.album_artists) + len(self.album_releases)
+            + len(self.tracks) + len(self.track_albums) + len(self.track_versions)
+            + len(self.track_version_releases) + len(self.library_tracks) + len(self.scanned_files)
+            + len(self.resolutions)
+        )
+
+    def add_placeholder_album(self, key: tuple[str, str], title: str, artist_uuid: UUID) -> tuple[UUID, UUID]:
+        album_uuid, album_release_uuid = uuid4(), uuid4()
+        self.albums.append({"album_uuid": album_uuid, "title": title, "quality": "poor"})
+        self.album_artists.append({"album_uuid": album_uuid, "artist_uuid": artist_uuid})
+        self.album_releases.append({
+            "album_release_uuid": album_release_uuid,
+            "album_uuid": album_uuid,
+            "title": title,
+            "is_main_release": False,
+            "quality": "poor",
+        })
+        self.placeholders[key] = (album_uuid, album_release_uuid)
+        return album_uuid, album_release_uuid
+
+    def add_placeholder_track(
+            self, title: str, duration_ms: int | None, album_uuid: UUID, album_release_uuid: UUID
+    ) -> UUID:
+        track_uuid, track_version_uuid = uuid4(), uuid4()
+        self.tracks.append({"track_uuid": track_uuid, "name": title, "duration": duration_ms})
+        self.track_albums.append({"track_uuid": track_uuid, "album_uuid": album_uuid, "canonical_first": False})
+        self.track_versions.append({
+            "track_version_uuid": track_version_uuid,
+            "track_uuid": track_uuid,
+            "duration": duration_ms,
+            "quality": "poor",
+        })
+        self.track_version_releases.append({
+            "track_version_uuid": track_version_uuid,
+            "album_release_uuid": album_release_uuid,
+        })
+        return track_version_uuid
+
+    def add_library_track(self, track_version_uuid: UUID, path: str, quality: str | None, duration_ms: int | None):
+        existing = self.library_tracks.get(track_version_uuid)
+        if existing:
+            # same recording twice in one directory: first path wins, like an existing row
+            if duration_ms:
+                existing["duration_ms"] = duration_ms
+            return
+        self.library_tracks[track_version_uuid] = {
+            "library_track_uuid": uuid4(),
+            "track_version_uuid": track_version_uuid,
+            "path": path,
+            "quality": quality,
+            "duration_ms": duration_ms,
+        }
+
+    def mark_scanned(self, path: str, size: int, mtime: float, fingerprint: str | None):
+        self.scanned_files.append({
+            "file_scan_uuid": uuid4(),
+            "path": path,
+            "size": size,
+            "mtime": mtime,
+            "fingerprint": fingerprint,
+        })
+
+    def add_resolution(self, key: tuple[str, str], release_id: str | None):
+        self.resolutions.append({
+            "release_resolution_uuid": uuid4(),
+            "artist_key": key[0],
+            "album_key": key[1],
+            "musicbrainz_release_id": release_id,
+        })
+
+
 class CollectionService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.musicbrainz_service = MusicBrainzService(db, MusicBrainzAPI())
+        self.musicbrainz_service = MusicBrainzService(db, MusicBrainzAPI(lane=LANE_BULK))
         self.discogs_service = DiscogsService(db, discogs_api)
 
+    def _bind_session(self, db: AsyncSession):
+        """Point this service and the services it owns at another session."""
+        self.db = db
+        self.musicbrainz_service.db = db
+        self.discogs_service.db = db
+
     async def get_or_create_collection(self, user_uuid: str, collection_name: str):
         result = await self.db.execute(select(Collection).where(Collection.user_uuid == user_uuid))
         collection = result.scalars().first()
@@ -195,218 +432,289 @@ class CollectionService:
         await self.db.execute(stmt)
 
         await self.db.commit()
-    async def process_collection(self, user_uuid: str, csv_file_path: str = None):
-        if not user_uuid:
-            raise HTTPException(status_code=400, detail="user_uuid is required")
-
-        session = self.db
-        matched_releases = []
-        unmatched_releases = []
-
-        discogs_api = DiscogsAPI()
-        musicbrainz_api = MusicBrainzAPI()
-        discogs_service = DiscogsService(session, discogs_api)
-        musicbrainz_service = MusicBrainzService(session, musicbrainz_api)
-
-        # Get auth
-        result = await session.exec(select(DiscogsToken).where(DiscogsToken.user_uuid == user_uuid))
-        auth = result.first()
-        token = auth.access_token
-        secret = auth.access_token_secret
-
-        # Ensure collection exists
-        collection = await self.get_or_create_collection(user_uuid, "Discogs main collection")
-
-        # Either load from CSV or API
-        collection_to_process = (
-            await self.read_collection_from_csv(csv_file_path)
-            if csv_file_path else
-            discogs_api.get_collection(token, secret)
-        )
+    async def _link_releases_to_collection(
+        self,
+        collection_id: UUID,
+        releases: list[tuple[UUID, UUID]],
+        fmt: str = "digital",
+        status: str = "owned",
+    ):
+        """Bulk `_link_release_to_collection` for (album_uuid, album_release_uuid) pairs."""
+        for chunk in _chunked(releases):
+            await self.db.execute(insert(CollectionAlbumBridge).values([
+                {"album_uuid": album_uuid, "collection_uuid": collection_id} for album_uuid, _ in chunk
+            ]).on_conflict_do_nothing())
+            await self.db.execute(insert(CollectionAlbumReleaseBridge).values([
+                {"album_release_uuid": release_uuid, "collection_uuid": collection_id} for _, release_uuid in chunk
+            ]).on_conflict_do_nothing())
+            await self.db.execute(insert(CollectionAlbumFormat).values([
+                {"collection_uuid": collection_id, "album_uuid": album_uuid, "format": fmt, "status": status}
+                for album_uuid, _ in chunk
+            ]).on_conflict_do_nothing())
+        await self.db.commit()
 
-        # Existing release IDs already linked
-        existing_release_ids = {r.discogs_release_id for r in collection.album_releases}
+    async def _existing_releases(self, discogs_release_ids: list[int]) -> dict[int, tuple[UUID, UUID]]:
+        """Discogs release id -> (album_uuid, album_release_uuid) of releases already in the database."""
+        existing: dict[int, tuple[UUID, UUID]] = {}
+        for chunk in _chunked(discogs_release_ids):
+            result = await self.db.execute(
+                select(AlbumRelease.discogs_release_id, AlbumRelease.album_uuid, AlbumRelease.album_release_uuid)
+                .where(AlbumRelease.discogs_release_id.in_(chunk))
+                .order_by(AlbumRelease.created_at)
+            )
+            for discogs_release_id, album_uuid, album_release_uuid in result.all():
+                existing.setdefault(discogs_release_id, (album_uuid, album_release_uuid))
+        return existing
 
-        new_releases = [r for r in collection_to_process if r["discogs_release_id"] not in existing_release_ids]
-        logger.info(f"Found {len(new_releases)} new releases to process")
+    async def process_collection(
+            self,
+            user_uuid: str,
+            csv_file_path: str = None,
+            full: bool = False,
+            resume_after: str | None = None,
+            on_progress: Callable[[str | None, dict], Awaitable[None]] | None = None,
+    ) -> dict:
+        """
+        Import the user's Discogs collection through the staged pipeline in
+        services/collection_import_pipeline.py. From the API this is
+        incremental unless `full`: only releases added since the collection's
+        sync watermark (Collection.discogs_synced_through) are listed.
+
+        `on_progress(cursor, progress)` runs after every ingested release. The
+        cursor is when the oldest release of this import was added to the
+        collection; a job resumed with it (`resume_after`) lists the same
+        releases again and skips those that made it in.
+        """
+        if not user_uuid:
+            raise HTTPException(status_code=400, detail="user_uuid is required")
 
-        for index, release_info in enumerate(new_releases):
-            discogs_release_id = release_info["discogs_release_id"]
-            logger.info(f"Processing {index + 1}/{len(new_releases)}: Discogs ID {discogs_release_id}")
+        discogs_api = DiscogsAPI(lane=LANE_BULK)
+        musicbrainz_api = MusicBrainzAPI(lane=LANE_BULK)
 
-            try:
-                # Already in DB?
-                result = await session.exec(
-                    select(AlbumRelease).where(AlbumRelease.discogs_release_id == discogs_release_id)
+        tracing = _start_memory_trace()
+        try:
+            # Get auth
+            result = await self.db.exec(select(DiscogsToken).where(DiscogsToken.user_uuid == user_uuid))
+            auth = result.first()
+            token = auth.access_token
+            secret = auth.access_token_secret
+
+            # Ensure collection exists
+            collection = await self.get_or_create_collection(user_uuid, "Discogs main collection")
+
+            # Existing release IDs already linked
+            existing_release_ids = {r.discogs_release_id for r in collection.album_releases}
+
+            # Either load from CSV or API
+            if csv_file_path:
+                collection_to_process = await self.read_collection_from_csv(csv_file_path) or []
+            elif resume_after:
+                collection_to_process = await discogs_api.get_collection(
+                    token, secret, added_since=datetime.fromisoformat(resume_after)
                 )
-                albumrelease = result.first()
-
-                if albumrelease:
-                    await self._link_release_to_collection(
-                        collection.collection_uuid,
-                        albumrelease.album,
-                        albumrelease,
-                        fmt="vinyl"
-                    )
-                    logger.info("✅ Linked existing album release (vinyl)")
-                    continue
-
-                # Try MB mapping
-                await asyncio.sleep(1)  # be gentle with API
-                musicbrainz_release_id = await musicbrainz_api.get_release_by_discogs_url(discogs_release_id)
-                if musicbrainz_release_id:
-                    album, albumrelease = await musicbrainz_service.get_or_create_album_from_musicbrainz_release(
-                        musicbrainz_release_id, discogs_release_id
+            else:
+                synced_through = None
+                if not full:
+                    result = await self.db.execute(
+                        select(Collection.discogs_synced_through)
+                        .where(Collection.collection_uuid == collection.collection_uuid)
                     )
-                    if albumrelease:
-                        await self._link_release_to_collection(
-                            collection.collection_uuid,
-                            album,
-                            albumrelease,
-                            fmt="vinyl"
-                        )
-                        matched_releases.append({
-                            "discogs_id": discogs_release_id,
-                            "musicbrainz_id": musicbrainz_release_id,
-                        })
-                        logger.info(f"linked {musicbrainz_release_id} to {discogs_release_id}")
-                        continue
-
-                # Fallback: match by artist/title
-                artistname = release_info.get("artist")
-                title = release_info.get("title")
-                if not artistname or not title:
-                    discogs_release = discogs_api.get_full_release_details(discogs_release_id, token, secret)
-                    if discogs_release:
-                        artistname = discogs_release.get("artists", [{}])[0].get("name")
-                        title = discogs_release.get("title")
-                    else:
-                        unmatched_releases.append(release_info)
-                        continue
-
-                artistname = re.sub(r'\s*\(\d+\)\s*$', '', artistname)
-                new_id = await musicbrainz_api.get_first_release_id_by_artist_and_album(artistname, title)
-
-                if new_id:
-                    album, albumrelease = await musicbrainz_service.get_or_create_album_from_musicbrainz_release(
-                        new_id, discogs_release_id, True
-                    )
-
-                    if albumrelease:
-                        if albumrelease.discogs_release_id is None:
-                            # Case B: no Discogs link yet → just update
-                            albumrelease.discogs_release_id = discogs_release_id
-                            session.add(albumrelease)
-                            await session.flush()
-                            logger.info(f"🔗 Added Discogs ID {discogs_release_id} to existing MB release {new_id}")
-
-                            await self._link_release_to_collection(
-                                collection.collection_uuid,
-                                album,
-                                albumrelease,
-                                fmt="vinyl"
-                            )
+                    synced_through = result.scalar_one_or_none()
+                collection_to_process = await discogs_api.get_collection(token, secret, added_since=synced_through)
+
+            # oldest first. The pipeline finishes releases out of order, so the
+            # watermark only moves once it is done (see _advance_sync_watermark)
+            new_releases = [
+                r for r in reversed(collection_to_process) if r["discogs_release_id"] not in existing_release_ids
+            ]
+            cursor = resume_after or (new_releases[0].get("date_added") if new_releases and not full else None)
+
+            async def report(progress: dict):
+                if on_progress:
+                    await on_progress(cursor, progress)
+
+            # checkpoint the cursor first: a resumed job lists from it again and
+            # skips whatever got linked in the meantime
+            await report({"releases": len(new_releases)})
+
+            # releases already in the database only need linking, all at once
+            in_database = await self._existing_releases([r["discogs_release_id"] for r in new_releases])
+            if in_database:
+                await self._link_releases_to_collection(
+                    collection.collection_uuid, list(in_database.values()), fmt="vinyl"
+                )
+                logger.info(f"✅ Linked {len(in_database)} existing album releases (vinyl)")
+            new_releases = [r for r in new_releases if r["discogs_release_id"] not in in_database]
+            logger.info(f"Found {len(new_releases)} new releases to process")
+
+            pipeline = CollectionImportPipeline(
+                service_factory=type(self),
+                collection_uuid=collection.collection_uuid,
+                token=token,
+                secret=secret,
+                discogs_api=discogs_api,
+                musicbrainz_api=musicbrainz_api,
+                on_progress=report,
+            )
+            progress = await pipeline.run(new_releases)
+            progress["linked_existing"] = len(in_database)
 
-                        elif albumrelease.discogs_release_id != discogs_release_id:
-                            # Case C: conflicting Discogs IDs → clone
-                            new_albumrelease = await musicbrainz_service.clone_album_release_with_links(
-                                albumrelease.album_release_uuid, discogs_release_id
-                            )
-                            # mark the clone as poor + unlink MBID
-                            new_albumrelease.quality = "poor"
-                            new_albumrelease.musicbrainz_release_id = None
-                            session.add(new_albumrelease)
-                            await session.flush()
-                            logger.warning(
-                                f"⚠️ Conflict: MB release {new_id} already linked to Discogs "
-                                f"{albumrelease.discogs_release_id}, cloned for {discogs_release_id} as poor"
-                            )
+            # the next incremental sync starts at the oldest release that didn't make it in
+            if not csv_file_path:
+                await self._advance_sync_watermark(
+                    collection.collection_uuid, collection_to_process, set(pipeline.unlinked)
+                )
 
-                            await self._link_release_to_collection(
-                                collection.collection_uuid,
-                                new_albumrelease.album,
-                                new_albumrelease,
-                                fmt="vinyl"
-                            )
+            if pipeline.unlinked:
+                logger.warning(f"Discogs releases not linked, retried on the next sync: {pipeline.unlinked}")
+            logger.info(
+                f"\nSummary: Matched {progress['matched']} / {len(new_releases)} "
+                f"({progress['discogs_only']} Discogs only, {progress['placeholders']} placeholders, "
+                f"{progress['unmatched']} unmatched, {progress['failed']} failed). {_memory_report()}"
+            )
+            return progress
+        finally:
+            if tracing:
+                tracemalloc.stop()
+
+    async def _advance_sync_watermark(self, collection_uuid: UUID, releases: list[dict], pending: set[int]):
+        watermark = collection_watermark(releases, pending)
+        if watermark:
+            await self.db.execute(
+                update(Collection)
+                .where(Collection.collection_uuid == collection_uuid)
+                .values(discogs_synced_through=watermark)
+            )
+            await self.db.commit()
 
-                        else:
-                            # Case A: exact match → just link
-                            await self._link_release_to_collection(
-                                collection.collection_uuid,
-                                album,
-                                albumrelease,
-                                fmt="vinyl"
-                            )
-                            logger.info(f"✅ Linked MB {new_id} with Discogs {discogs_release_id}")
+    async def _resolve_album_via_mb(self, artist: str, album: str):
+        # Use MB search API to find release; errors raise so they are never stored as misses
+        return await self.musicbrainz_service.api.get_first_release_id_by_artist_and_album(
+            artist, album, raise_errors=True
+        )
 
-                        matched_releases.append({
-                            "discogs_id": discogs_release_id,
-                            "musicbrainz_id": new_id,
-                        })
-                        continue
+    @staticmethod
+    def _fresh_resolution():
+        """SQL condition for ReleaseResolution rows that are still within their TTL."""
+        now = datetime.now(timezone.utc)
+        return or_(
+            and_(ReleaseResolution.musicbrainz_release_id.is_not(None),
+                 ReleaseResolution.resolved_at > now - RELEASE_RESOLUTION_TTL),
+            and_(ReleaseResolution.musicbrainz_release_id.is_(None),
+                 ReleaseResolution.resolved_at > now - RELEASE_RESOLUTION_MISS_TTL),
+        )
 
-                # Final fallback: Discogs only → placeholder
-                album, albumrelease = await discogs_service.get_or_create_album_from_release(
-                    discogs_release_id, token, secret
+    async def _lookup_release_resolutions(self, keys: list[tuple[str, str]]) -> dict[tuple[str, str], str | None]:
+        """Fresh ReleaseResolution answers for `keys`, looked up in chunks."""
+        found = {}
+        for chunk in _chunked(keys):
+            result = await self.db.execute(
+                select(
+                    ReleaseResolution.artist_key,
+                    ReleaseResolution.album_key,
+                    ReleaseResolution.musicbrainz_release_id,
+                ).where(
+                    tuple_(ReleaseResolution.artist_key, ReleaseResolution.album_key).in_(chunk),
+                    self._fresh_resolution(),
                 )
-                if albumrelease:
-                    await self._link_release_to_collection(
-                        collection.collection_uuid,
-                        album,
-                        albumrelease,
-                        fmt="vinyl"
-                    )
-                    logger.info(f"✅ Linked via Discogs only {discogs_release_id}")
-                else:
-                    logger.warning(f"⚠️ Discogs release {discogs_release_id} not found in API — creating placeholder")
-
-                    # --- Build placeholders with quality="poor" ---
-                    placeholder_artist = release_info.get("artist", "Unknown Artist")
-                    placeholder_album_title = release_info.get("title", f"Unknown Release {discogs_release_id}")
-
-                    # Artist
-                    artist_obj = await musicbrainz_service.get_or_create_artist_by_name(placeholder_artist)
-
-                    # Album
-                    album = Album(
-                        title=placeholder_album_title,
-                        quality="poor"
-                    )
-                    session.add(album)
-                    await session.flush()
-                    session.add(AlbumArtistBridge(album_uuid=album.album_uuid, artist_uuid=artist_obj.artist_uuid))
-
-                    # AlbumRelease
-                    albumrelease = AlbumRelease(
-                        album_uuid=album.album_uuid,
-                        title=placeholder_album_title,
-                        discogs_release_id=discogs_release_id,
-                        quality="poor"
-                    )
-                    session.add(albumrelease)
-                    await session.flush()
-
-                    # Link to collection
-                    await self._link_release_to_collection(
-                        collection.collection_uuid,
-                        album,
-                        albumrelease,
-                        fmt="vinyl"
-                    )
-                    logger.info(f"✅ Created placeholder album/release for Discogs {discogs_release_id}")
+            )
+            found.update({(artist, album): release_id for artist, album, release_id in result.all()})
+        return found
 
-            except Exception as e:
-                logger.error(f"❌ Error processing release {discogs_release_id}: {e}")
-                unmatched_releases.append(release_info)
-                await session.rollback()
+    async def _resolve_release(
+            self,
+            artist: str,
+            album: str,
+            key: tuple[str, str],
+            state: LibraryScanState,
+            batch: DirectoryWriteBatch,
+    ) -> str | None:
+        """
+        Resolve an untagged (artist, album) to a MusicBrainz release id, going
+        to the MB search only when ReleaseResolution has no fresh answer. New
+        answers, misses included, are persisted with the directory batch.
+        Raises ReleaseLookupFailed when the search itself failed.
+        """
+        if key in state.release_cache:
+            return state.release_cache[key]
+        if key in state.release_failures:
+            raise ReleaseLookupFailed(f"{artist} - {album}")
 
-        logger.info(f"\nSummary: Matched {len(matched_releases)} / {len(new_releases)}")
-        return {"matched": matched_releases, "unmatched": unmatched_releases}
+        found = await self._lookup_release_resolutions([key])
+        if key in found:
+            state.release_cache[key] = found[key]
+            return found[key]
 
+        try:
+            release_id = await self._resolve_album_via_mb(artist, album)
+        except Exception as e:
+            # transient failure: don't remember it, the next scan asks again
+            state.release_failures.add(key)
+            raise ReleaseLookupFailed(f"{artist} - {album}") from e
+        state.mb_searches += 1
+        state.release_cache[key] = release_id
+        batch.add_resolution(key, release_id)
+        return release_id
+
+    async def estimate_release_searches(
+            self,
+            music_dir: str = settings.MUSIC_DIR,
+            include_extensions: tuple[str] = AUDIO_EXTENSIONS,
+            state: LibraryScanState | None = None,
+    ) -> dict:
+        """
+        Pre-pass over the directories a scan would visit: read the tags of the
+        first new or changed file of every directory (an album directory holds
+        one album), dedupe the untagged (artist, album) pairs and count those
+        without a fresh ReleaseResolution. That count estimates the
+        MusicBrainz searches the scan will make. The tags read here are kept
+        in `state.pre_read` (up to PRE_READ_LIMIT files), so the scan does not
+        read them again.
+        """
+        if state is None:
+            state = await self._load_scan_state()
 
-    async def _resolve_album_via_mb(self, artist: str, album: str):
-        # Use MB search API to find release
-        return await self.musicbrainz_service.api.get_first_release_id_by_artist_and_album(artist, album)
+        pairs: set[tuple[str, str]] = set()
+        directories = 0
+        for root, dir_mtime, entries in self._walk_music_dir(music_dir, include_extensions):
+            if state.dir_cache.get(root) == (dir_mtime, len(entries)):
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                    if state.scan_cache.get(entry.path) == (stat.st_size, stat.st_mtime):
+                        continue
+                    meta = read_tags(entry.path)
+                except Exception as e:
+                    logger.debug(f"Pre-pass could not read {entry.path}: {e}")
+                    continue
+                directories += 1
+                if len(state.pre_read) < PRE_READ_LIMIT:
+                    state.pre_read[entry.path] = (stat.st_size, stat.st_mtime, meta)
+                if meta and meta.tags and not meta.tags.get("musicbrainz_albumid"):
+                    artist = normalize(meta.tags.get("artist", [None])[0])
+                    album = normalize(meta.tags.get("album", [None])[0])
+                    if artist and album:
+                        pairs.add((artist, album))
+                break  # one sampled file per directory
+
+        # only the pairs met here are looked up; the scan reuses the answers
+        state.release_cache.update(
+            await self._lookup_release_resolutions([pair for pair in pairs if pair not in state.release_cache])
+        )
+        unresolved = [pair for pair in pairs if pair not in state.release_cache]
+        min_delay = 1 / self.musicbrainz_service.api.limiter.rate
+        estimate = {
+            "directories": directories,
+            "pairs": len(pairs),
+            "unresolved": len(unresolved),
+            "estimated_seconds": len(unresolved) * min_delay,
+        }
+        logger.info(
+            f"🔎 Pre-pass: {directories} new/changed directories, {len(pairs)} untagged (artist, album) pairs, "
+            f"{len(unresolved)} need a MusicBrainz search (~{estimate['estimated_seconds']:.0f}s)."
+        )
+        return estimate
 
 
     def _get_file_format_and_quality(self, meta, ext: str) -> tuple[str | None, str | None]:
@@ -428,241 +736,647 @@ class CollectionService:
             self,
             user_uuid: UUID,
             music_dir: str = settings.MUSIC_DIR,
-            include_extensions: tuple[str] = (".flac", ".mp3", ".ogg", ".m4a"),
+            include_extensions: tuple[str] = AUDIO_EXTENSIONS,
             limit: int = None,
             overwrite: bool = False,
-    ):
+            resume_after: str | None = None,
+            on_directory: Callable[[str, "LibraryScanState"], Awaitable[None]] | None = None,
+    ) -> dict:
         """
         Walk through a directory, extract tags, resolve with MusicBrainz,
         and persist LibraryTrack rows (digital library).
         Falls back to placeholder entities (quality="poor") if MBID is missing.
-        Uses FileScanCache to skip unchanged files between runs.
+        Uses FileScanCache (loaded once into memory) to skip unchanged files
+        before any tag parsing or DB work. A file is only recorded in the cache
+        once it reached a final state, so failed matches are retried next run.
+        Directories are walked with os.scandir and pruned by their (mtime,
+        file count) signature from DirectoryScanCache: a directory whose
+        entries did not change is skipped without a single per-file stat.
+        Note that in-place tag edits do not touch the directory mtime; use
+        overwrite=True to force a full rescan.
+        New paths whose content fingerprint matches a cached file that is gone
+        from disk are treated as moves and relinked without re-resolution.
+        Untagged albums are resolved through ReleaseResolution first; a pre-pass
+        logs how many MusicBrainz searches are left before the scan starts.
+        Placeholders, LibraryTracks and cache rows are written with multi-row
+        upserts in one transaction per directory (see DirectoryWriteBatch).
+        Albums without art get the directory's folder image or embedded cover,
+        thumbnailed into the local artwork cache (see ArtworkService).
         Enforces a max processing time per album directory (60s).
+        Runs on its own sessions, replaced every SCAN_SESSION_DIRECTORIES
+        directories so memory stays bounded on large libraries.
+        `resume_after` is a checkpoint cursor (last finished directory): the
+        walk order is stable, so everything up to it is skipped. `on_directory`
+        is awaited after every finished directory, e.g. to checkpoint a job.
+        Returns the scan's progress counters.
         """
 
-        def normalize(s: str | None) -> str | None:
-            if not s:
-                return None
-            return re.sub(r"\s+", " ", s.strip().lower())
+        tracing = _start_memory_trace()
+        original_db = self.db
+        try:
+            async with ChunkedSession(SCAN_SESSION_DIRECTORIES, on_session=self._bind_session) as uow:
+                # Reset cache if overwrite
+                if overwrite:
+                    await self.db.execute(delete(FileScanCache))
+                    await self.db.execute(delete(DirectoryScanCache))
+                    await self.db.commit()
+                    logger.info("Overwrite enabled – flushed file_scan_cache and directory_scan_cache.")
+
+                state = await self._load_scan_state()
+                await self.estimate_release_searches(music_dir, include_extensions, state)
+
+                resume_key = _path_key(resume_after) if resume_after else None
+                for root, dir_mtime, entries in self._walk_music_dir(music_dir, include_extensions):
+                    if resume_key and _path_key(root) <= resume_key:
+                        # finished before the restart; only keep its cache rows from being cleaned up
+                        state.seen_dirs.add(root)
+                        state.seen_paths.update(entry.path for entry in entries)
+                        continue
+                    if not await self._scan_walked_directory(root, dir_mtime, entries, state, limit):
+                        return state.progress()
+                    await uow.step()
+                    if on_directory:
+                        await on_directory(root, state)
+
+                await self._cleanup_scan_caches(state)
+
+            logger.info(
+                f"Scan finished: {state.attempts} files processed, {state.unchanged} unchanged "
+                f"({state.pruned_dirs} directories pruned), {state.relinked} moved files relinked, "
+                f"({state.successes} successes, {state.attempts - state.successes} failures/skips), "
+                f"{state.mb_searches} MusicBrainz searches. Wrote {state.rows_written} rows "
+                f"at {state.rows_per_second:.0f} rows/s using {uow.sessions_opened} sessions. {_memory_report()}"
+            )
+            return state.progress()
+        finally:
+            self._bind_session(original_db)
+            if tracing:
+                tracemalloc.stop()
 
-        MAX_RELEASE_SECONDS = 60.0
+    async def scan_paths(
+            self,
+            directories: list[str],
+            include_extensions: tuple[str] = AUDIO_EXTENSIONS,
+    ):
+        """
+        Scan only the given directories (recursively) through the regular
+        scan pipeline. Used by the library watcher for changed album directories.
+        Only cache rows below these directories are loaded and cleaned up.
+        """
+        state = await self._load_scan_state(prefixes=directories)
 
-        # Reset cache if overwrite
-        if overwrite:
-            await self.db.execute(delete(FileScanCache))
-            await self.db.commit()
-            logger.info("Overwrite enabled – flushed file_scan_cache.")
+        for directory in directories:
+            for root, dir_mtime, entries in self._walk_music_dir(directory, include_extensions):
+                await self._scan_walked_directory(root, dir_mtime, entries, state)
 
-        attempts = 0
-        successes = 0
-        release_cache: dict[tuple[str, str], str] = {}
-        placeholder_cache: dict[tuple[str, str], tuple[Album, AlbumRelease]] = {}
-        seen_paths: set[str] = set()
+        await self._cleanup_scan_caches(state)
 
-        for root, _, files in os.walk(music_dir):
-            dir_start = time.time()
-            dir_successes = 0
-            dir_attempts = 0
-            current_artist, current_album = None, None
+        logger.info(
+            f"Scanned {len(directories)} changed directories: {state.attempts} files processed, "
+            f"{state.successes} added, {state.relinked} relinked, {state.unchanged} unchanged, "
+            f"{state.mb_searches} MusicBrainz searches, "
+            f"{state.rows_written} rows at {state.rows_per_second:.0f} rows/s."
+        )
 
-            try:
-                for fname in files:
-                    if not fname.lower().endswith(include_extensions):
-                        continue
+    async def relocate_library_paths(self, moves: list[tuple[str, str]]):
+        """
+        Apply file/directory moves to LibraryTrack, FileScanCache and
+        DirectoryScanCache in place, so moved files keep their resolution
+        instead of being re-resolved as new files.
+        """
+        for src, dest in moves:
+            if os.path.isdir(dest):
+                src_prefix = src.rstrip(os.sep) + os.sep
+                dest_prefix = dest.rstrip(os.sep) + os.sep
+                for model in (LibraryTrack, FileScanCache, DirectoryScanCache):
+                    await self.db.execute(
+                        update(model)
+                        .where(model.path.startswith(src_prefix, autoescape=True))
+                        .values(path=func.concat(dest_prefix, func.substr(model.path, len(src_prefix) + 1)))
+                        .execution_options(synchronize_session=False)
+                    )
+                await self.db.execute(
+                    update(DirectoryScanCache)
+                    .where(DirectoryScanCache.path == src.rstrip(os.sep))
+                    .values(path=dest.rstrip(os.sep))
+                )
+            else:
+                # a file moved over an existing one replaces it
+                await self.db.execute(delete(FileScanCache).where(FileScanCache.path == dest))
+                await self.db.execute(
+                    update(FileScanCache).where(FileScanCache.path == src).values(path=dest)
+                )
+                await self.db.execute(
+                    update(LibraryTrack).where(LibraryTrack.path == src).values(path=dest)
+                )
+            logger.info(f"🚚 Relocated {src} -> {dest}")
 
-                    # check elapsed time before processing this file
-                    elapsed = time.time() - dir_start
-                    if elapsed > MAX_RELEASE_SECONDS:
-                        logger.warning(
-                            f"⏱ Skipping remaining files in {root} – already {elapsed:.2f}s (> {MAX_RELEASE_SECONDS}s)"
-                        )
-                        await self.db.rollback()
-                        break
-
-                    attempts += 1
-                    dir_attempts += 1
-                    if limit and attempts > limit:
-                        logger.info(
-                            f"Stopping after {limit} files "
-                            f"({successes} successes, {attempts - successes} failures/skips)."
-                        )
-                        return
+        await self.db.commit()
 
-                    path = os.path.join(root, fname)
-                    try:
-                        stat = os.stat(path)
-                        size = stat.st_size
-                        mtime = stat.st_mtime
+    async def remove_library_paths(self, paths: list[str]):
+        """Forget deleted files or directories: drop their LibraryTrack and cache rows."""
+        for path in paths:
+            prefix = path.rstrip(os.sep) + os.sep
+            for model in (LibraryTrack, FileScanCache, DirectoryScanCache):
+                await self.db.execute(
+                    delete(model)
+                    .where(or_(model.path == path, model.path.startswith(prefix, autoescape=True)))
+                    .execution_options(synchronize_session=False)
+                )
+            logger.info(f"🗑 Removed {path} from library")
 
-                        # --- check cache ---
-                        result = await self.db.execute(
-                            select(FileScanCache).where(FileScanCache.path == path)
-                        )
-                        cached = result.scalar_one_or_none()
-
-                        if cached and cached.size == size and cached.mtime == mtime:
-                            seen_paths.add(path)
-                        else:
-                            if cached:
-                                cached.size = size
-                                cached.mtime = mtime
-                                cached.scanned_at = datetime.utcnow()
-                            else:
-                                cached = FileScanCache(path=path, size=size, mtime=mtime)
-                                self.db.add(cached)
-                            await self.db.flush()
-                            seen_paths.add(path)
-
-                        # --- metadata extraction ---
-                        meta = MutagenFile(path)
-                        if not meta or not meta.tags:
-                            continue
-                        tags = {k.lower(): v for k, v in meta.tags.items()}
+        await self.db.commit()
+
+    async def _load_scan_state(self, prefixes: list[str] | None = None) -> LibraryScanState:
+        """Load FileScanCache and DirectoryScanCache into memory, optionally only below `prefixes`."""
+        file_stmt = select(
+            FileScanCache.path, FileScanCache.size, FileScanCache.mtime, FileScanCache.fingerprint
+        )
+        dir_stmt = select(DirectoryScanCache.path, DirectoryScanCache.mtime, DirectoryScanCache.file_count)
+        if prefixes:
+            below = [p.rstrip(os.sep) + os.sep for p in prefixes]
+            file_stmt = file_stmt.where(
+                or_(*[FileScanCache.path.startswith(b, autoescape=True) for b in below])
+            )
+            dir_stmt = dir_stmt.where(
+                or_(
+                    DirectoryScanCache.path.in_([p.rstrip(os.sep) for p in prefixes]),
+                    *[DirectoryScanCache.path.startswith(b, autoescape=True) for b in below],
+                )
+            )
 
-                        artist = tags.get("artist", [None])[0]
-                        album = tags.get("album", [None])[0]
-                        title = tags.get("title", [None])[0]
-                        mb_albumid = tags.get("musicbrainz_albumid", [None])[0]
-                        mb_trackid = tags.get("musicbrainz_trackid", [None])[0]
+        # Load the cache once per scan; unchanged files never hit the DB again
+        result = await self.db.execute(file_stmt)
+        scan_cache: dict[str, tuple[int, float]] = {}
+        fingerprints: dict[str, list[str]] = {}
+        unfingerprinted: set[str] = set()
+        for path, size, mtime, fingerprint in result.all():
+            scan_cache[path] = (size, mtime)
+            if fingerprint:
+                fingerprints.setdefault(fingerprint, []).append(path)
+            else:
+                unfingerprinted.add(path)
+
+        result = await self.db.execute(dir_stmt)
+        dir_cache = {path: (mtime, file_count) for path, mtime, file_count in result.all()}
+
+        return LibraryScanState(
+            scan_cache=scan_cache,
+            dir_cache=dir_cache,
+            # a partial scan only sees part of the cache, moves can come from anywhere
+            fingerprints=None if prefixes else fingerprints,
+            unfingerprinted=unfingerprinted,
+        )
 
-                        duration_ms = None
-                        if getattr(meta, "info", None) and getattr(meta.info, "length", None):
-                            duration_ms = int(meta.info.length * 1000)
+    async def _find_moved_file(self, path: str, fingerprint: str, state: LibraryScanState) -> str | None:
+        """
+        Return the cached path of a file with the same fingerprint that no longer
+        exists on disk. The returned path is claimed: a second copy with the same
+        content is a new file, not another move of the same one.
+        """
+        if state.fingerprints is not None:
+            candidates = state.fingerprints.get(fingerprint, [])
+        else:
+            # a relinked row already carries its new path, the session sees the update
+            result = await self.db.execute(
+                select(FileScanCache.path).where(FileScanCache.fingerprint == fingerprint)
+            )
+            candidates = result.scalars().all()
+
+        for candidate in candidates:
+            if candidate != path and not os.path.exists(candidate):
+                if state.fingerprints is not None:
+                    candidates.remove(candidate)
+                return candidate
+        return None
+
+    async def _relink_moved_file(self, old_path: str, path: str, size: int, mtime: float):
+        """Point LibraryTrack and FileScanCache at the new location of a moved file."""
+        await self.db.execute(
+            update(LibraryTrack).where(LibraryTrack.path == old_path).values(path=path)
+        )
+        await self.db.execute(delete(FileScanCache).where(FileScanCache.path == path))
+        await self.db.execute(
+            update(FileScanCache)
+            .where(FileScanCache.path == old_path)
+            .values(path=path, size=size, mtime=mtime, scanned_at=func.now())
+        )
 
-                        if not artist or not album or not title:
-                            continue
+    async def _cleanup_scan_caches(self, state: LibraryScanState):
+        """Delete cache rows for files and directories that were not seen in this run."""
+        missing = state.scan_cache.keys() - state.seen_paths
+        if missing:
+            await self.db.execute(delete(FileScanCache).where(FileScanCache.path.in_(missing)))
+            await self.db.commit()
+            logger.info(f"Removed {len(missing)} stale cache entries")
 
-                        current_artist, current_album = artist, album
-                        cache_key = (normalize(artist), normalize(album))
-
-                        # --- Try MBID first ---
-                        release_id: str | None = mb_albumid
-                        if not release_id:
-                            if cache_key in release_cache:
-                                release_id = release_cache[cache_key]
-                            else:
-                                release_id = await self._resolve_album_via_mb(artist, album)
-                                if release_id:
-                                    release_cache[cache_key] = release_id
-
-                        if release_id:
-                            album_obj, album_release = (
-                                await self.musicbrainz_service.get_or_create_album_from_musicbrainz_release(
-                                    str(release_id))
-                            )
-                            album_obj.quality = "normal"
-                            album_release.quality = "normal"
+        missing_dirs = state.dir_cache.keys() - state.seen_dirs
+        if missing_dirs:
+            await self.db.execute(
+                delete(DirectoryScanCache).where(DirectoryScanCache.path.in_(missing_dirs))
+            )
+            await self.db.commit()
+            logger.info(f"Removed {len(missing_dirs)} stale directory cache entries")
 
-                            track_version = await self.musicbrainz_service.get_or_create_track_version(
-                                str(release_id),
-                                title,
-                                mb_trackid,
-                            )
-                            if not track_version:
-                                logger.warning(
-                                    f"⚠ No track_version for {artist} - {album} - {title} on release {release_id}")
-                                continue
-                            if track_version:
-                                track_version.quality = "normal"
-                        else:
-                            if cache_key not in placeholder_cache:
-                                logger.warning(
-                                    f"⚠ No MBID for {artist} - {album}, creating placeholder with quality=poor")
-
-                                album_obj = Album(title=album, quality="poor")
-                                self.db.add(album_obj)
-                                await self.db.flush()
-
-                                artist_obj = await self.musicbrainz_service.get_or_create_artist_by_name(artist)
-                                self.db.add(
-                                    AlbumArtistBridge(album_uuid=album_obj.album_uuid,
-                                                      artist_uuid=artist_obj.artist_uuid)
-                                )
-
-                                album_release = AlbumRelease(
-                                    album_uuid=album_obj.album_uuid,
-                                    title=album,
-                                    quality="poor"
-                                )
-                                self.db.add(album_release)
-                                await self.db.flush()
-
-                                placeholder_cache[cache_key] = (album_obj, album_release)
-
-                            album_obj, album_release = placeholder_cache[cache_key]
-
-                            track = Track(name=title, quality="poor", duration=duration_ms)
-                            self.db.add(track)
-                            await self.db.flush()
-                            self.db.add(TrackAlbumBridge(track_uuid=track.track_uuid, album_uuid=album_obj.album_uuid))
-
-                            track_version = TrackVersion(
-                                track_uuid=track.track_uuid,
-                                duration=duration_ms,
-                                quality="poor"
-                            )
-                            self.db.add(track_version)
-                            await self.db.flush()
-                            self.db.add(TrackVersionAlbumReleaseBridge(
-                                track_version_uuid=track_version.track_version_uuid,
-                                album_release_uuid=album_release.album_release_uuid,
-                            ))
-
-                        # --- LibraryTrack handling ---
-                        result = await self.db.execute(
-                            select(LibraryTrack).where(
-                                LibraryTrack.track_version_uuid == track_version.track_version_uuid,
-                            )
+    async def _scan_walked_directory(
+            self,
+            root: str,
+            dir_mtime: float,
+            entries: list[os.DirEntry],
+            state: LibraryScanState,
+            limit: int = None,
+    ) -> bool:
+        """
+        Process the audio files of a single directory.
+        Placeholder entities, LibraryTracks and cache rows are collected in a
+        DirectoryWriteBatch and written in one transaction at the end.
+        Returns False once `limit` files have been attempted, True otherwise.
+        """
+        state.seen_dirs.add(root)
+
+        # --- nothing added, removed or renamed here: prune without stat'ing files ---
+        if state.dir_cache.get(root) == (dir_mtime, len(entries)):
+            state.seen_paths.update(entry.path for entry in entries)
+            state.unchanged += len(entries)
+            state.pruned_dirs += 1
+            return True
+
+        dir_start = time.time()
+        dir_attempts = 0
+        dir_pending = 0
+        current_artist, current_album = None, None
+        batch = DirectoryWriteBatch()
+        pending: dict[str, list[PendingFile]] = {}  # release id -> files waiting to be matched
+
+        try:
+            for entry in entries:
+                fname = entry.name
+                path = entry.path
+                try:
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.error(f"❌ Error processing {path}: {e}")
+                    dir_pending += 1
+                    continue
+                size = stat.st_size
+                mtime = stat.st_mtime
+
+                # --- unchanged since last scan: skip before any parsing ---
+                if state.scan_cache.get(path) == (size, mtime):
+                    state.seen_paths.add(path)
+                    state.unchanged += 1
+                    if path in state.unfingerprinted:
+                        # one-time backfill for rows cached before fingerprints existed
+                        await self.db.execute(
+                            update(FileScanCache)
+                            .where(FileScanCache.path == path)
+                            .values(fingerprint=file_fingerprint(path, size))
                         )
-                        existing = result.scalar_one_or_none()
+                    continue
+
+                # check elapsed time before processing this file
+                elapsed = time.time() - dir_start
+                if elapsed > MAX_RELEASE_SECONDS:
+                    logger.warning(
+                        f"⏱ Skipping remaining files in {root} – already {elapsed:.2f}s (> {MAX_RELEASE_SECONDS}s)"
+                    )
+                    dir_pending += 1
+                    break
+
+                try:
+                    fingerprint = file_fingerprint(path, size)
+                except OSError as e:
+                    logger.error(f"❌ Error processing {path}: {e}")
+                    dir_pending += 1
+                    continue
+
+                # --- moved/renamed file: relink instead of resolving it again ---
+                if path not in state.scan_cache:
+                    old_path = await self._find_moved_file(path, fingerprint, state)
+                    if old_path:
+                        await self._relink_moved_file(old_path, path, size, mtime)
+                        state.scan_cache.pop(old_path, None)
+                        state.seen_paths.add(path)
+                        state.relinked += 1
+                        logger.debug(f"🚚 Relinked moved file {old_path} -> {path}")
+                        continue
+
+                state.attempts += 1
+                dir_attempts += 1
+                if limit and state.attempts > limit:
+                    logger.info(
+                        f"Stopping after {limit} files "
+                        f"({state.successes} successes, {state.attempts - state.successes} failures/skips)."
+                    )
+                    for release_id, files in pending.items():
+                        await self._match_release_files(release_id, files, batch)
+                    await self._flush_directory_batch(batch, state)
+                    return False
+
+                try:
+                    state.seen_paths.add(path)
+
+                    # --- metadata extraction ---
+                    pre_read = state.pre_read.pop(path, None)
+                    if pre_read and pre_read[:2] == (size, mtime):
+                        meta = pre_read[2]
+                    else:
+                        meta = read_tags(path)
+                    if not meta or not meta.tags:
+                        batch.mark_scanned(path, size, mtime, fingerprint)
+                        continue
+                    tags = meta.tags
 
-                        if existing:
-                            if duration_ms and (not existing.duration_ms or existing.duration_ms != duration_ms):
-                                existing.duration_ms = duration_ms
-                                self.db.add(existing)
-                                await self.db.flush()
+                    artist = tags.get("artist", [None])[0]
+                    album = tags.get("album", [None])[0]
+                    title = tags.get("title", [None])[0]
+                    mb_albumid = tags.get("musicbrainz_albumid", [None])[0]
+                    mb_trackid = tags.get("musicbrainz_trackid", [None])[0]
+
+                    duration_ms = None
+                    if meta.info.length:
+                        duration_ms = int(meta.info.length * 1000)
+
+                    if not artist or not album or not title:
+                        batch.mark_scanned(path, size, mtime, fingerprint)
+                        continue
+
+                    current_artist, current_album = artist, album
+                    cache_key = (normalize(artist), normalize(album))
+
+                    # --- Try MBID first ---
+                    release_id: str | None = mb_albumid
+                    if not release_id:
+                        try:
+                            release_id = await self._resolve_release(artist, album, cache_key, state, batch)
+                        except ReleaseLookupFailed:
+                            # no placeholder and not marked scanned: the next scan tries again
+                            dir_pending += 1
                             continue
 
-                        # insert new LibraryTrack
-                        ext = os.path.splitext(fname)[1].lower()
-                        fmt, quality = self._get_file_format_and_quality(meta, ext)
-                        lt = LibraryTrack(
-                            track_version_uuid=track_version.track_version_uuid,
+                    if release_id:
+                        # matched against the whole release once every file is read
+                        pending.setdefault(str(release_id), []).append(PendingFile(
                             path=path,
-                            quality=quality,
-                            duration_ms=duration_ms,
-                        )
-                        self.db.add(lt)
+                            ext=os.path.splitext(fname)[1].lower(),
+                            size=size,
+                            mtime=mtime,
+                            fingerprint=fingerprint,
+                            meta=meta,
+                            candidate=FileCandidate(
+                                title=title,
+                                duration_ms=duration_ms,
+                                track_number=parse_track_number(tags.get("tracknumber", [None])[0]),
+                                mb_trackid=mb_trackid,
+                            ),
+                        ))
+                        continue
+
+                    placeholder = batch.placeholders.get(cache_key) or state.placeholder_cache.get(cache_key)
+                    if not placeholder:
+                        logger.warning(
+                            f"⚠ No MBID for {artist} - {album}, creating placeholder with quality=poor")
+                        artist_obj = await self.musicbrainz_service.get_or_create_artist_by_name(artist)
+                        placeholder = batch.add_placeholder_album(cache_key, album, artist_obj.artist_uuid)
+
+                    album_uuid, album_release_uuid = placeholder
+                    batch.artwork_targets.add(placeholder)
+                    track_version_uuid = batch.add_placeholder_track(
+                        title, duration_ms, album_uuid, album_release_uuid
+                    )
 
-                        await self.db.commit()
-                        dir_successes += 1
-                        successes += 1
+                    # --- LibraryTrack handling (upserted per directory) ---
+                    ext = os.path.splitext(fname)[1].lower()
+                    _, quality = self._get_file_format_and_quality(meta, ext)
+                    batch.add_library_track(track_version_uuid, path, quality, duration_ms)
+                    batch.mark_scanned(path, size, mtime, fingerprint)
 
-                    except Exception as e:
-                        logger.error(f"❌ Error processing {path}: {e}")
+                except Exception as e:
+                    logger.error(f"❌ Error processing {path}: {e}")
+                    dir_pending += 1
 
-                elapsed = time.time() - dir_start
-                if dir_attempts > 0 and current_artist and current_album:
-                    logger.debug(
-                        f"Added {current_artist}, {current_album} "
-                        f"{dir_successes}/{dir_attempts} tracks in {elapsed:.2f}s"
-                    )
+            for release_id, files in pending.items():
+                dir_pending += await self._match_release_files(release_id, files, batch)
 
-            except Exception as e:
-                logger.error(f"❌ Fatal error in release {root}: {e}")
-                await self.db.rollback()
+            if batch.artwork_targets:
+                batch.artwork_digest = await artwork_service.extract_directory_artwork(
+                    root, [entry.path for entry in entries]
+                )
+
+            # only remember the directory once every file in it reached a final state
+            directory = None if dir_pending else (root, dir_mtime, len(entries))
+            dir_successes = await self._flush_directory_batch(batch, state, directory)
+
+            elapsed = time.time() - dir_start
+            if dir_attempts > 0 and current_artist and current_album:
+                logger.debug(
+                    f"Added {current_artist}, {current_album} "
+                    f"{dir_successes}/{dir_attempts} tracks in {elapsed:.2f}s"
+                )
+
+        except Exception as e:
+            logger.error(f"❌ Fatal error in release {root}: {e}")
+            await self.db.rollback()
+
+        return True
+
+    async def _match_release_files(
+            self,
+            release_id: str,
+            files: list[PendingFile],
+            batch: DirectoryWriteBatch,
+    ) -> int:
+        """
+        Match all files of one release to its tracks in a single assignment and
+        add the matched ones to the batch. Returns the number of files left pending.
+        Files without a matching track (bonus tracks, bad rips) are final: they are
+        recorded in the scan cache and only tried again once they change on disk.
+        Only a failed import or lookup leaves files pending.
+        """
+        try:
+            album_obj, album_release = (
+                # local art is extracted by the caller; CAA art is left to the backfill
+                await self.musicbrainz_service.get_or_create_album_from_musicbrainz_release(
+                    release_id, defer_images=True)
+            )
+            album_obj.quality = "normal"
+            album_release.quality = "normal"
+
+            track_versions = await self.musicbrainz_service.match_track_versions(
+                release_id, [f.candidate for f in files]
+            )
+        except Exception as e:
+            logger.error(f"❌ Error processing release {release_id}: {e}")
+            return len(files)
+
+        for f, track_version in zip(files, track_versions):
+            if not track_version:
+                logger.warning(f"⚠ No track_version for {f.path} on release {release_id}")
+                batch.mark_scanned(f.path, f.size, f.mtime, f.fingerprint)
                 continue
+            track_version.quality = "normal"
+            if not album_obj.image_url or not album_release.image_url:
+                batch.artwork_targets.add((album_obj.album_uuid, album_release.album_release_uuid))
 
-        # cleanup stale cache entries
-        result = await self.db.execute(select(FileScanCache.path))
-        all_cached = {row[0] for row in result.all()}
-        missing = all_cached - seen_paths
-        if missing:
-            await self.db.execute(delete(FileScanCache).where(FileScanCache.path.in_(missing)))
-            await self.db.commit()
-            logger.info(f"Removed {len(missing)} stale cache entries")
+            # --- LibraryTrack handling (upserted per directory) ---
+            _, quality = self._get_file_format_and_quality(f.meta, f.ext)
+            batch.add_library_track(track_version.track_version_uuid, f.path, quality, f.candidate.duration_ms)
+            batch.mark_scanned(f.path, f.size, f.mtime, f.fingerprint)
+        return 0
 
-        logger.info(
-            f"Scan finished: {attempts} files processed "
-            f"({successes} successes, {attempts - successes} failures/skips)."
+    async def _flush_directory_batch(
+            self,
+            batch: DirectoryWriteBatch,
+            state: LibraryScanState,
+            directory: tuple[str, float, int] | None = None,
+    ) -> int:
+        """
+        Write everything collected for one directory with multi-row inserts and
+        commit once. `directory` is the (path, mtime, file_count) signature to
+        record when every file reached a final state.
+        Returns the number of newly added LibraryTracks.
+        """
+        start = time.perf_counter()
+
+        for model, rows in (
+                (Album, batch.albums),
+                (AlbumArtistBridge, batch.album_artists),
+                (AlbumRelease, batch.album_releases),
+                (Track, batch.tracks),
+                (TrackAlbumBridge, batch.track_albums),
+                (TrackVersion, batch.track_versions),
+                (TrackVersionAlbumReleaseBridge, batch.track_version_releases),
+        ):
+            for chunk in _chunked(rows):
+                await self.db.execute(insert(model).values(chunk).on_conflict_do_nothing())
+
+        added = 0
+        for chunk in _chunked(list(batch.library_tracks.values())):
+            stmt = insert(LibraryTrack).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["track_version_uuid"],
+                set_={"duration_ms": func.coalesce(stmt.excluded.duration_ms, LibraryTrack.duration_ms)},
+            ).returning(literal_column("xmax = 0"))
+            result = await self.db.execute(stmt)
+            added += sum(1 for inserted in result.scalars() if inserted)
+
+        for chunk in _chunked(batch.scanned_files):
+            await self._mark_scanned(chunk)
+
+        for chunk in _chunked(batch.resolutions):
+            stmt = insert(ReleaseResolution).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_release_resolution_artist_album",
+                set_={
+                    "musicbrainz_release_id": stmt.excluded.musicbrainz_release_id,
+                    "resolved_at": func.now(),
+                },
+            )
+            await self.db.execute(stmt)
+
+        if batch.artwork_digest and batch.artwork_targets:
+            await self._set_local_artwork(batch.artwork_digest, batch.artwork_targets)
+
+        if directory:
+            await self._mark_directory_scanned(*directory)
+
+        await self.db.commit()
+
+        state.placeholder_cache.update(batch.placeholders)
+        state.successes += added
+        state.rows_written += batch.row_count
+        state.write_seconds += time.perf_counter() - start
+        return added
+
+    async def _set_local_artwork(self, digest: str, targets: set[tuple[UUID, UUID]]):
+        """Point albums/releases without any art at the locally extracted thumbnails."""
+        image_url = artwork_url(digest, max(THUMBNAIL_SIZES))
+        thumbnail_url = artwork_url(digest, min(THUMBNAIL_SIZES))
+        await self.db.execute(
+            update(Album)
+            .where(Album.album_uuid.in_({album for album, _ in targets}), Album.image_url.is_(None))
+            .values(image_url=image_url, image_thumbnail_url=thumbnail_url)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            update(AlbumRelease)
+            .where(
+                AlbumRelease.album_release_uuid.in_({release for _, release in targets}),
+                AlbumRelease.image_url.is_(None),
+            )
+            .values(image_url=image_url, image_thumbnail_url=thumbnail_url)
+            .execution_options(synchronize_session=False)
         )
+
+    def _walk_music_dir(
+            self,
+            music_dir: str,
+            include_extensions: tuple[str],
+    ):
+        """
+        Depth-first walk using os.scandir, yielding (directory, mtime, audio file entries).
+        Entries are sorted by name so traversal order is stable between runs.
+        Costs one stat per directory; file entries are only stat'ed by the caller.
+        """
+        try:
+            root_mtime = os.stat(music_dir).st_mtime
+        except OSError as e:
+            logger.error(f"❌ Cannot read music directory {music_dir}: {e}")
+            return
+
+        stack: list[tuple[str, float]] = [(music_dir, root_mtime)]
+        while stack:
+            directory, mtime = stack.pop()
+            subdirs: list[tuple[str, float]] = []
+            files: list[os.DirEntry] = []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                subdirs.append((entry.path, entry.stat().st_mtime))
+                            elif entry.is_file() and entry.name.lower().endswith(include_extensions):
+                                files.append(entry)
+                        except OSError as e:
+                            logger.error(f"❌ Cannot read {entry.path}: {e}")
+            except OSError as e:
+                logger.error(f"❌ Cannot list {directory}: {e}")
+                continue
+
+            files.sort(key=lambda e: e.name)
+            yield directory, mtime, files
+
+            # push in reverse so subdirectories are visited in name order
+            stack.extend(sorted(subdirs, reverse=True))
+
+    async def _mark_directory_scanned(self, path: str, mtime: float, file_count: int):
+        """Upsert the DirectoryScanCache signature for a fully processed directory."""
+        stmt = insert(DirectoryScanCache).values(
+            directory_scan_uuid=uuid4(),
+            path=path,
+            mtime=mtime,
+            file_count=file_count,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["path"],
+            set_={
+                "mtime": stmt.excluded.mtime,
+                "file_count": stmt.excluded.file_count,
+                "scanned_at": func.now(),
+            },
+        )
+        await self.db.execute(stmt)
+
+    async def _mark_scanned(self, rows: list[dict]):
+        """Upsert FileScanCache rows for files that have been fully handled."""
+        stmt = insert(FileScanCache).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["path"],
+            set_={
+                "size": stmt.excluded.size,
+                "mtime": stmt.excluded.mtime,
+                "fingerprint": stmt.excluded.fingerprint,
+                "scanned_at": func.now(),
+            },
+        )
+        await self.db.execute(stmt)
@@ -0,0 +1,144 @@
+# services/cover_art_backfill_service.py
+"""
+Fill in missing cover art of albums (release groups) and album releases from
+the Cover Art Archive.
+
+Rows are walked in primary key order, one batch at a time. A batch is looked
+up concurrently, bounded by a semaphore, and written with one executemany
+UPDATE plus one INSERT of misses, then committed. The cursor
+"<entity_type>:<last uuid>" lets a job resume after the last committed batch.
+Misses (404, or no front image) go to cover_art_miss and are skipped until
+MISS_RETRY_AFTER has passed, so albums without art are not looked up on every run.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, bindparam, exists, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from dependencies.cover_art_archive_api import CoverArtArchiveAPI
+from models.sqlmodels import Album, AlbumRelease, CoverArtMiss
+from services.musicbrainz_service import MusicBrainzService
+
+logger = logging.getLogger(__name__)
+
+COVER_ART_CONCURRENCY = int(settings.get("COVER_ART_CONCURRENCY", 8))
+COVER_ART_BATCH = int(settings.get("COVER_ART_BATCH", 200))
+MISS_RETRY_AFTER = timedelta(days=90)  # art does get uploaded eventually
+
+# entity type, model, primary key, MusicBrainz id column, CAA lookup
+PHASES = (
+    ("release_group", Album, "album_uuid", "musicbrainz_release_group_id", "lookup_release_group"),
+    ("release", AlbumRelease, "album_release_uuid", "musicbrainz_release_id", "lookup_release"),
+)
+
+OnBatch = Callable[[str, dict], Awaitable[None]]
+
+
+class CoverArtBackfillService:
+    def __init__(
+            self,
+            db: AsyncSession,
+            api: Optional[CoverArtArchiveAPI] = None,
+            concurrency: int = COVER_ART_CONCURRENCY,
+            batch_size: int = COVER_ART_BATCH,
+    ):
+        self.db = db
+        self._owns_api = api is None
+        self.api = api or CoverArtArchiveAPI()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    async def run(self, resume_after: Optional[str] = None, on_batch: Optional[OnBatch] = None) -> dict:
+        """Backfill everything; `on_batch(cursor, progress)` runs after every committed batch."""
+        progress = {"checked": 0, "found": 0, "missing": 0, "failed": 0}
+        resume_type, _, resume_uuid = (resume_after or "").partition(":")
+        phase_types = [phase[0] for phase in PHASES]
+        start = phase_types.index(resume_type) if resume_type in phase_types else 0
+
+        try:
+            for entity_type, model, pk, mbid_column, lookup in PHASES[start:]:
+                after = UUID(resume_uuid) if entity_type == resume_type and resume_uuid else None
+                while True:
+                    rows = await self._next_batch(entity_type, model, pk, mbid_column, after)
+                    if not rows:
+                        break
+                    await self._backfill_batch(entity_type, model, pk, getattr(self.api, lookup), rows, progress)
+                    after = rows[-1][0]
+                    if on_batch:
+                        await on_batch(f"{entity_type}:{after}", dict(progress))
+        finally:
+            if self._owns_api:
+                await self.api.close()
+
+        logger.info(f"🎨 Cover art backfill finished: {progress}")
+        return progress
+
+    async def _next_batch(self, entity_type: str, model, pk: str, mbid_column: str, after: Optional[UUID]):
+        pk_col, mbid_col = getattr(model, pk), getattr(model, mbid_column)
+        known_miss = exists().where(
+            CoverArtMiss.entity_type == entity_type,
+            CoverArtMiss.musicbrainz_id == mbid_col,
+            CoverArtMiss.checked_at > datetime.now(timezone.utc) - MISS_RETRY_AFTER,
+        )
+        stmt = (
+            select(pk_col, mbid_col)
+            .where(model.image_url.is_(None), mbid_col.is_not(None), ~known_miss)
+            .order_by(pk_col)
+            .limit(self.batch_size)
+        )
+        if after is not None:
+            stmt = stmt.where(pk_col > after)
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def _backfill_batch(self, entity_type: str, model, pk: str, lookup, rows, progress: dict):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(mbid: str):
+            async with semaphore:
+                return mbid, await lookup(mbid)
+
+        # several albums can share a release group: look each id up once
+        responses = dict(await asyncio.gather(*(fetch(mbid) for mbid in {mbid for _, mbid in rows})))
+
+        covers, misses = [], {}
+        for row_uuid, mbid in rows:
+            status, body = responses[mbid]
+            progress["checked"] += 1
+            front = MusicBrainzService._front_cover(body) if status == 200 else None
+            if front:
+                covers.append({"b_uuid": row_uuid, "b_image_url": front[0], "b_thumbnail_url": front[1]})
+                progress["found"] += 1
+            elif status in (200, 404):
+                misses[mbid] = status
+                progress["missing"] += 1
+            else:
+                # transient (timeout, 5xx): retried on the next run
+                progress["failed"] += 1
+
+        table = model.__table__
+        if covers:
+            await self.db.execute(
+                update(table)
+                .where(and_(table.c[pk] == bindparam("b_uuid"), table.c.image_url.is_(None)))
+                .values(image_url=bindparam("b_image_url"), image_thumbnail_url=bindparam("b_thumbnail_url")),
+                covers,
+            )
+        if misses:
+            stmt = insert(CoverArtMiss).values([
+                {"entity_type": entity_type, "musicbrainz_id": mbid, "status": status}
+                for mbid, status in misses.items()
+            ])
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=["entity_type", "musicbrainz_id"],
+                set_={"status": stmt.excluded.status, "checked_at": datetime.now(timezone.utc)},
+            ))
+        await self.db.commit()
@@ -0,0 +1,184 @@
+# services/discogs_enrichment_service.py
+"""
+Link albums to their Discogs master in bulk (the batch version of
+DiscogsService.enrich_album_with_discogs_data).
+
+Albums with a Discogs-linked release but no discogs_master_id are walked in
+primary key order, one batch at a time:
+
+1. the earliest Discogs-linked release of every album tells its master
+2. every distinct master of the batch is fetched once, however many albums
+   share it, and kept for the rest of the run
+3. albums still without a thumbnail take the images of the master's main release
+4. one executemany UPDATE, one commit
+
+Discogs release and master responses also go through the persistent response
+cache, so albums whose release has no master cost nothing on the next run.
+Lookups run concurrently behind a semaphore and are paced by the shared
+Discogs limiter. The cursor "<last album uuid>" lets a job resume after the
+last committed batch.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, bindparam, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from dependencies.discogs_api import DiscogsAPI
+from dependencies.rate_limiter import LANE_BULK
+from models.sqlmodels import Album, AlbumRelease
+
+logger = logging.getLogger(__name__)
+
+DISCOGS_ENRICH_CONCURRENCY = int(settings.get("DISCOGS_ENRICH_CONCURRENCY", 4))
+DISCOGS_ENRICH_BATCH = int(settings.get("DISCOGS_ENRICH_BATCH", 100))
+
+OnBatch = Callable[[str, dict], Awaitable[None]]
+
+
+def _discogs_images(images: list[dict]) -> tuple[Optional[str], Optional[str]]:
+    """(image, thumbnail) from a Discogs images list, Discogs-hosted urls only."""
+    image_url = next((img["uri"] for img in images if img.get("uri")), None)
+    thumb_url = next((img["uri150"] for img in images if img.get("uri150")), None)
+    return (
+        image_url if image_url and "discogs" in image_url else None,
+        thumb_url if thumb_url and "discogs" in thumb_url else None,
+    )
+
+
+class DiscogsEnrichmentService:
+    def __init__(
+            self,
+            db: AsyncSession,
+            token: str,
+            secret: str,
+            api: Optional[DiscogsAPI] = None,
+            concurrency: int = DISCOGS_ENRICH_CONCURRENCY,
+            batch_size: int = DISCOGS_ENRICH_BATCH,
+    ):
+        self.db = db
+        self.token = token
+        self.secret = secret
+        self.api = api or DiscogsAPI(lane=LANE_BULK)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.batch_size = batch_size
+        # per run: release id -> master id, master id -> slim master, main release id -> images
+        self._release_masters: dict[int, Optional[int]] = {}
+        self._masters: dict[int, Optional[dict]] = {}
+        self._release_images: dict[int, tuple[Optional[str], Optional[str]]] = {}
+
+    async def run(self, resume_after: Optional[str] = None, on_batch: Optional[OnBatch] = None) -> dict:
+        """Enrich everything; `on_batch(cursor, progress)` runs after every committed batch."""
+        progress = {"checked": 0, "enriched": 0, "no_master": 0, "failed": 0, "masters_fetched": 0}
+        after = UUID(resume_after) if resume_after else None
+        while True:
+            rows = await self._next_batch(after)
+            if not rows:
+                break
+            await self._enrich_batch(rows, progress)
+            after = rows[-1][0]
+            if on_batch:
+                await on_batch(str(after), dict(progress))
+
+        logger.info(f"💿 Discogs enrichment finished: {progress}")
+        return progress
+
+    async def _next_batch(self, after: Optional[UUID]):
+        # the earliest Discogs-linked release per album, like the single-album enrichment
+        stmt = (
+            select(Album.album_uuid, AlbumRelease.discogs_release_id, Album.image_url, Album.image_thumbnail_url)
+            .join(AlbumRelease, AlbumRelease.album_uuid == Album.album_uuid)
+            .where(Album.discogs_master_id.is_(None), AlbumRelease.discogs_release_id.is_not(None))
+            .distinct(Album.album_uuid)
+            .order_by(Album.album_uuid, AlbumRelease.release_date.asc())
+            .limit(self.batch_size)
+        )
+        if after is not None:
+            stmt = stmt.where(Album.album_uuid > after)
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def _limited(self, fn, *args):
+        async with self.semaphore:
+            return await fn(*args, self.token, self.secret)
+
+    async def _load_release_masters(self, release_ids: set[int]):
+        missing = [release_id for release_id in release_ids if release_id not in self._release_masters]
+        releases = await asyncio.gather(*(self._limited(self.api.get_release, release_id) for release_id in missing))
+        for release_id, release in zip(missing, releases):
+            # None: fetch failed, 0: the release has no master
+            self._release_masters[release_id] = (release.get("master_id") or 0) if release else None
+
+    async def _load_masters(self, master_ids: set[int]):
+        missing = [master_id for master_id in master_ids if master_id not in self._masters]
+        masters = await asyncio.gather(*(self._limited(self.api.get_master, master_id) for master_id in missing))
+        for master_id, master in zip(missing, masters):
+            self._masters[master_id] = {
+                "main_release": master.get("main_release"),
+                "images": _discogs_images(master.get("images", [])),
+            } if master else None
+
+    async def _load_release_images(self, release_ids: set[int]):
+        missing = [release_id for release_id in release_ids if release_id not in self._release_images]
+        releases = await asyncio.gather(*(self._limited(self.api.get_release, release_id) for release_id in missing))
+        for release_id, release in zip(missing, releases):
+            self._release_images[release_id] = _discogs_images(release.get("images", [])) if release else (None, None)
+
+    async def _enrich_batch(self, rows, progress: dict):
+        await self._load_release_masters({release_id for _, release_id, _, _ in rows})
+
+        master_ids = {self._release_masters[release_id] for _, release_id, _, _ in rows} - {None, 0}
+        fetched_before = len(self._masters)
+        await self._load_masters(master_ids)
+        progress["masters_fetched"] += len(self._masters) - fetched_before
+
+        updates = []
+        for album_uuid, release_id, image_url, thumb_url in rows:
+            progress["checked"] += 1
+            master_id = self._release_masters[release_id]
+            if master_id is None or (master_id and self._masters.get(master_id) is None):
+                # transient: retried on the next run
+                progress["failed"] += 1
+                continue
+            if master_id == 0:
+                progress["no_master"] += 1
+                continue
+            master = self._masters[master_id]
+            master_image, master_thumb = master["images"]
+            updates.append({
+                "b_uuid": album_uuid,
+                "b_master_id": master_id,
+                "b_main_release_id": master["main_release"],
+                "b_image_url": image_url or master_image,
+                "b_thumbnail_url": thumb_url or master_thumb,
+            })
+
+        # albums still without a thumbnail: images of the main release
+        main_releases = {u["b_main_release_id"] for u in updates if not u["b_thumbnail_url"] and u["b_main_release_id"]}
+        await self._load_release_images(main_releases)
+        for u in updates:
+            if not u["b_thumbnail_url"] and u["b_main_release_id"]:
+                release_image, release_thumb = self._release_images[u["b_main_release_id"]]
+                u["b_image_url"] = u["b_image_url"] or release_image
+                u["b_thumbnail_url"] = release_thumb
+
+        if updates:
+            table = Album.__table__
+            await self.db.execute(
+                update(table)
+                .where(and_(table.c.album_uuid == bindparam("b_uuid"), table.c.discogs_master_id.is_(None)))
+                .values(
+                    discogs_master_id=bindparam("b_master_id"),
+                    discogs_main_release_id=bindparam("b_main_release_id"),
+                    image_url=func.coalesce(table.c.image_url, bindparam("b_image_url")),
+                    image_thumbnail_url=func.coalesce(table.c.image_thumbnail_url, bindparam("b_thumbnail_url")),
+                ),
+                updates,
+            )
+            progress["enriched"] += len(updates)
+        await self.db.commit()
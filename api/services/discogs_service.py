@@ -5,17 +5,15 @@ from models.sqlmodels import DiscogsToken, DiscogsOAuthTemp, TrackVersionAlbumRe
     TrackVersion, TrackArtistBridge
 from models.sqlmodels import Album, AlbumArtistBridge, Artist, Track, Collection, CollectionAlbumBridge, AlbumRelease, \
     AlbumReleaseArtistBridge, CollectionAlbumReleaseBridge
-from sqlmodel import select, delete
+from sqlmodel import select, delete, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from models.appmodels import CollectionRead, AlbumRead, ArtistRead, TrackRead
-from dependencies.discogs_api import DiscogsAPI
-import requests
-import uuid
+from dependencies.discogs_api import DiscogsAPI, collection_watermark
+import httpx
 from datetime import datetime
-import time
 from uuid import UUID
 
-from config import settings
 import logging
 logger = logging.getLogger(__name__)
 
@@ -60,9 +58,7 @@ def parse_date(date_str: str | None) -> datetime | None:
             return None
 
 
-DISCOGS_REQUEST_TOKEN_URL = "https://api.discogs.com/oauth/request_token"
 DISCOGS_AUTHORIZE_URL = "https://www.discogs.com/oauth/authorize"
-DISCOGS_ACCESS_TOKEN_URL = "https://api.discogs.com/oauth/access_token"
 
 
 class DiscogsService:
@@ -95,7 +91,7 @@ class DiscogsService:
         token = token_data.access_token
         secret = token_data.access_token_secret
 
-        release_data = self.api.get_release(release.discogs_release_id, token, secret)
+        release_data = await self.api.get_release(release.discogs_release_id, token, secret)
         if not release_data:
             logger.error(f"❌ Could not fetch release data for release {release.discogs_release_id}")
             return album
@@ -105,7 +101,7 @@ class DiscogsService:
             logger.warning(f"No master_id found in Discogs release: {release.discogs_release_id}")
             return
 
-        master_data = self.api.get_master(master_id, token, secret)
+        master_data = await self.api.get_master(master_id, token, secret)
         main_release_id = master_data.get("main_release")
         images = master_data.get("images", [])
         image_url = next((img["uri"] for img in images if img.get("uri")), None)
@@ -120,7 +116,7 @@ class DiscogsService:
             album.image_thumbnail_url = thumb_url
 
         if album.image_thumbnail_url is None:
-            release_info = self.api.get_release(main_release_id, token, secret)
+            release_info = await self.api.get_release(main_release_id, token, secret)
             if release_info:
                 images = release_info.get("images", [])
                 thumb_url = next((img["uri150"] for img in images if img.get("uri150")), None)
@@ -145,36 +141,16 @@ class DiscogsService:
         if not temp or temp.user_uuid != user_uuid:
             raise HTTPException(status_code=400, detail="Invalid or expired OAuth token")
 
-        token_secret = temp.oauth_token_secret
-        oauth_nonce = uuid.uuid4().hex
-        oauth_timestamp = str(int(time.time()))
-
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": (
-                f'OAuth oauth_consumer_key="{settings.DISCOGS_CONSUMER_KEY}", '
-                f'oauth_nonce="{oauth_nonce}", '
-                f'oauth_token="{oauth_token}", '
-                f'oauth_signature="{settings.DISCOGS_SECRET_KEY}&{token_secret}", '  # Fixed this line
-                f'oauth_signature_method="PLAINTEXT", '
-                f'oauth_timestamp="{oauth_timestamp}", '
-                f'oauth_verifier="{oauth_verifier}"'
-            ),
-            "User-Agent": "VinylScrobbler/1.0",
-        }
-
         try:
-            # Sending request to Discogs API to exchange the OAuth token for an access token
-            response = requests.post(DISCOGS_ACCESS_TOKEN_URL, headers=headers)
-
-            if response.status_code != 200:
-                logger.error(f"Discogs response error: {response.text}")
+            # Exchange the authorized request token for an access token
+            try:
+                access_token, access_token_secret = await self.api.access_token(
+                    oauth_token, temp.oauth_token_secret, oauth_verifier
+                )
+            except (httpx.HTTPError, KeyError) as e:
+                logger.error(f"Discogs response error: {e}")
                 raise HTTPException(status_code=400, detail="Failed to exchange token")
 
-            content = dict(item.split("=") for item in response.text.split("&"))
-            access_token = content["oauth_token"]
-            access_token_secret = content["oauth_token_secret"]
-
             # Clean up the temporary OAuth data from DiscogsOAuthTemp table
             try:
                 await db.delete(temp)
@@ -203,30 +179,10 @@ class DiscogsService:
         return token.access_token
 
     async def get_redirect_url(self, user_uuid: str, db: AsyncSession) -> str:
-        oauth_nonce = str(uuid.uuid4().hex)
-        oauth_timestamp = str(int(time.time()))
-
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": (
-                f'OAuth oauth_consumer_key="{settings.DISCOGS_CONSUMER_KEY}", '
-                f'oauth_nonce="{oauth_nonce}", '
-                f'oauth_signature="{settings.DISCOGS_SECRET_KEY}&", '
-                f'oauth_signature_method="PLAINTEXT", '
-                f'oauth_timestamp="{oauth_timestamp}", '
-                f'oauth_callback="{settings.DISCOGS_CALLBACK_URL}"'
-            ),
-            "User-Agent": "VinylScrobbler/1.0",
-        }
-
-        response = requests.get(DISCOGS_REQUEST_TOKEN_URL, headers=headers)
-
-        if response.status_code != 200:
-            raise Exception(f"Failed to get request token: {response.text}")
-
-        content = dict(item.split("=") for item in response.text.split("&"))
-        oauth_token = content["oauth_token"]
-        oauth_token_secret = content["oauth_token_secret"]
+        try:
+            oauth_token, oauth_token_secret = await self.api.request_token()
+        except (httpx.HTTPError, KeyError) as e:
+            raise Exception(f"Failed to get request token: {e}")
 
         # Store the secret temporarily
         temp = DiscogsOAuthTemp(
@@ -256,7 +212,7 @@ class DiscogsService:
         artist = result.scalars().first()
         if artist:
             return artist
-        artist_details = self.api.get_artist(discogs_id, token, secret)
+        artist_details = await self.api.get_artist(discogs_id, token, secret)
         artist = Artist(
             discogs_artist_id=discogs_id,
             name=artist_details.get("name"),
@@ -460,7 +416,7 @@ class DiscogsService:
                 return album  # If found, return it
 
             # If not found, fetch the master data from the API
-            master_data = self.api.get_master(master_id, token, secret)
+            master_data = await self.api.get_master(master_id, token, secret)
             if not master_data:
                 raise ValueError(f"Master data not found for master_id: {master_id}")
 
@@ -498,7 +454,7 @@ class DiscogsService:
 
             if not artist:
                 logger.info(f"📥 Artist not found in DB, fetching from Discogs API: {discogs_id}")
-                artist_details = self.api.get_artist(discogs_id, token, secret)
+                artist_details = await self.api.get_artist(discogs_id, token, secret)
 
                 logger.info(f"🎨 Retrieved artist details: {artist_details}")
                 artist = Artist(
@@ -641,7 +597,7 @@ class DiscogsService:
             return album_release.album, album_release
 
         logger.debug(f"Getting album and release information: {release_id}")
-        release_data = self.api.get_full_release_details(release_id, token, secret)
+        release_data = await self.api.get_full_release_details(release_id, token, secret)
         album, album_release = await self.add_album_with_release_details(release_data, token, secret, self.db, album)
 
         return album, album_release
@@ -652,13 +608,13 @@ class DiscogsService:
         token = auth.access_token
         secret = auth.access_token_secret
 
-        results = self.api.search(token, secret,type="master", artist=artist, release_title=album, track=track)
+        results = await self.api.search(token, secret,type="master", artist=artist, release_title=album, track=track)
         try:
             largest_community = max(
                 results,
                 key=lambda x: x["community"]["want"] + x["community"]["have"]
             )
-            master_data = self.api.get_master(largest_community["id"], token, secret)
+            master_data = await self.api.get_master(largest_community["id"], token, secret)
             album = await self.create_master_album(master_data, token, secret, db)
 
             result = await db.execute(select(Album)
@@ -676,7 +632,6 @@ class DiscogsService:
             logger.error(f"Failed to get discogs results: {e}")
     def handle_str(self, str):
         str = str.strip()
-        str = str.replace(" ", "+")
         str = str.lower()
 
         return str
@@ -685,9 +640,9 @@ class DiscogsService:
         token = auth.access_token
         secret = auth.access_token_secret
 
-        results = self.api.search(token, secret,type="master", artist=self.handle_str(artist), release_title= self.handle_str(album), track=self.handle_str(track))
+        results = await self.api.search(token, secret,type="master", artist=self.handle_str(artist), release_title= self.handle_str(album), track=self.handle_str(track))
         if not results:
-            results = self.api.search(token, secret,type="master", query=self.handle_str(artist), release_title= self.handle_str(album), track=self.handle_str(track))
+            results = await self.api.search(token, secret,type="master", query=self.handle_str(artist), release_title= self.handle_str(album), track=self.handle_str(track))
             if not results:
                 logger.debug(f"No discogs results found for {artist} {album} {track}")
                 return None
@@ -696,10 +651,10 @@ class DiscogsService:
                 results,
                 key=lambda x: x["community"]["want"] + x["community"]["have"]
             )
-            master_data = self.api.get_master(largest_community["id"], token, secret)
+            master_data = await self.api.get_master(largest_community["id"], token, secret)
             #create album
             album = await self.create_master_album(master_data, token, secret, db)
-            release_data = self.api.get_full_release_details(master_data.get("main_release"), token, secret)
+            release_data = await self.api.get_full_release_details(master_data.get("main_release"), token, secret)
             try:
                 album_release = AlbumRelease(
                     title=release_data["title"],
@@ -745,42 +700,105 @@ class DiscogsService:
             return TrackRead.model_validate(found_track)  # Use model_validate instead of parse_obj
         except Exception as e:
             logger.error(f"Failed to get discogs results: {e}")
-    async def update_user_collection(self, user_uuid: str, db: AsyncSession):
+    async def update_user_collection(self, user_uuid: str, db: AsyncSession, full: bool = False):
+        """
+        Sync the user's collection with Discogs. Incremental unless `full`: only
+        releases added since the collection's watermark are listed, so removals
+        on Discogs are only picked up by a full sync. The watermark never moves
+        past a release that failed, so the next sync tries it again.
+        """
         auth = await self.get_token_for_user(user_uuid, db)
         token = auth.access_token
         secret = auth.access_token_secret
 
-        collection = await self.get_or_create_collection(user_uuid, "Discogs main collection", db)
-        releases = self.api.get_collection(token, secret)
-
-        discogs_release_ids = {r["discogs_release_id"] for r in releases}
-        existing_release_ids = {r.discogs_release_id for r in collection.album_releases}
+        result = await db.execute(select(Collection).where(Collection.user_uuid == user_uuid))
+        collection = result.scalars().first()
+        if not collection:
+            collection = Collection(user_uuid=user_uuid, collection_name="Discogs main collection")
+            db.add(collection)
+            await db.commit()
+        # plain values: a rollback below expires the instance
+        collection_uuid = collection.collection_uuid
+        synced_through = collection.discogs_synced_through
 
-        logger.debug(f"found {len(discogs_release_ids)} releases in collection and {len(discogs_release_ids)} discogs releases ")
+        result = await db.execute(
+            select(AlbumRelease.discogs_release_id, AlbumRelease.album_release_uuid)
+            .join(CollectionAlbumReleaseBridge,
+                  CollectionAlbumReleaseBridge.album_release_uuid == AlbumRelease.album_release_uuid)
+            .where(
+                CollectionAlbumReleaseBridge.collection_uuid == collection_uuid,
+                AlbumRelease.discogs_release_id.is_not(None),
+            )
+        )
+        linked = dict(result.all())
+        releases = await self.api.get_collection(
+            token, secret, added_since=None if full else synced_through
+        )
 
-        # delete releses from collection that are not in discogs collection
-        for existing_release in [existing_release for existing_release in collection.album_releases if existing_release.discogs_release_id not in discogs_release_ids]:
-            logger.debug(f"deleting existing release: {existing_release}")
-            await db.execute(
-                delete(CollectionAlbumReleaseBridge).where(
-                    CollectionAlbumReleaseBridge.album_release_uuid == existing_release.album_release_uuid,
-                    CollectionAlbumReleaseBridge.collection_uuid == collection.collection_uuid,
+        if full:
+            # delete releases from collection that are not in discogs collection
+            discogs_release_ids = {r["discogs_release_id"] for r in releases}
+            removed = [release_uuid for release_id, release_uuid in linked.items() if release_id not in discogs_release_ids]
+            if removed:
+                logger.debug(f"deleting {len(removed)} releases no longer in the Discogs collection")
+                await db.execute(
+                    delete(CollectionAlbumReleaseBridge).where(
+                        CollectionAlbumReleaseBridge.album_release_uuid.in_(removed),
+                        CollectionAlbumReleaseBridge.collection_uuid == collection_uuid,
+                    )
                 )
+                await db.commit()
+
+        # an interrupted sync leaves the watermark alone; the next one lists the
+        # same releases again and skips those that got linked
+        new_ids = list(dict.fromkeys(
+            r["discogs_release_id"] for r in reversed(releases) if r["discogs_release_id"] not in linked
+        ))
+        logger.debug(f"found {len(new_ids)} new releases in the Discogs collection")
+
+        # releases already in the database are resolved in one query
+        existing: dict[int, UUID] = {}
+        if new_ids:
+            result = await db.execute(
+                select(AlbumRelease.discogs_release_id, AlbumRelease.album_release_uuid)
+                .where(AlbumRelease.discogs_release_id.in_(new_ids))
+                .order_by(AlbumRelease.created_at)
             )
-        # insert new releases!
+            for release_id, release_uuid in result.all():
+                existing.setdefault(release_id, release_uuid)
 
-        for release in [release for release in releases if release["discogs_release_id"] not in existing_release_ids]:
-            release_id = release["discogs_release_id"]
+        failed: set[int] = set()
+        for release_id in new_ids:
             logger.debug(f"Retriving and adding release: {release_id}")
             try:
-                album, album_release = await self.get_or_create_album_from_release(release_id, token, secret)
-                await self.link_release_to_collection(album_release.album_release_uuid, collection.collection_uuid)
+                release_uuid = existing.get(release_id)
+                if release_uuid is None:
+                    album, album_release = await self.get_or_create_album_from_release(release_id, token, secret)
+                    release_uuid = album_release.album_release_uuid
+                await db.execute(
+                    insert(CollectionAlbumReleaseBridge)
+                    .values(album_release_uuid=release_uuid, collection_uuid=collection_uuid)
+                    .on_conflict_do_nothing()
+                )
                 await db.commit()
             except Exception as e:
                 # Log the error, but continue processing the next releases
                 logger.error(f"❌ Error processing release {release_id}: {e}")
+                await db.rollback()
+                failed.add(release_id)
                 continue  # Continue with the next release
 
+        watermark = collection_watermark(releases, failed)
+        if watermark:
+            await db.execute(
+                update(Collection)
+                .where(Collection.collection_uuid == collection_uuid)
+                .values(discogs_synced_through=watermark)
+            )
+            await db.commit()
+        if failed:
+            logger.warning(f"{len(failed)} releases failed, the next sync retries them: {sorted(failed)}")
+
         return True
 
     async def get_collection(self, user_uuid: str, db: AsyncSession) -> CollectionRead:
@@ -839,4 +857,4 @@ class DiscogsService:
         auth = await self.get_token_for_user(user_uuid, db)
         token = auth.access_token
         secret = auth.access_token_secret
-        return self.api.get_oauth_identity(token, secret)
+        return await self.api.get_oauth_identity(token, secret)
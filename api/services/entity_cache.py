@@ -0,0 +1,193 @@
+# services/entity_cache.py
+"""
+Process-wide name -> uuid cache for the hot dimension tables: tags, genres
+and artists.
+
+Every recording of every release carries tags and artist credits; resolving
+them through the database each time was the bulk of an ingest's round trips.
+Tags and genres are small and bounded, so they are loaded once per process
+(API lifespan, job worker start, or lazily on first use). Artists grow with
+the library and are resolved on demand into a bounded LRU instead. Either way
+the database is only asked about names the process has not seen recently. Misses are created with INSERT ... ON CONFLICT DO NOTHING on a unique
+key and committed in a session of their own, so a cached uuid always points
+at a committed row, whatever happens to the caller's transaction, and
+concurrent workers converge on the same row.
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from typing import Iterable, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from dependencies.database import async_session
+from models.sqlmodels import Artist, Genre, Tag
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK = 1000  # rows per multi-row INSERT
+ARTIST_CACHE_SIZE = 50_000  # artists kept per process, least recently used first out
+
+
+def normalize_tag_name(name: str) -> str:
+    """The unique key of tags and genres (see uq_tag_name / uq_genre_name)."""
+    name = name.strip().lower()
+    name = re.sub(r"[\.\-_]", " ", name)  # replace punctuation with spaces
+    name = re.sub(r"\s+", " ", name)  # collapse multiple spaces
+    name = name.replace("&", "and")  # common synonym
+    return name.strip()
+
+
+class EntityCache:
+    """
+    Tags and genres are keyed by their normalized name, artists by
+    MusicBrainz id. Artists without an MBID are looked up by exact name among
+    the other artists without one, like before; names are not unique, so
+    those are not race-safe.
+    """
+
+    def __init__(self, artist_cache_size: int = ARTIST_CACHE_SIZE):
+        self.tags: dict[str, UUID] = {}
+        self.genres: dict[str, UUID] = {}
+        # keyed by (mbid, None) or, for artists without an MBID, (None, name)
+        self.artists: OrderedDict[tuple[Optional[str], Optional[str]], UUID] = OrderedDict()
+        self.artist_cache_size = artist_cache_size
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    async def preload(self):
+        async with self._lock:
+            if self.loaded:
+                return
+            async with async_session() as db:
+                result = await db.execute(select(Tag.name, Tag.tag_uuid))
+                self.tags.update(result.all())
+                result = await db.execute(select(Genre.name, Genre.genre_uuid))
+                self.genres.update(result.all())
+            self.loaded = True
+            logger.info(f"🗂 Entity cache loaded: {len(self.tags)} tags, {len(self.genres)} genres")
+
+    def clear(self):
+        self.tags.clear()
+        self.genres.clear()
+        self.artists.clear()
+        self.loaded = False
+
+    async def tag_uuids(self, names: Iterable[str]) -> dict[str, UUID]:
+        """Map tag names (as given) to tag uuids, creating the missing tags."""
+        return await self._resolve_names(Tag, Tag.tag_uuid, "tag_uuid", self.tags, names)
+
+    async def genre_uuids(self, names: Iterable[str]) -> dict[str, UUID]:
+        """Map genre names (as given) to genre uuids, creating the missing genres."""
+        return await self._resolve_names(Genre, Genre.genre_uuid, "genre_uuid", self.genres, names)
+
+    async def _resolve_names(self, model, uuid_column, uuid_field: str, cache: dict[str, UUID], names) -> dict[str, UUID]:
+        if not self.loaded:
+            await self.preload()
+        keys = {name: normalize_tag_name(name) for name in names}
+        missing = {key for key in keys.values() if key and key not in cache}
+        if missing:
+            created: dict[str, UUID] = {}
+            async with async_session() as db:
+                for chunk in _chunks(sorted(missing)):
+                    result = await db.execute(
+                        insert(model).values([{uuid_field: uuid4(), "name": key} for key in chunk])
+                        .on_conflict_do_nothing(index_elements=["name"])
+                        .returning(model.name, uuid_column)
+                    )
+                    created.update(result.all())
+                raced = missing - created.keys()
+                if raced:
+                    # created concurrently by another worker
+                    result = await db.execute(select(model.name, uuid_column).where(model.name.in_(raced)))
+                    created.update(result.all())
+                await db.commit()
+            cache.update(created)
+        return {name: cache[key] for name, key in keys.items() if key}
+
+    async def artist_uuids(self, credits: Iterable[tuple[Optional[str], str]]) -> dict[tuple, UUID]:
+        """Map (mbid, name) credits to artist uuids, creating the missing artists."""
+        credits = set(credits)
+        keys = {(mbid, name): (mbid, None) if mbid else (None, name) for mbid, name in credits}
+        found: dict[tuple, UUID] = {}
+        for key in set(keys.values()):
+            artist_uuid = self.artists.get(key)
+            if artist_uuid is not None:
+                self.artists.move_to_end(key)
+                found[key] = artist_uuid
+        missing_mbids = {mbid: name for mbid, name in credits if mbid and (mbid, None) not in found}
+        missing_names = {name for mbid, name in credits if not mbid and (None, name) not in found}
+
+        if missing_mbids or missing_names:
+            by_mbid: dict[str, UUID] = {}
+            by_name: dict[str, UUID] = {}
+            async with async_session() as db:
+                for chunk in _chunks(sorted(missing_mbids)):
+                    result = await db.execute(
+                        select(Artist.musicbrainz_artist_id, Artist.artist_uuid)
+                        .where(Artist.musicbrainz_artist_id.in_(chunk))
+                    )
+                    by_mbid.update(result.all())
+                new = sorted((mbid, name) for mbid, name in missing_mbids.items() if mbid not in by_mbid)
+                for chunk in _chunks(new):
+                    result = await db.execute(
+                        insert(Artist)
+                        .values([
+                            {"artist_uuid": uuid4(), "name": name, "musicbrainz_artist_id": mbid}
+                            for mbid, name in chunk
+                        ])
+                        .on_conflict_do_nothing(index_elements=["musicbrainz_artist_id"])
+                        .returning(Artist.musicbrainz_artist_id, Artist.artist_uuid)
+                    )
+                    by_mbid.update(result.all())
+                raced = missing_mbids.keys() - by_mbid.keys()
+                if raced:
+                    # created concurrently by another worker
+                    result = await db.execute(
+                        select(Artist.musicbrainz_artist_id, Artist.artist_uuid)
+                        .where(Artist.musicbrainz_artist_id.in_(raced))
+                    )
+                    by_mbid.update(result.all())
+
+                if missing_names:
+                    # homonyms with an MBID are other artists; of those without one, the oldest wins
+                    result = await db.execute(
+                        select(Artist.name, Artist.artist_uuid)
+                        .where(Artist.name.in_(missing_names), Artist.musicbrainz_artist_id.is_(None))
+                        .order_by(Artist.created_at)
+                    )
+                    for name, artist_uuid in result.all():
+                        by_name.setdefault(name, artist_uuid)
+                    rows = [{"artist_uuid": uuid4(), "name": name} for name in missing_names if name not in by_name]
+                    for chunk in _chunks(rows):
+                        await db.execute(insert(Artist).values(chunk))
+                    by_name.update({row["name"]: row["artist_uuid"] for row in rows})
+                await db.commit()
+
+            # only committed rows enter the cache
+            resolved = {(mbid, None): artist_uuid for mbid, artist_uuid in by_mbid.items()}
+            resolved.update({(None, name): artist_uuid for name, artist_uuid in by_name.items()})
+            for key, artist_uuid in resolved.items():
+                self._remember(key, artist_uuid)
+            found.update(resolved)
+
+        return {credit: found[key] for credit, key in keys.items()}
+
+    def _remember(self, key: tuple, artist_uuid: UUID):
+        self.artists[key] = artist_uuid
+        self.artists.move_to_end(key)
+        while len(self.artists) > self.artist_cache_size:
+            self.artists.popitem(last=False)
+
+
+def _chunks(items: list) -> Iterable[list]:
+    for i in range(0, len(items), INSERT_CHUNK):
+        yield items[i:i + INSERT_CHUNK]
+
+
+# Singleton instance
+entity_cache = EntityCache()
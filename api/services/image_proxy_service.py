@@ -0,0 +1,196 @@
+# services/image_proxy_service.py
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from uuid import UUID
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from dependencies.image_fetch_api import ImageFetchAPI
+from models.sqlmodels import Album, Collection, CollectionAlbumBridge
+from services.artwork_service import ARTWORK_DIR, THUMBNAIL_SIZES, artwork_digest, artwork_service
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = settings.get("IMAGE_CACHE_DIR", os.path.join(ARTWORK_DIR, "proxy"))
+IMAGE_CACHE_MAX_BYTES = int(settings.get("IMAGE_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+EVICT_TO_RATIO = 0.9  # evict down to this share of the cap so we don't evict on every write
+TOUCH_INTERVAL = 3600  # seconds; don't rewrite mtime on every hit
+WARMUP_CONCURRENCY = 4
+
+
+def url_key(image_url: str) -> str:
+    return hashlib.blake2b(image_url.encode(), digest_size=16).hexdigest()
+
+
+def _scan_cache(cache_dir: str) -> list[tuple[float, int, str]]:
+    """(mtime, size, path) of every cached file; runs in a thread."""
+    entries = []
+    for root, _, names in os.walk(cache_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _evict(cache_dir: str, max_bytes: int) -> int:
+    """Delete least recently used files until the cache is under the target size."""
+    entries = _scan_cache(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return total
+    target = int(max_bytes * EVICT_TO_RATIO)
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        if path.endswith(".tmp"):
+            continue  # another request is still writing it
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+    return total
+
+
+def _touch(path: str):
+    try:
+        if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+    except OSError:
+        pass
+
+
+class ImageProxyService:
+    """
+    Serves remote album art (Cover Art Archive, Discogs) from a local resize cache.
+    - Each original is fetched once; concurrent requests for the same URL share one fetch
+    - Variants for THUMBNAIL_SIZES are rendered in the artwork process pool
+    - The cache is capped at IMAGE_CACHE_MAX_BYTES, evicting least recently used files (by mtime)
+    """
+
+    def __init__(self, fetcher=None, cache_dir: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        # anything with `async fetch(url) -> bytes | None`
+        self.fetcher = fetcher or ImageFetchAPI()
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._cache_bytes: int | None = None
+        self._evicting = False
+
+    def _original_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.orig")
+
+    def _variant_path(self, key: str, size: int) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{size}.jpg")
+
+    async def get_variant(self, image_url: str, size: int) -> str | None:
+        """Path of the cached `size` variant of `image_url`, fetching and rendering it on a miss."""
+        if size not in THUMBNAIL_SIZES:
+            return None
+        key = url_key(image_url)
+        path = self._variant_path(key, size)
+        if os.path.exists(path):
+            _touch(path)
+            # the original is only read on a re-render; keep it from looking the least used
+            _touch(self._original_path(key))
+            return path
+
+        # singleflight: concurrent misses for the same URL wait on one fetch
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._render(image_url, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        if not await asyncio.shield(task):
+            return None
+        return path if os.path.exists(path) else None
+
+    async def _render(self, image_url: str, key: str) -> bool:
+        original = self._original_path(key)
+        data = None
+        if os.path.exists(original):
+            with open(original, "rb") as f:
+                data = f.read()
+        else:
+            data = await self.fetcher.fetch(image_url)
+            if not data:
+                return False
+            os.makedirs(os.path.dirname(original), exist_ok=True)
+            tmp_path = f"{original}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, original)
+
+        targets = {size: self._variant_path(key, size) for size in THUMBNAIL_SIZES}
+        try:
+            await artwork_service.render_thumbnails(data, targets)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not resize {image_url}: {e}")
+            return False
+
+        written = len(data) + sum(
+            os.path.getsize(p) for p in targets.values() if os.path.exists(p)
+        )
+        await self._account(written)
+        return True
+
+    async def _account(self, written: int):
+        if self._cache_bytes is None:
+            entries = await asyncio.to_thread(_scan_cache, self.cache_dir)
+            self._cache_bytes = sum(size for _, size, _ in entries)
+        else:
+            self._cache_bytes += written
+        if self._cache_bytes > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                self._cache_bytes = await asyncio.to_thread(_evict, self.cache_dir, self.max_bytes)
+                logger.info(f"🧹 Image cache evicted down to {self._cache_bytes // (1024 * 1024)} MiB")
+            finally:
+                self._evicting = False
+
+    async def get_album_image_url(self, db: AsyncSession, album_uuid: UUID) -> str | None:
+        result = await db.execute(select(Album.image_url).where(Album.album_uuid == album_uuid))
+        return result.scalar_one_or_none()
+
+    async def warm_collection(self, db: AsyncSession, user_uuid: UUID, on_progress=None) -> dict:
+        """Pre-fetch and resize the art of every album in the user's collections."""
+        result = await db.execute(
+            select(Album.image_url)
+            .join(CollectionAlbumBridge, CollectionAlbumBridge.album_uuid == Album.album_uuid)
+            .join(Collection, Collection.collection_uuid == CollectionAlbumBridge.collection_uuid)
+            .where(Collection.user_uuid == user_uuid, Album.image_url.is_not(None))
+            .distinct()
+        )
+        # locally extracted art is already on disk
+        urls = [url for url in result.scalars().all() if url.startswith("http") and not artwork_digest(url)]
+        progress = {"albums": len(urls), "cached": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+        async def warm(url: str):
+            async with semaphore:
+                path = await self.get_variant(url, max(THUMBNAIL_SIZES))
+            progress["cached" if path else "failed"] += 1
+            if on_progress:
+                await on_progress(progress)
+
+        await asyncio.gather(*(warm(url) for url in urls))
+        logger.info(f"🎨 Warmed image cache for {user_uuid}: {progress}")
+        return progress
+
+    async def close(self):
+        close = getattr(self.fetcher, "close", None)
+        if close:
+            await close()
+
+
+# Singleton instance
+image_proxy_service = ImageProxyService()
@@ -0,0 +1,196 @@
+# services/job_service.py
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import and_, exists, or_, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import dependencies.redis as redis_dep
+from config import settings
+from models.sqlmodels import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+# a running job whose worker stopped heartbeating is handed to another worker
+STALE_JOB_AFTER = timedelta(minutes=5)
+# claims per job; a job that keeps taking its worker down is failed instead of retried forever
+MAX_JOB_ATTEMPTS = int(settings.get("MAX_JOB_ATTEMPTS", 3))
+# job types whose jobs must run one at a time and in order per user, e.g. the
+# watcher's batches, where a later batch may touch what an earlier one moved
+SERIAL_JOB_TYPES = ("library_changes",)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobService:
+    """
+    Persistence for BackgroundJob rows. The API enqueues jobs, workers claim
+    them with SELECT ... FOR UPDATE SKIP LOCKED, checkpoint their cursor and
+    progress, and finish them. A job whose heartbeat went stale (worker
+    restarted or crashed) is claimed again and resumes from its cursor.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(
+            self,
+            job_type: str,
+            user_uuid: UUID | None = None,
+            params: dict | None = None,
+            dedupe: bool = True,
+    ) -> BackgroundJob:
+        """Create a queued job; with `dedupe`, return the user's active job of the same type instead."""
+        if dedupe:
+            result = await self.db.execute(
+                select(BackgroundJob)
+                .where(
+                    BackgroundJob.job_type == job_type,
+                    BackgroundJob.user_uuid == user_uuid,
+                    BackgroundJob.status.in_(ACTIVE_STATUSES),
+                )
+                .order_by(BackgroundJob.created_at)
+                .limit(1)
+            )
+            existing = result.scalar_one_or_none()
+            if existing:
+                return existing
+
+        job = BackgroundJob(job_type=job_type, user_uuid=user_uuid, params=params or {})
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        logger.info(f"🗂 Queued {job_type} job {job.job_uuid}")
+        return job
+
+    async def get_job(self, job_uuid: UUID, user_uuid: UUID | None = None) -> BackgroundJob | None:
+        stmt = select(BackgroundJob).where(BackgroundJob.job_uuid == job_uuid)
+        if user_uuid:
+            stmt = stmt.where(BackgroundJob.user_uuid == user_uuid)
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def claim_next(self, worker: str, job_types: list[str]) -> BackgroundJob | None:
+        """
+        Claim the oldest queued (or stale running) job of the given types. A
+        stale job that already had MAX_JOB_ATTEMPTS claims is failed and
+        skipped. Jobs of SERIAL_JOB_TYPES are only claimed once the earlier
+        jobs of the same type and user have finished.
+        """
+        while True:
+            job = await self._claim_oldest(worker, job_types)
+            if job is None or job.attempts <= MAX_JOB_ATTEMPTS:
+                return job
+            logger.error(f"💀 Giving up on {job.job_type} job {job.job_uuid} after {MAX_JOB_ATTEMPTS} attempts")
+            await self.finish(job.job_uuid, error=f"Gave up after {MAX_JOB_ATTEMPTS} attempts (worker lost each time)")
+            await publish_job_event(job, JOB_FAILED, job.progress or {}, job.cursor)
+
+    async def _claim_oldest(self, worker: str, job_types: list[str]) -> BackgroundJob | None:
+        now = _now()
+        earlier = aliased(BackgroundJob)
+        result = await self.db.execute(
+            select(BackgroundJob)
+            .where(
+                BackgroundJob.job_type.in_(job_types),
+                or_(
+                    BackgroundJob.status == JOB_QUEUED,
+                    and_(
+                        BackgroundJob.status == JOB_RUNNING,
+                        BackgroundJob.heartbeat_at < now - STALE_JOB_AFTER,
+                    ),
+                ),
+                # a serial job waits until every earlier job of its type and user is done;
+                # the earlier one counts even while another worker holds its row lock
+                or_(
+                    BackgroundJob.job_type.not_in(SERIAL_JOB_TYPES),
+                    ~exists().where(
+                        earlier.job_type == BackgroundJob.job_type,
+                        earlier.user_uuid.is_not_distinct_from(BackgroundJob.user_uuid),
+                        earlier.status.in_(ACTIVE_STATUSES),
+                        tuple_(earlier.created_at, earlier.job_uuid)
+                        < tuple_(BackgroundJob.created_at, BackgroundJob.job_uuid),
+                    ),
+                ),
+            )
+            .order_by(BackgroundJob.created_at, BackgroundJob.job_uuid)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalar_one_or_none()
+        if not job:
+            await self.db.rollback()
+            return None
+
+        if job.status == JOB_RUNNING:
+            logger.warning(f"♻️ Reclaiming stale {job.job_type} job {job.job_uuid} from {job.worker}")
+        job.status = JOB_RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.error = None
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def heartbeat(self, job_uuid: UUID):
+        await self.db.execute(
+            update(BackgroundJob).where(BackgroundJob.job_uuid == job_uuid).values(heartbeat_at=_now())
+        )
+        await self.db.commit()
+
+    async def checkpoint(self, job_uuid: UUID, cursor: str | None, progress: dict):
+        """Persist the resume cursor and progress counters of a running job."""
+        await self.db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.job_uuid == job_uuid)
+            .values(cursor=cursor, progress=progress, heartbeat_at=_now())
+        )
+        await self.db.commit()
+
+    async def finish(self, job_uuid: UUID, progress: dict | None = None, error: str | None = None):
+        values = {
+            "status": JOB_FAILED if error else JOB_COMPLETED,
+            "error": error,
+            "finished_at": _now(),
+            "heartbeat_at": _now(),
+        }
+        if progress is not None:
+            values["progress"] = progress
+        await self.db.execute(
+            update(BackgroundJob).where(BackgroundJob.job_uuid == job_uuid).values(**values)
+        )
+        await self.db.commit()
+
+
+async def publish_job_event(job: BackgroundJob, status: str, progress: dict, cursor: str | None = None):
+    """Publish job progress on the owner's SSE channel (no-op without Redis or owner)."""
+    if redis_dep.redis_client is None or job.user_uuid is None:
+        return
+    payload = {
+        "rev": 0,
+        "type": "job_progress",
+        "ts": int(time.time() * 1000),
+        "job_uuid": str(job.job_uuid),
+        "job_type": job.job_type,
+        "status": status,
+        "cursor": cursor,
+        "progress": progress,
+    }
+    try:
+        await redis_dep.redis_client.publish(f"us:user:{job.user_uuid}", json.dumps(payload))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not publish progress for job {job.job_uuid}: {e}")
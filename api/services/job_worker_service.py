@@ -0,0 +1,231 @@
+# services/job_worker_service.py
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable
+
+import dependencies.redis as redis_dep
+from dependencies.database import async_session
+from dependencies.response_cache import response_cache
+from models.sqlmodels import BackgroundJob
+from services.collection_service import CollectionService, LibraryScanState
+from services.cover_art_backfill_service import COVER_ART_CONCURRENCY, CoverArtBackfillService
+from services.discogs_enrichment_service import DISCOGS_ENRICH_CONCURRENCY, DiscogsEnrichmentService
+from services.discogs_service import DiscogsService
+from services.entity_cache import entity_cache
+from services.image_proxy_service import image_proxy_service
+from dependencies.discogs_api import DiscogsAPI
+from services.job_service import (
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_RUNNING,
+    JobService,
+    publish_job_event,
+)
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5
+HEARTBEAT_SECONDS = 30
+CHECKPOINT_SECONDS = 5  # at most one checkpoint/progress event per interval
+PURGE_SECONDS = 3600  # how often an idle worker purges expired API responses
+
+
+class JobContext:
+    """What a job handler gets: the claimed job plus checkpoint/progress reporting."""
+
+    def __init__(self, job: BackgroundJob):
+        self.job = job
+        self._last_report = 0.0
+
+    @property
+    def params(self) -> dict:
+        return self.job.params or {}
+
+    async def report(self, cursor: str | None, progress: dict, force: bool = False):
+        """Checkpoint the job and publish its progress, throttled to CHECKPOINT_SECONDS."""
+        now = time.monotonic()
+        if not force and now - self._last_report < CHECKPOINT_SECONDS:
+            return
+        self._last_report = now
+        async with async_session() as db:
+            await JobService(db).checkpoint(self.job.job_uuid, cursor, progress)
+        await publish_job_event(self.job, JOB_RUNNING, progress, cursor)
+
+    async def heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            try:
+                async with async_session() as db:
+                    await JobService(db).heartbeat(self.job.job_uuid)
+            except Exception as e:
+                logger.warning(f"⚠️ Heartbeat failed for job {self.job.job_uuid}: {e}")
+
+
+JobHandler = Callable[[JobContext], Awaitable[dict | None]]
+
+
+class JobWorkerService:
+    """
+    Runs BackgroundJob rows outside the API processes (scripts/job_worker.py).
+    - Claims jobs with SELECT ... FOR UPDATE SKIP LOCKED, so workers can run side by side
+    - Dispatches on job_type to a registered handler
+    - Handlers checkpoint cursor/progress; progress is published on the user's SSE channel
+    - Jobs of a dead worker are reclaimed once their heartbeat is stale and resume from the cursor
+    """
+
+    def __init__(self):
+        self.handlers: dict[str, JobHandler] = {
+            "library_scan": self._run_library_scan,
+            "library_changes": self._run_library_changes,
+            "artwork_warmup": self._run_artwork_warmup,
+            "cover_art_backfill": self._run_cover_art_backfill,
+            "discogs_import": self._run_discogs_import,
+            "discogs_enrichment": self._run_discogs_enrichment,
+        }
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    def register(self, job_type: str, handler: JobHandler):
+        self.handlers[job_type] = handler
+
+    async def _run_library_scan(self, ctx: JobContext) -> dict:
+        async def on_directory(root: str, state: LibraryScanState):
+            await ctx.report(root, state.progress())
+
+        async with async_session() as db:
+            service = CollectionService(db)
+            progress = await service.scan_directory(
+                user_uuid=ctx.job.user_uuid,
+                # a resumed job must not wipe the caches it already rebuilt
+                overwrite=bool(ctx.params.get("overwrite")) and not ctx.job.cursor,
+                resume_after=ctx.job.cursor,
+                on_directory=on_directory,
+            )
+            # the scan leaves Cover Art Archive lookups to the backfill
+            await JobService(db).enqueue("cover_art_backfill", ctx.job.user_uuid)
+            return progress
+
+    async def _run_library_changes(self, ctx: JobContext) -> dict:
+        """Apply what the library watcher saw; every step is safe to repeat after a reclaim."""
+        moves = [tuple(move) for move in ctx.params.get("moves", [])]
+        directories = ctx.params.get("directories", [])
+        deleted = ctx.params.get("deleted", [])
+
+        async with async_session() as db:
+            service = CollectionService(db)
+            if moves:
+                await service.relocate_library_paths(moves)
+            # scan before forgetting deletions, so cross-filesystem moves
+            # (delete + create) are still relinked by fingerprint
+            if directories:
+                await service.scan_paths(directories)
+            if deleted:
+                await service.remove_library_paths(deleted)
+        return {"moves": len(moves), "directories": len(directories), "deleted": len(deleted)}
+
+    async def _run_artwork_warmup(self, ctx: JobContext) -> dict:
+        async def on_progress(progress: dict):
+            await ctx.report(None, dict(progress))
+
+        async with async_session() as db:
+            return await image_proxy_service.warm_collection(db, ctx.job.user_uuid, on_progress=on_progress)
+
+    async def _run_cover_art_backfill(self, ctx: JobContext) -> dict:
+        async def on_batch(cursor: str, progress: dict):
+            # every batch is committed before this runs, so the cursor is always safe to resume from
+            await ctx.report(cursor, progress, force=True)
+
+        async with async_session() as db:
+            service = CoverArtBackfillService(db, concurrency=int(ctx.params.get("concurrency", COVER_ART_CONCURRENCY)))
+            return await service.run(resume_after=ctx.job.cursor, on_batch=on_batch)
+
+    async def _run_discogs_import(self, ctx: JobContext) -> dict:
+        async def on_progress(cursor: str | None, progress: dict):
+            await ctx.report(cursor, progress)
+
+        async with async_session() as db:
+            service = CollectionService(db)
+            progress = await service.process_collection(
+                ctx.job.user_uuid,
+                full=bool(ctx.params.get("full")),
+                resume_after=ctx.job.cursor,
+                on_progress=on_progress,
+            )
+            # imports leave Cover Art Archive lookups to the backfill
+            await JobService(db).enqueue("cover_art_backfill", ctx.job.user_uuid)
+            return progress
+
+    async def _run_discogs_enrichment(self, ctx: JobContext) -> dict:
+        async def on_batch(cursor: str, progress: dict):
+            # every batch is committed before this runs, so the cursor is always safe to resume from
+            await ctx.report(cursor, progress, force=True)
+
+        async with async_session() as db:
+            auth = await DiscogsService(db).get_token_for_user(ctx.job.user_uuid, db)
+            service = DiscogsEnrichmentService(
+                db, auth.access_token, auth.access_token_secret,
+                concurrency=int(ctx.params.get("concurrency", DISCOGS_ENRICH_CONCURRENCY)),
+            )
+            return await service.run(resume_after=ctx.job.cursor, on_batch=on_batch)
+
+    async def run_job(self, job: BackgroundJob):
+        handler = self.handlers[job.job_type]
+        ctx = JobContext(job)
+        logger.info(f"▶️ Running {job.job_type} job {job.job_uuid} (attempt {job.attempts}, cursor={job.cursor})")
+        heartbeat = asyncio.create_task(ctx.heartbeat_loop())
+        try:
+            progress = await handler(ctx) or {}
+        except Exception as e:
+            logger.exception(f"💥 Job {job.job_uuid} failed: {e}")
+            async with async_session() as db:
+                await JobService(db).finish(job.job_uuid, error=str(e))
+            await publish_job_event(job, JOB_FAILED, job.progress or {})
+            return
+        finally:
+            heartbeat.cancel()
+
+        async with async_session() as db:
+            await JobService(db).finish(job.job_uuid, progress=progress)
+        await publish_job_event(job, JOB_COMPLETED, progress)
+        logger.info(f"✅ Finished {job.job_type} job {job.job_uuid}")
+
+    async def _purge_response_cache(self):
+        """Housekeeping between jobs; concurrent workers just delete nothing."""
+        try:
+            await response_cache.purge_expired()
+        except Exception as e:
+            logger.warning(f"⚠️ Purging the API response cache failed: {e}")
+
+    async def run(self, job_types: list[str] | None = None):
+        """Poll for jobs forever."""
+        job_types = job_types or list(self.handlers)
+
+        try:
+            await redis_dep.init_redis()
+        except Exception as e:
+            logger.warning(f"⚠️ Redis unavailable, job progress will not be published: {e}")
+        await entity_cache.preload()
+
+        logger.info(f"👷 Job worker {self.worker} started for {', '.join(job_types)}")
+        last_purge = 0.0
+        try:
+            while True:
+                async with async_session() as db:
+                    job = await JobService(db).claim_next(self.worker, job_types)
+                if job is None:
+                    if time.monotonic() - last_purge >= PURGE_SECONDS:
+                        last_purge = time.monotonic()
+                        await self._purge_response_cache()
+                    await asyncio.sleep(POLL_SECONDS)
+                    continue
+                await self.run_job(job)
+        finally:
+            await image_proxy_service.close()
+            await DiscogsAPI.close()
+            await redis_dep.close_redis()
+
+
+# Singleton instance
+job_worker_service = JobWorkerService()
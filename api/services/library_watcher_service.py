@@ -0,0 +1,227 @@
+# services/library_watcher_service.py
+import asyncio
+import logging
+import os
+import socket
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+import dependencies.redis as redis_dep
+from dependencies.database import async_session
+from services.collection_service import AUDIO_EXTENSIONS
+from services.job_service import JobService
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "library_watcher_lock"
+LOCK_TTL = 30  # seconds
+
+# KEYS[1] lock, ARGV[1] our value, ARGV[2] ttl in ms; only ever touch a lock we still hold
+REFRESH_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _is_audio(path: str) -> bool:
+    return path.lower().endswith(AUDIO_EXTENSIONS)
+
+
+class _EventForwarder(FileSystemEventHandler):
+    """Hands watchdog events from the observer thread over to the asyncio loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+
+    def on_any_event(self, event: FileSystemEvent):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class LibraryWatcherService:
+    """
+    Singleton service that keeps the digital library in sync with MUSIC_DIR.
+    - Uses inotify (through watchdog) instead of walking the whole tree
+    - Debounces create/move/delete events and batches them per album directory
+    - Moves rewrite LibraryTrack.path in place, no re-resolution
+    - Changes are applied by a "library_changes" job, so tag reading and
+      fingerprinting never run in the API process
+    - Only one worker watches at a time (Redis lock, like the heartbeat loop); the
+      lock is kept alive by its own task, so a long flush never lets it expire
+    """
+
+    def __init__(self, music_dir: str = settings.MUSIC_DIR, debounce_seconds: float | None = None):
+        self.music_dir = music_dir
+        self.debounce_seconds = debounce_seconds or float(settings.get("WATCH_DEBOUNCE_SECONDS", 10))
+        self._task: asyncio.Task | None = None
+        self._lock_value = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._dirty_dirs: set[str] = set()
+        self._moves: list[tuple[str, str]] = []
+        self._deleted: list[str] = []
+        self._last_event_at = 0.0
+
+    @property
+    def _has_pending(self) -> bool:
+        return bool(self._dirty_dirs or self._moves or self._deleted)
+
+    def _record(self, event: FileSystemEvent):
+        src = os.fsdecode(event.src_path)
+        dest = os.fsdecode(event.dest_path) if getattr(event, "dest_path", None) else None
+
+        if event.event_type == "moved":
+            if event.is_directory or _is_audio(src):
+                self._moves.append((src, dest))
+                self._dirty_dirs.add(dest if event.is_directory else os.path.dirname(dest))
+            elif _is_audio(dest):
+                # e.g. tag editors writing a temp file and renaming it into place
+                self._dirty_dirs.add(os.path.dirname(dest))
+        elif event.event_type == "deleted":
+            if event.is_directory or _is_audio(src):
+                self._deleted.append(src)
+        elif event.is_directory:
+            if event.event_type == "created":
+                self._dirty_dirs.add(src)
+        elif _is_audio(src):
+            # created / modified / closed
+            self._dirty_dirs.add(os.path.dirname(src))
+        else:
+            return
+
+        self._last_event_at = asyncio.get_running_loop().time()
+
+    async def _flush(self):
+        moves, deleted, dirty = self._moves, self._deleted, self._dirty_dirs
+        self._moves, self._deleted, self._dirty_dirs = [], [], set()
+
+        # paths that were deleted but already came back are rescanned instead
+        deleted = [p for p in deleted if not os.path.exists(p)]
+
+        # only keep the outermost existing directories, scan_paths recurses
+        existing = sorted(d for d in dirty if os.path.isdir(d))
+        directories: list[str] = []
+        for d in existing:
+            if not any(d.startswith(parent.rstrip(os.sep) + os.sep) for parent in directories):
+                directories.append(d)
+
+        logger.info(
+            f"📂 Library changes: {len(moves)} moves, {len(deleted)} deletions, "
+            f"{len(directories)} directories to scan"
+        )
+
+        try:
+            async with async_session() as db:
+                # one job per flush; SERIAL_JOB_TYPES makes workers apply them one at a time, in order
+                await JobService(db).enqueue(
+                    "library_changes",
+                    params={"moves": moves, "directories": directories, "deleted": deleted},
+                    dedupe=False,
+                )
+        except Exception as e:
+            logger.error(f"❌ Failed to queue library changes: {e}")
+
+    async def _acquire_lock(self):
+        while True:
+            if redis_dep.redis_client is None:
+                return
+            got_lock = await redis_dep.redis_client.set(
+                LOCK_KEY, self._lock_value, ex=LOCK_TTL, nx=True
+            )
+            if got_lock:
+                return
+            await asyncio.sleep(LOCK_TTL)
+
+    async def _keep_lock(self):
+        """Refresh the lock every LOCK_TTL / 3; returns once another worker holds it."""
+        while True:
+            await asyncio.sleep(LOCK_TTL / 3)
+            client = redis_dep.redis_client
+            if client is None:
+                continue
+            try:
+                held = await client.eval(REFRESH_LOCK_LUA, 1, LOCK_KEY, self._lock_value, LOCK_TTL * 1000)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not refresh library watcher lock: {e}")
+                continue
+            if not held:
+                return
+
+    async def _release_lock(self):
+        if redis_dep.redis_client is None:
+            return
+        try:
+            await redis_dep.redis_client.eval(RELEASE_LOCK_LUA, 1, LOCK_KEY, self._lock_value)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not release library watcher lock: {e}")
+
+    async def _run(self):
+        while True:
+            await self._acquire_lock()
+            keeper = asyncio.create_task(self._keep_lock())
+            watcher = asyncio.create_task(self._watch())
+            try:
+                done, _ = await asyncio.wait({keeper, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in (keeper, watcher):
+                    task.cancel()
+                await asyncio.gather(keeper, watcher, return_exceptions=True)
+                await self._release_lock()
+            if watcher in done:
+                return watcher.result()
+            logger.warning("🔒 Library watcher lock taken over by another worker, waiting to reacquire")
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        observer = Observer()
+        observer.schedule(_EventForwarder(loop, queue), self.music_dir, recursive=True)
+        observer.start()
+        logger.info(f"👀 Watching {self.music_dir} for library changes")
+
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=1.0)
+                    self._record(event)
+                except asyncio.TimeoutError:
+                    pass
+
+                now = loop.time()
+                if self._has_pending and now - self._last_event_at >= self.debounce_seconds:
+                    await self._flush()
+        except asyncio.CancelledError:
+            logger.info("🛑 Library watcher cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"💥 Library watcher crashed: {e}")
+            raise
+        finally:
+            observer.stop()
+            await asyncio.to_thread(observer.join)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            logger.info("▶️ Starting library watcher…")
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            logger.info("⏹️ Stopping library watcher…")
+            self._task.cancel()
+            self._task = None
+
+
+# Singleton instance
+library_watcher_service = LibraryWatcherService()
@@ -106,7 +106,7 @@ class ListenBrainzService:
 
                 if not db_artist:
                     try:
-                        db_artist = await mb_service.get_or_create_artist_by_mbid(mbid)
+                        db_artist = await mb_service.get_or_create_artist_by_mbid(mbid, shallow=True)
                     except Exception as e:
                         logger.warning(f"⚠️ Failed to fetch MB artist {mbid}: {e}")
 
@@ -28,12 +28,15 @@ from fastapi import HTTPException
 from typing import List, Optional
 import logging
 import re
+from datetime import datetime, timedelta, timezone
 from dependencies.musicbrainz_api import MusicBrainzAPI
 from services.musicbrainz_service import MusicBrainzService
 musicbrainz_api = MusicBrainzAPI()
 
 logger = logging.getLogger(__name__)
 
+DISCOGRAPHY_TTL = timedelta(days=30)  # re-sync an artist's release groups after this
+
 def normalize_track_number(raw: str) -> Optional[int]:
     """
     Convert vinyl-style track numbers like 'A1', 'C5', 'D12'
@@ -211,8 +214,23 @@ class MusicService:
         return album_read
 
     async def get_artist(self, artist_uuid: UUID) -> ArtistRead:
+        # 🔹 Sync the full discography if only shallow albums were staged
+        artist = await self.db.get(Artist, artist_uuid)
+        if artist and artist.musicbrainz_artist_id and (
+                artist.release_groups_synced_at is None
+                or artist.release_groups_synced_at < datetime.now(timezone.utc) - DISCOGRAPHY_TTL
+        ):
+            mb_service = MusicBrainzService(self.db, musicbrainz_api)
+            try:
+                await mb_service.sync_artist_discography(artist)
+                await self.db.commit()
+            except Exception as e:
+                await self.db.rollback()
+                logger.warning(f"⚠️ Failed to sync discography of {artist_uuid}: {e}")
+
         result = await self.db.execute(
             select(Artist)
+            .execution_options(populate_existing=True)
             .where(Artist.artist_uuid == artist_uuid)
             .options(
                 selectinload(Artist.albums).selectinload(Album.tracks),
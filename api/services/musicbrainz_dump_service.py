@@ -0,0 +1,394 @@
+# services/musicbrainz_dump_service.py
+"""
+Offline import of the MusicBrainz JSON data dump (the `release` entity file).
+
+The parse layer (open_dump_lines, parse_release, ReleaseFilter, discogs_links,
+release_resolutions) is pure and works on any iterable of lines, so it can be
+exercised with a few fixture lines. MusicBrainzDumpService streams a dump in batches and writes:
+    - discogs_release_link rows for every release with a Discogs url relation
+    - release_resolution rows for every official release (what library scans search for)
+    - full Album/AlbumRelease/Artist/Track/TrackVersion rows for releases matching the filter
+"""
+
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import re
+import tarfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from dependencies.database import ChunkedSession
+from dependencies.musicbrainz_api import MusicBrainzAPI
+from dependencies.rate_limiter import LANE_BULK
+from models.sqlmodels import (
+    Album,
+    AlbumArtistBridge,
+    AlbumRelease,
+    AlbumReleaseArtistBridge,
+    Artist,
+    DiscogsReleaseLink,
+    ReleaseResolution,
+)
+from services.collection_service import normalize
+from services.musicbrainz_service import MusicBrainzService, parse_date
+
+logger = logging.getLogger(__name__)
+
+DISCOGS_RELEASE_RE = re.compile(r"discogs\.com/(?:[a-z]{2}/)?release/(\d+)")
+IMPORT_BATCH = 200  # releases per write batch
+IMPORT_SESSION_BATCHES = 10  # batches served by one session
+PROGRESS_EVERY_BATCHES = 50
+
+
+# --- Parse layer (no database, no network) ---
+
+def open_dump_lines(path: str, entity: str = "release") -> Iterator[str]:
+    """
+    Stream the lines of a dump: a plain JSON-lines file, a .gz/.bz2/.xz
+    compressed one, or the published tar archive (the `mbdump/<entity>` member
+    is read in streaming mode, never extracted to disk).
+    """
+    if re.search(r"\.tar(\.(gz|bz2|xz))?$", path):
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.isfile() and member.name.rsplit("/", 1)[-1] == entity:
+                    # stream-mode members are not seekable, so no TextIOWrapper
+                    for raw in archive.extractfile(member):
+                        yield raw.decode("utf-8")
+                    return
+        raise FileNotFoundError(f"No '{entity}' member in {path}")
+
+    openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+    opener = next((fn for ext, fn in openers.items() if path.endswith(ext)), open)
+    with opener(path, "rt", encoding="utf-8") as f:
+        yield from f
+
+
+def _credits(artist_credit: list[dict]) -> list[tuple[str | None, str]]:
+    return [
+        (credit["artist"].get("id"), credit["artist"]["name"])
+        for credit in artist_credit or []
+        if credit.get("artist")
+    ]
+
+
+def _credit_name(artist_credit: list[dict]) -> Optional[str]:
+    """The credit as written on the release and in file tags, e.g. "Simon & Garfunkel"."""
+    name = "".join(
+        (credit.get("name") or (credit.get("artist") or {}).get("name", "")) + (credit.get("joinphrase") or "")
+        for credit in artist_credit or []
+    )
+    return name or None
+
+
+@dataclass
+class DumpRelease:
+    release_id: str
+    title: str
+    status: Optional[str]
+    date: Optional[str]
+    country: Optional[str]
+    release_group: dict
+    artists: list[tuple[str | None, str]]
+    discogs_release_ids: list[int]
+    artist_credit_name: Optional[str] = None
+    media_tracks: list[dict] = field(default_factory=list)
+    recordings: list[dict] = field(default_factory=list)
+
+
+def parse_release(data: dict) -> Optional[DumpRelease]:
+    """Turn one dump line (already json-decoded) into the subset we import."""
+    if not data.get("id") or not data.get("title"):
+        return None
+
+    discogs_ids = []
+    for relation in data.get("relations", []):
+        match = DISCOGS_RELEASE_RE.search((relation.get("url") or {}).get("resource", ""))
+        if match:
+            discogs_ids.append(int(match.group(1)))
+
+    media_tracks, recordings = [], []
+    for medium in data.get("media", []):
+        for track in medium.get("tracks", []):
+            recording = track.get("recording") or {}
+            if not recording.get("id"):
+                continue
+            media_tracks.append({
+                "title": track.get("title") or recording.get("title"),
+                "number": track.get("number"),
+                "length": track.get("length") or recording.get("length"),
+                "recording": {"id": recording["id"]},
+            })
+            recordings.append({
+                "recording_id": recording["id"],
+                "title": recording.get("title"),
+                "length": recording.get("length"),
+                "tags": [{"name": t["name"], "count": t.get("count", 0)} for t in recording.get("tags", [])],
+                "artist_credits": [
+                    {"name": name, "artist_id": mbid, "artist_name": name}
+                    for mbid, name in _credits(recording.get("artist-credit"))
+                ],
+            })
+
+    return DumpRelease(
+        release_id=data["id"],
+        title=data["title"],
+        status=data.get("status"),
+        date=data.get("date"),
+        country=data.get("country"),
+        release_group=data.get("release-group") or {},
+        artists=_credits(data.get("artist-credit")),
+        discogs_release_ids=discogs_ids,
+        artist_credit_name=_credit_name(data.get("artist-credit")),
+        media_tracks=media_tracks,
+        recordings=recordings,
+    )
+
+
+def iter_releases(lines: Iterable[str], stats: Optional[dict] = None) -> Iterator[DumpRelease]:
+    """Decode and parse dump lines, skipping (and counting) broken ones."""
+    stats = stats if stats is not None else {}
+    for line in lines:
+        stats["lines"] = stats.get("lines", 0) + 1
+        try:
+            release = parse_release(json.loads(line))
+        except (ValueError, KeyError, TypeError):
+            stats["bad_lines"] = stats.get("bad_lines", 0) + 1
+            continue
+        if release:
+            yield release
+
+
+def discogs_links(batch: list[DumpRelease]) -> set[tuple[int, str]]:
+    """(discogs release id, MB release id) pairs of a batch."""
+    return {
+        (discogs_id, release.release_id)
+        for release in batch
+        for discogs_id in release.discogs_release_ids
+    }
+
+
+def release_resolutions(batch: list[DumpRelease]) -> dict[tuple[str, str], str]:
+    """
+    (artist, album) -> MB release id for the official releases of a batch, the
+    first release of a key wins. The key is built like the scan's: from the
+    full credit (what the file's artist tag holds) and the title, normalized.
+    """
+    resolutions = {}
+    for release in batch:
+        if (release.status or "").lower() != "official":
+            continue
+        artist, album = normalize(release.artist_credit_name), normalize(release.title)
+        if artist and album:
+            resolutions.setdefault((artist, album), release.release_id)
+    return resolutions
+
+
+@dataclass
+class ReleaseFilter:
+    """Which releases get a full import; links and resolutions are written for every release."""
+    discogs_ids: set[int] = field(default_factory=set)
+    artist_mbids: set[str] = field(default_factory=set)
+    import_all: bool = False
+
+    def matches(self, release: DumpRelease) -> bool:
+        if self.import_all:
+            return True
+        if self.discogs_ids and self.discogs_ids.intersection(release.discogs_release_ids):
+            return True
+        return bool(self.artist_mbids) and any(mbid in self.artist_mbids for mbid, _ in release.artists)
+
+
+# --- Writer ---
+
+class MusicBrainzDumpService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        # only used for its set-based writers, never calls the API
+        self.musicbrainz_service = MusicBrainzService(db, MusicBrainzAPI(lane=LANE_BULK))
+
+    def _bind_session(self, db: AsyncSession):
+        self.db = db
+        self.musicbrainz_service.db = db
+
+    async def load_known_artist_mbids(self) -> set[str]:
+        result = await self.db.execute(
+            select(Artist.musicbrainz_artist_id).where(Artist.musicbrainz_artist_id.is_not(None))
+        )
+        return set(result.scalars().all())
+
+    async def import_dump(
+            self,
+            lines: Iterable[str],
+            release_filter: ReleaseFilter,
+            batch_size: int = IMPORT_BATCH,
+            limit: Optional[int] = None,
+    ) -> dict:
+        """Stream releases from `lines` and write them in batches; memory stays at one batch."""
+        stats = {"lines": 0, "bad_lines": 0, "releases": 0, "batches": 0, "links": 0,
+                 "resolutions": 0, "imported": 0, "already_present": 0}
+        original_db = self.db
+        try:
+            async with ChunkedSession(IMPORT_SESSION_BATCHES, on_session=self._bind_session) as uow:
+                batch: list[DumpRelease] = []
+                for release in iter_releases(lines, stats):
+                    stats["releases"] += 1
+                    batch.append(release)
+                    if len(batch) >= batch_size:
+                        await self._write_batch(batch, release_filter, stats)
+                        await uow.step()
+                        batch = []
+                    if limit and stats["releases"] >= limit:
+                        break
+                if batch:
+                    await self._write_batch(batch, release_filter, stats)
+        finally:
+            self._bind_session(original_db)
+        logger.info(f"📦 MusicBrainz dump import finished: {stats}")
+        return stats
+
+    async def _write_batch(self, batch: list[DumpRelease], release_filter: ReleaseFilter, stats: dict):
+        links = discogs_links(batch)
+        if links:
+            await self.db.execute(
+                insert(DiscogsReleaseLink)
+                .values([{"discogs_release_id": d, "musicbrainz_release_id": m} for d, m in links])
+                .on_conflict_do_nothing()
+            )
+            stats["links"] += len(links)
+
+        stats["resolutions"] += await self._write_resolutions(batch)
+
+        to_import = [release for release in batch if release_filter.matches(release)]
+        if to_import:
+            await self._import_releases(to_import, stats)
+
+        await self.db.commit()
+        stats["batches"] += 1
+        if stats["batches"] % PROGRESS_EVERY_BATCHES == 0:
+            logger.info(f"📦 Dump import progress: {stats}")
+
+    async def _write_resolutions(self, batch: list[DumpRelease]) -> int:
+        """(artist, album) keys for the scan's release search; fills earlier misses, keeps earlier hits."""
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "release_resolution_uuid": uuid4(),
+                "artist_key": artist,
+                "album_key": album,
+                "musicbrainz_release_id": release_id,
+                "resolved_at": now,
+            }
+            for (artist, album), release_id in release_resolutions(batch).items()
+        ]
+        if not rows:
+            return 0
+        stmt = insert(ReleaseResolution).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_release_resolution_artist_album",
+            set_={
+                "musicbrainz_release_id": stmt.excluded.musicbrainz_release_id,
+                "resolved_at": stmt.excluded.resolved_at,
+            },
+            where=ReleaseResolution.musicbrainz_release_id.is_(None),
+        )
+        await self.db.execute(stmt)
+        return len(rows)
+
+    async def _import_releases(self, releases: list[DumpRelease], stats: dict):
+        mb = self.musicbrainz_service
+
+        result = await self.db.execute(
+            select(AlbumRelease.musicbrainz_release_id)
+            .where(AlbumRelease.musicbrainz_release_id.in_([r.release_id for r in releases]))
+        )
+        present = set(result.scalars().all())
+        releases = [r for r in releases if r.release_id not in present]
+        stats["already_present"] += len(present)
+        if not releases:
+            return
+
+        credits = set()
+        for release in releases:
+            credits.update(release.artists)
+            credits.update(_credits(release.release_group.get("artist-credit")))
+        artists = await mb._resolve_credit_artists(credits)
+
+        # Albums (release groups)
+        group_ids = {r.release_group["id"] for r in releases if r.release_group.get("id")}
+        result = await self.db.execute(
+            select(Album.musicbrainz_release_group_id, Album.album_uuid)
+            .where(Album.musicbrainz_release_group_id.in_(group_ids))
+        )
+        albums: dict[str, UUID] = {}
+        for group_id, album_uuid in result.all():
+            albums.setdefault(group_id, album_uuid)
+
+        new_albums, album_artists = [], set()
+        for release in releases:
+            group = release.release_group
+            group_id = group.get("id") or f"release:{release.release_id}"
+            if group_id not in albums:
+                albums[group_id] = uuid4()
+                new_albums.append({
+                    "album_uuid": albums[group_id],
+                    "title": group.get("title") or release.title,
+                    "musicbrainz_release_group_id": group.get("id"),
+                    "release_date": parse_date(group.get("first-release-date")),
+                    "quality": "normal",
+                })
+                group_credits = _credits(group.get("artist-credit")) or release.artists
+                album_artists.update((albums[group_id], artists[c]) for c in group_credits)
+
+        # Releases
+        new_releases, release_artists = [], set()
+        release_uuids: dict[str, tuple[UUID, UUID]] = {}
+        for release in releases:
+            album_uuid = albums[release.release_group.get("id") or f"release:{release.release_id}"]
+            album_release_uuid = uuid4()
+            release_uuids[release.release_id] = (album_uuid, album_release_uuid)
+            new_releases.append({
+                "album_release_uuid": album_release_uuid,
+                "album_uuid": album_uuid,
+                "title": release.title,
+                "is_main_release": False,
+                "musicbrainz_release_id": release.release_id,
+                "discogs_release_id": release.discogs_release_ids[0] if release.discogs_release_ids else None,
+                "country": release.country,
+                "release_date": parse_date(release.date),
+            })
+            release_artists.update((album_release_uuid, artists[c]) for c in release.artists)
+
+        await mb._insert_rows(Album, new_albums)
+        await mb._insert_rows(
+            AlbumArtistBridge,
+            [{"album_uuid": al, "artist_uuid": ar} for al, ar in album_artists],
+            ignore_conflicts=True,
+        )
+        await mb._insert_rows(AlbumRelease, new_releases)
+        await mb._insert_rows(
+            AlbumReleaseArtistBridge,
+            [{"album_release_uuid": rel, "artist_uuid": ar} for rel, ar in release_artists],
+            ignore_conflicts=True,
+        )
+
+        # Tracks and versions, set-based per release
+        for release in releases:
+            album_uuid, album_release_uuid = release_uuids[release.release_id]
+            if release.media_tracks:
+                await mb.create_tracks_and_versions(
+                    Album(album_uuid=album_uuid),
+                    AlbumRelease(album_release_uuid=album_release_uuid, album_uuid=album_uuid),
+                    release.media_tracks,
+                    release.recordings,
+                )
+        stats["imported"] += len(releases)
@@ -4,9 +4,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from uuid import UUID
-from datetime import datetime, date
+from datetime import datetime, date, timezone
 from typing import Optional, Tuple
-import re
+from dataclasses import dataclass
 from uuid import uuid4
 from sqlmodel import select
 from sqlalchemy.dialects.postgresql import insert
@@ -28,73 +28,31 @@ from models.sqlmodels import (
     TrackAlbumBridge,
     TrackVersionAlbumReleaseBridge,
     AlbumReleaseGenreBridge,
-    AlbumReleaseTagBridge, AlbumTagBridge, AlbumGenreBridge, CollectionAlbumBridge, CollectionAlbumReleaseBridge
+    AlbumReleaseTagBridge, AlbumTagBridge, AlbumGenreBridge, CollectionAlbumBridge, CollectionAlbumReleaseBridge,
+    DiscogsReleaseLink
 )
 from dependencies.cover_art_archive_api import CoverArtArchiveAPI
 
 cover_art_archive = CoverArtArchiveAPI()
 from config import settings
 import logging
-import re
-import unicodedata
-from rapidfuzz import fuzz
+from services.entity_cache import entity_cache, normalize_tag_name
+from services.track_matcher import FileCandidate, ReleaseTrack, parse_track_number, track_matcher
 
 logger = logging.getLogger(__name__)
 
+INSERT_CHUNK = 1000  # rows per multi-row INSERT
 
 
-def fuzzy_match_title(candidate: str, choices: list[str], threshold: int = 90) -> str | None:
-    for c in choices:
-        score = fuzz.ratio(candidate, c)
-        if score >= threshold:
-            return c
-    return None
-
-
-
-def normalize_title(title: str) -> str:
-    """
-    Normalize track/album titles for robust matching.
-    - Lowercase
-    - Strip whitespace
-    - Collapse multiple spaces
-    - Remove diacritics
-    - Standardize apostrophes/quotes
-    - Remove punctuation in parentheses like (skit), (intro)
-    - Replace separators (/,&,+,-,–,—,.,,) with spaces
-    - Remove other non-alphanumeric except spaces
-    """
-    if not title:
-        return ""
-
-    # Unicode normalize + strip diacritics
-    s = unicodedata.normalize("NFKD", title)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-
-    # Lowercase
-    s = s.lower()
-
-    # Standardize apostrophes/quotes
-    s = (
-        s.replace("’", "'")
-         .replace("‘", "'")
-         .replace("“", '"')
-         .replace("”", '"')
-    )
-
-    # Remove parentheticals (skit), (intro), etc.
-    s = re.sub(r"\([^)]*\)", "", s)
-
-    # Replace common separators with space
-    s = re.sub(r"[\/&\+\-\–\—,:;]", " ", s)
-
-    # Remove other non-alphanumeric (keep spaces)
-    s = re.sub(r"[^a-z0-9\s]", "", s)
-
-    # Collapse spaces
-    s = re.sub(r"\s+", " ", s).strip()
-
-    return s
+@dataclass
+class FetchedRelease:
+    """Everything an import of one MusicBrainz release needs from the APIs."""
+    musicbrainz_release_id: str
+    release: dict
+    release_group: Optional[dict]
+    recordings: list[dict]
+    album_art: Optional[dict] = None
+    release_art: Optional[dict] = None
 
 
 def parse_date(date_str: Optional[str]) -> Optional[date]:
@@ -109,60 +67,36 @@ def parse_date(date_str: Optional[str]) -> Optional[date]:
     except Exception:
         return None
 
+def _recording_credits(recording: dict) -> list[tuple[str | None, str]]:
+    """(mbid, name) of a recording's credited artists, for raw MB JSON and get_recordings_for_release."""
+    credits = []
+    for credit in recording.get("artist_credits", []):
+        credits.append((credit.get("artist_id"), credit.get("artist_name") or credit["name"]))
+    for credit in recording.get("artist-credit", []):
+        artist_data = credit.get("artist")
+        if artist_data:
+            credits.append((artist_data.get("id"), artist_data["name"]))
+    return credits
+
+
 class MusicBrainzService:
-    def __init__(self, db: AsyncSession, api: MusicBrainzAPI, artist_cache: Optional[dict[str, UUID]] = None, album_cache: Optional[dict[str, UUID]] = None, tag_cache: Optional[dict[str, UUID]] = None):
+    def __init__(self, db: AsyncSession, api: MusicBrainzAPI):
         self.db = db
         self.api = api
-        self.artist_cache = artist_cache or {}
-        self.album_cache = album_cache or {}
-        self.tag_cache = tag_cache or {}
 
+    # Tags, genres and artists resolve through the process-wide entity cache
+    # (services/entity_cache.py); known names cost no database round trip.
     async def get_or_create_tag_simple(self, name: str) -> Tag:
-        normalized = self.normalize_tag_name(name)
-
-        # Cache hit
-        tag_uuid = self.tag_cache.get(normalized)
-        if tag_uuid:
-            return Tag(tag_uuid=tag_uuid)
-
-        # Create new tag
-        tag = Tag(name=normalized)
-        self.db.add(tag)
-        await self.db.flush()
-
-        # Update cache for future use
-        self.tag_cache[normalized] = tag.tag_uuid
-        return tag
+        return await self.get_or_create_tag(name)
 
     # Tag and Genre Creation
-    async def get_or_create_tag(self, name: str, cache: Optional[dict] = None) -> Tag:
-        key = name.strip().lower()
-        if cache is not None and key in cache:
-            return cache[key]
-
-        result = await self.db.execute(select(Tag).where(Tag.name == name))
-        tag = result.scalar_one_or_none()
-        if tag:
-            if cache is not None:
-                cache[key] = tag
-            return tag
-
-        tag = Tag(name=name)
-        self.db.add(tag)
-        await self.db.flush()
-        if cache is not None:
-            cache[key] = tag
-        return tag
+    async def get_or_create_tag(self, name: str) -> Tag:
+        tag_uuids = await entity_cache.tag_uuids([name])
+        return Tag(tag_uuid=tag_uuids[name], name=normalize_tag_name(name))
 
     async def get_or_create_genre(self, name: str) -> Genre:
-        result = await self.db.execute(select(Genre).where(Genre.name == name))
-        genre = result.scalar_one_or_none()
-        if genre:
-            return genre
-        genre = Genre(name=name)
-        self.db.add(genre)
-        await self.db.flush()
-        return genre
+        genre_uuids = await entity_cache.genre_uuids([name])
+        return Genre(genre_uuid=genre_uuids[name], name=normalize_tag_name(name))
 
     async def get_or_create_artist_by_name_simple(
             self,
@@ -171,116 +105,22 @@ class MusicBrainzService:
     ) -> Artist:
         if not musicbrainz_artist_id:
             raise ValueError(f"Missing MusicBrainz ID for artist: {name}")
-
-        artist_uuid = self.artist_cache.get(musicbrainz_artist_id)
-        if not artist_uuid:
-            raise ValueError(f"Artist with MBID {musicbrainz_artist_id} not found in preload cache")
-
-        return Artist(artist_uuid=artist_uuid)
+        return await self.get_or_create_artist_by_name(name, musicbrainz_artist_id)
 
     async def get_or_create_artist_by_name(
             self,
             name: str,
             musicbrainz_artist_id: str = None,
-            cache: Optional[dict] = None
     ) -> Artist:
-
-        key = musicbrainz_artist_id or name.strip().lower()
-        if cache and key in cache:
-            return cache[key]
-
-        if not musicbrainz_artist_id:
-            result = await self.db.execute(select(Artist).where(Artist.name == name))
-            artist = result.scalar_one_or_none()
-        else:
-            result = await self.db.execute(select(Artist).where(Artist.musicbrainz_artist_id == musicbrainz_artist_id))
-            artist = result.scalar_one_or_none()
-
-        if artist:
-            if cache is not None:
-                cache[key] = artist
-            return artist
-
-        artist = Artist(name=name, musicbrainz_artist_id=musicbrainz_artist_id)
-        self.db.add(artist)
-        await self.db.flush()
-
-        if cache is not None:
-            cache[key] = artist
-
-        return artist
-
-    def normalize_tag_name(self, name: str) -> str:
-        name = name.strip().lower()
-        name = re.sub(r"[\.\-_]", " ", name)  # replace punctuation with spaces
-        name = re.sub(r"\s+", " ", name)  # collapse multiple spaces
-        name = name.replace("&", "and")  # common synonym
-        return name.strip()
-
-
-    async def get_or_create_album_from_release_group_simple(self, release_group_data: dict) -> Album:
-        musicbrainz_id = release_group_data["id"]
-        album_uuid = self.album_cache.get(musicbrainz_id)
-
-        if album_uuid:
-            return Album(album_uuid=album_uuid)
-        # Create the album object without the tags field
-        album = Album(
-            title=release_group_data["title"],
-            musicbrainz_release_group_id=musicbrainz_id,
-            release_date=parse_date(release_group_data.get("first-release-date")),
-            quality="normal",
-            country=None
+        artist_uuids = await entity_cache.artist_uuids([(musicbrainz_artist_id, name)])
+        return Artist(
+            artist_uuid=artist_uuids[(musicbrainz_artist_id, name)],
+            name=name,
+            musicbrainz_artist_id=musicbrainz_artist_id,
         )
-        self.db.add(album)
-        await self.db.flush()
 
-        for credit in release_group_data.get("artist-credit", []):
-            artist_data = credit.get("artist")
-            if artist_data:
-                artist = await self.get_or_create_artist_by_name(artist_data["name"], artist_data.get("id"))
-                result = await self.db.execute(
-                    select(AlbumArtistBridge)
-                    .where(AlbumArtistBridge.album_uuid == album.album_uuid, AlbumArtistBridge.artist_uuid == artist.artist_uuid))
-                existing_relation = result.scalar_one_or_none()
-                if not existing_relation:
-                    self.db.add(AlbumArtistBridge(album_uuid=album.album_uuid, artist_uuid=artist.artist_uuid))
-
-        # Add tags to the album using the AlbumTagBridge
-        for tag in release_group_data.get("tags", []):
-            tag_name = self.normalize_tag_name(tag["name"])
-            tag_obj = await self.get_or_create_tag_simple(tag_name)
-            # Check if the tag already exists in the database
-            result = await self.db.execute(
-                select(AlbumTagBridge)
-                .where(AlbumTagBridge.album_uuid == album.album_uuid, AlbumTagBridge.tag_uuid == tag_obj.tag_uuid))
-            existing_tag = result.scalar_one_or_none()
-            if not existing_tag:
-                self.db.add(AlbumTagBridge(
-                    album_uuid=album.album_uuid,
-                    tag_uuid=tag_obj.tag_uuid,
-                    count=tag.get("count", 0)
-                ))
-
-        # Add genres to the album using the AlbumGenreBridge
-        for genre in release_group_data.get("genres", []):
-            genre_name = self.normalize_tag_name(genre["name"])
-            genre_obj = await self.get_or_create_genre(genre_name)
-            # Check if the genre already exists in the database
-            result = await self.db.execute(
-                select(AlbumGenreBridge)
-                .where(
-            AlbumGenreBridge.album_uuid == album.album_uuid,
-                        AlbumGenreBridge.genre_uuid == genre_obj.genre_uuid))
-            existing_genre = result.scalar_one_or_none()
-            if not existing_genre:
-                self.db.add(AlbumGenreBridge(
-                    album_uuid=album.album_uuid,
-                    genre_uuid=genre_obj.genre_uuid,
-                    count=genre.get("count", 0)
-                ))
-
-        return album
+    def normalize_tag_name(self, name: str) -> str:
+        return normalize_tag_name(name)
 
     # Create Album from Release Group
     async def get_or_create_album_from_release_group(self, release_group_data: dict) -> Album:
@@ -539,143 +379,138 @@ class MusicBrainzService:
             recordings_data: list[dict],  # Pass the list to be converted into the mapping
             should_take_duration: bool = False
     ):
-        # Create the recordings_by_id dictionary
+        """
+        Ingest a release's tracks set-based: a few preload SELECTs, then one
+        multi-row INSERT ... ON CONFLICT DO NOTHING per table, regardless of the
+        number of tracks. Pass all media of a release in one call.
+        """
         recordings_by_id = {recording["recording_id"]: recording for recording in recordings_data}
+        recording_ids = {t["recording"]["id"] for t in media_tracks}
+
+        # --- Preload everything the per-track checks used to SELECT ---
+        result = await self.db.execute(
+            select(Track.track_uuid, Track.name, Track.duration)
+            .join(TrackAlbumBridge, Track.track_uuid == TrackAlbumBridge.track_uuid)
+            .where(TrackAlbumBridge.album_uuid == album.album_uuid)
+        )
+        tracks_by_key: dict[tuple[str, int | None], UUID] = {}
+        for track_uuid, name, duration in result.all():
+            tracks_by_key.setdefault((name, duration), track_uuid)
+
+        result = await self.db.execute(
+            select(TrackVersion.recording_id, TrackVersion.track_version_uuid)
+            .where(TrackVersion.recording_id.in_(recording_ids))
+        )
+        versions_by_recording: dict[str, UUID] = {}
+        for recording_id, version_uuid in result.all():
+            versions_by_recording.setdefault(recording_id, version_uuid)
+
+        result = await self.db.execute(
+            select(AlbumArtistBridge.artist_uuid).where(AlbumArtistBridge.album_uuid == album.album_uuid)
+        )
+        album_artist_ids = list(result.scalars().all())
+
+        credits = {
+            credit
+            for track_data in media_tracks
+            for credit in _recording_credits(recordings_by_id.get(track_data["recording"]["id"], {}))
+        }
+        artists_by_credit = await self._resolve_credit_artists(credits)
+
+        tag_names = {
+            tag["name"]
+            for rec in recordings_by_id.values() if rec.get("recording_id") in recording_ids
+            for tag in rec.get("tags", [])
+        }
+        tags_by_name = await self._resolve_tags(tag_names)
+
+        # --- Build rows in memory ---
+        new_tracks, new_versions = [], []
+        track_albums, version_releases, track_artists = {}, {}, set()
+        extra_artists, version_tags = set(), {}
 
         for track_data in media_tracks:
             title = track_data["title"]
-            recording_data = track_data["recording"]
-            recording_id = recording_data["id"]
-            length = track_data.get("length")
+            recording_id = track_data["recording"]["id"]
+            length = track_data.get("length") or None
             track_number = track_data.get("number")
-
-            # Fetch the full recording data using recordings_by_id
             recording_details = recordings_by_id.get(recording_id, {})
 
-            # Track creation (by title + duration)
-            # Track creation (scoped to album by TrackAlbumBridge)
-            result = await self.db.execute(
-                select(Track)
-                .join(TrackAlbumBridge, Track.track_uuid == TrackAlbumBridge.track_uuid)
-                .where(
-                    Track.name == title,
-                    Track.duration == length,
-                    TrackAlbumBridge.album_uuid == album.album_uuid
-                )
-            )
-            track = result.scalars().first()  # ✅ avoids crash
-
-            if not track:
-                track = Track(name=title, duration=length if length else None)
-                self.db.add(track)
-                await self.db.flush()
+            # Track (scoped to album by TrackAlbumBridge, matched on title + duration)
+            track_uuid = tracks_by_key.get((title, length))
+            if not track_uuid:
+                track_uuid = uuid4()
+                tracks_by_key[(title, length)] = track_uuid
+                new_tracks.append({"track_uuid": track_uuid, "name": title, "duration": length})
+            track_albums.setdefault(track_uuid, {
+                "track_uuid": track_uuid,
+                "album_uuid": album.album_uuid,
+                "track_number": track_number,
+            })
+
+            # TrackVersion (by recording id)
+            version_uuid = versions_by_recording.get(recording_id)
+            if not version_uuid:
+                version_uuid = uuid4()
+                versions_by_recording[recording_id] = version_uuid
+                new_versions.append({
+                    "track_version_uuid": version_uuid,
+                    "recording_id": recording_id,
+                    "track_uuid": track_uuid,
+                    "duration": length,
+                    "quality": "normal",
+                })
+            version_releases.setdefault(version_uuid, {
+                "track_version_uuid": version_uuid,
+                "album_release_uuid": album_release.album_release_uuid,
+                "track_number": track_number,
+            })
 
-                # Always link Track ↔ Album
-                self.db.add(TrackAlbumBridge(
-                    track_uuid=track.track_uuid,
-                    album_uuid=album.album_uuid,
-                    track_number=track_number
-                ))
-
-            if not track:
-                track = Track(name=title, duration=length if length else None)
-                self.db.add(track)
-                await self.db.flush()
-
-            # 🔑 Always ensure Track ↔ Album link
-            result = await self.db.execute(
-                select(TrackAlbumBridge).where(
-                    TrackAlbumBridge.track_uuid == track.track_uuid,
-                    TrackAlbumBridge.album_uuid == album.album_uuid
-                )
-            )
-            if not result.scalar_one_or_none():
-                self.db.add(TrackAlbumBridge(
-                    track_uuid=track.track_uuid,
-                    album_uuid=album.album_uuid,
-                    track_number=track_number
-                ))
-
-            # TrackVersion creation
-            result = await self.db.execute(
-                select(TrackVersion).where(TrackVersion.recording_id == recording_id)
-            )
-            version = result.scalar_one_or_none()
-            if not version:
-                version = TrackVersion(
-                    recording_id=recording_id,
-                    track_uuid=track.track_uuid,
-                    duration=length if length else None,
-                    quality="normal",
-                )
-                self.db.add(version)
-                await self.db.flush()
+            for artist_uuid in album_artist_ids:
+                track_artists.add((track_uuid, artist_uuid))
+            for credit in _recording_credits(recording_details):
+                extra_artists.add((version_uuid, artists_by_credit[credit]))
+            for tag in recording_details.get("tags", []):
+                version_tags.setdefault((version_uuid, tags_by_name[tag["name"]]), tag.get("count", 0))
+
+        # --- Write: parents first, then the bridges ---
+        await self._insert_rows(Track, new_tracks)
+        await self._insert_rows(TrackVersion, new_versions)
+        await self._insert_rows(TrackAlbumBridge, list(track_albums.values()), ignore_conflicts=True)
+        await self._insert_rows(
+            TrackVersionAlbumReleaseBridge, list(version_releases.values()), ignore_conflicts=True
+        )
+        await self._insert_rows(
+            TrackArtistBridge,
+            [{"track_uuid": t, "artist_uuid": a} for t, a in track_artists],
+            ignore_conflicts=True,
+        )
+        await self._insert_rows(
+            TrackVersionExtraArtist,
+            [{"track_version_uuid": v, "artist_uuid": a, "role": None} for v, a in extra_artists],
+            ignore_conflicts=True,
+        )
+        await self._insert_rows(
+            TrackVersionTagBridge,
+            [{"track_version_uuid": v, "tag_uuid": t, "count": c} for (v, t), c in version_tags.items()],
+            ignore_conflicts=True,
+        )
 
-            # Link Version ↔ AlbumRelease
-            result = await self.db.execute(
-                select(TrackVersionAlbumReleaseBridge).where(
-                    TrackVersionAlbumReleaseBridge.track_version_uuid == version.track_version_uuid,
-                    TrackVersionAlbumReleaseBridge.album_release_uuid == album_release.album_release_uuid
-                )
-            )
-            if not result.scalar_one_or_none():
-                self.db.add(TrackVersionAlbumReleaseBridge(
-                    track_version_uuid=version.track_version_uuid,
-                    album_release_uuid=album_release.album_release_uuid,
-                    track_number=track_number
-                ))
+    async def _insert_rows(self, model, rows: list[dict], ignore_conflicts: bool = False):
+        """Multi-row INSERT, chunked to stay below the driver's bind parameter limit."""
+        for i in range(0, len(rows), INSERT_CHUNK):
+            stmt = insert(model).values(rows[i:i + INSERT_CHUNK])
+            if ignore_conflicts:
+                stmt = stmt.on_conflict_do_nothing()
+            await self.db.execute(stmt)
 
-            # Link Track ↔ Artists from Album
-            album_artists_result = await self.db.execute(
-                select(Artist).join(AlbumArtistBridge).where(AlbumArtistBridge.album_uuid == album.album_uuid)
-            )
-            album_artists = album_artists_result.scalars().all()
-            for artist in album_artists:
-                result = await self.db.execute(
-                    select(TrackArtistBridge).where(
-                        TrackArtistBridge.track_uuid == track.track_uuid,
-                        TrackArtistBridge.artist_uuid == artist.artist_uuid
-                    )
-                )
-                if not result.scalar_one_or_none():
-                    self.db.add(TrackArtistBridge(
-                        track_uuid=track.track_uuid,
-                        artist_uuid=artist.artist_uuid
-                    ))
+    async def _resolve_credit_artists(self, credits: set[tuple[str | None, str]]) -> dict[tuple, UUID]:
+        """Map (mbid, name) credits to artist uuids, creating the missing artists in bulk."""
+        return await entity_cache.artist_uuids(credits)
 
-            # Add extra artists for the track version
-            for credit in recording_details.get("artist-credit", []):
-                artist_data = credit.get("artist")
-                if artist_data:
-                    artist = await self.get_or_create_artist_by_name(artist_data["name"])
-                    result = await self.db.execute(
-                        select(TrackVersionExtraArtist).where(
-                            TrackVersionExtraArtist.track_version_uuid == version.track_version_uuid,
-                            TrackVersionExtraArtist.artist_uuid == artist.artist_uuid
-                        )
-                    )
-                    if not result.scalar_one_or_none():
-                        self.db.add(TrackVersionExtraArtist(
-                            track_version_uuid=version.track_version_uuid,
-                            artist_uuid=artist.artist_uuid,
-                            role=None
-                        ))
-
-            # Add tags to the track version
-            for tag in recording_details.get("tags", []):
-                tag_obj = await self.get_or_create_tag(tag["name"])
-                result = await self.db.execute(
-                    select(TrackVersionTagBridge).where(
-                        TrackVersionTagBridge.track_version_uuid == version.track_version_uuid,
-                        TrackVersionTagBridge.tag_uuid == tag_obj.tag_uuid
-                    )
-                )
-                if not result.scalar_one_or_none():
-                    self.db.add(TrackVersionTagBridge(
-                        track_version_uuid=version.track_version_uuid,
-                        tag_uuid=tag_obj.tag_uuid,
-                        count=tag.get("count", 0)
-                    ))
+    async def _resolve_tags(self, names: set[str]) -> dict[str, UUID]:
+        """Map tag names to tag uuids, creating the missing tags in one INSERT."""
+        return await entity_cache.tag_uuids(names)
 
     async def create_tracks_and_versions_simple(
             self,
@@ -784,8 +619,6 @@ class MusicBrainzService:
                         extra_artist_bridge_buffer.add((version.track_version_uuid, artist.artist_uuid))
                         existing_extra_artists.add(key)
 
-            from sqlalchemy.dialects.postgresql import insert
-
             # Tags (normalize tag name)
             for tag in recording_details.get("tags", []):
                 tag_name = self.normalize_tag_name(tag["name"])
@@ -804,43 +637,35 @@ class MusicBrainzService:
         if track_buffer:
             self.db.add_all(track_buffer.values())
             await self.db.flush()
-        for track_uuid, album_uuid, track_number in track_album_bridge_buffer:
-            stmt = insert(TrackAlbumBridge).values(
-                track_uuid=track_uuid,
-                album_uuid=album_uuid,
-                track_number=track_number
-            ).on_conflict_do_nothing()
-            await self.db.execute(stmt)
-        for track_uuid, artist_uuid in track_artist_bridge_buffer:
-            stmt = insert(TrackArtistBridge).values(
-                track_uuid=track_uuid,
-                artist_uuid=artist_uuid
-            ).on_conflict_do_nothing()
-            await self.db.execute(stmt)
+        await self._insert_rows(
+            TrackAlbumBridge,
+            [{"track_uuid": t, "album_uuid": a, "track_number": n} for t, a, n in track_album_bridge_buffer],
+            ignore_conflicts=True,
+        )
+        await self._insert_rows(
+            TrackArtistBridge,
+            [{"track_uuid": t, "artist_uuid": a} for t, a in track_artist_bridge_buffer],
+            ignore_conflicts=True,
+        )
 
         if version_buffer:
             self.db.add_all(version_buffer.values())
             await self.db.flush()
 
-        for row in version_tag_bridge_buffer:
-            stmt = insert(TrackVersionTagBridge).values(**row).on_conflict_do_nothing()
-            await self.db.execute(stmt)
-
-        for version_uuid, album_release_uuid, track_number in version_release_bridge_buffer:
-            stmt = insert(TrackVersionAlbumReleaseBridge).values(
-                track_version_uuid=version_uuid,
-                album_release_uuid=album_release_uuid,
-                track_number=track_number
-            ).on_conflict_do_nothing()
-            await self.db.execute(stmt)
-
-        for version_uuid, artist_uuid in extra_artist_bridge_buffer:
-            stmt = insert(TrackVersionExtraArtist).values(
-                track_version_uuid=version_uuid,
-                artist_uuid=artist_uuid,
-                role=None
-            ).on_conflict_do_nothing()
-            await self.db.execute(stmt)
+        await self._insert_rows(TrackVersionTagBridge, version_tag_bridge_buffer, ignore_conflicts=True)
+        await self._insert_rows(
+            TrackVersionAlbumReleaseBridge,
+            [
+                {"track_version_uuid": v, "album_release_uuid": r, "track_number": n}
+                for v, r, n in version_release_bridge_buffer
+            ],
+            ignore_conflicts=True,
+        )
+        await self._insert_rows(
+            TrackVersionExtraArtist,
+            [{"track_version_uuid": v, "artist_uuid": a, "role": None} for v, a in extra_artist_bridge_buffer],
+            ignore_conflicts=True,
+        )
 
         return used_artists, []
 
@@ -851,108 +676,181 @@ class MusicBrainzService:
             mb_trackid: Optional[str] = None,
     ) -> Optional[TrackVersion]:
         """
-        Return an existing TrackVersion for a given release.
-        Priority:
-          1. MB recording_id
-          2. Exact normalized title match
-          3. Fuzzy normalized title match
-        Never calls MusicBrainz API.
+        Return an existing TrackVersion for a given release (MB recording id
+        first, then title). Never calls MusicBrainz API. To match several files
+        of one release use match_track_versions, which never hands out the
+        same track twice.
         """
+        matches = await self.match_track_versions(release_id, [FileCandidate(title=title, mb_trackid=mb_trackid)])
+        return matches[0]
 
-        # Step 1: Fetch release UUID
-        result = await self.db.execute(
-            select(AlbumRelease.album_release_uuid).where(
-                AlbumRelease.musicbrainz_release_id == release_id
-            )
-        )
-        album_release_uuid = result.scalar_one_or_none()
-        if not album_release_uuid:
-            logger.warning(f"No AlbumRelease found in DB for release {release_id}")
-            return None
-
-        # Step 2: Preload all track_versions + tracks for this release
+    async def match_track_versions(
+            self,
+            release_id: str,
+            files: list[FileCandidate],
+    ) -> list[Optional[TrackVersion]]:
+        """
+        Match files to the TrackVersions of a release in one pass: recording ids,
+        then titles scored together with duration and track number, assigned
+        one-to-one (see services/track_matcher.py). Never calls MusicBrainz API.
+        """
         result = await self.db.execute(
-            select(TrackVersion, Track)
+            select(TrackVersion, Track.name, TrackVersionAlbumReleaseBridge.track_number)
             .join(Track, Track.track_uuid == TrackVersion.track_uuid)
             .join(
                 TrackVersionAlbumReleaseBridge,
                 TrackVersionAlbumReleaseBridge.track_version_uuid == TrackVersion.track_version_uuid,
             )
-            .where(TrackVersionAlbumReleaseBridge.album_release_uuid == album_release_uuid)
+            .join(
+                AlbumRelease,
+                AlbumRelease.album_release_uuid == TrackVersionAlbumReleaseBridge.album_release_uuid,
+            )
+            .where(AlbumRelease.musicbrainz_release_id == release_id)
+            # a stable order: ties in the assignment go the same way on every scan
+            .order_by(TrackVersionAlbumReleaseBridge.track_number, TrackVersion.track_version_uuid)
         )
-        rows: list[tuple[TrackVersion, Track]] = result.all()
+        rows = result.all()
         if not rows:
             logger.warning(f"No TrackVersions linked for release {release_id}")
-            return None
-
-        # 1. MBID match
-        if mb_trackid:
-            for tv, _ in rows:
-                if tv.recording_id == mb_trackid:
-                    return tv
-
-        # Prepare normalized names
-        title_norm = normalize_title(title)
-        name_map = {normalize_title(track.name): (tv, track) for tv, track in rows}
-
-        # 2. Exact normalized match
-        if title_norm in name_map:
-            tv, track = name_map[title_norm]
-            return tv
-
-        # 3. Fuzzy match
-        best = fuzzy_match_title(title_norm, list(name_map.keys()))
-        if best:
-            tv, track = name_map[best]
-            logger.info(
-                f"Fuzzy matched '{title}' -> '{track.name}' "
-                f"(score vs norm: {best})"
+            return [None] * len(files)
+
+        tracks = [
+            ReleaseTrack(
+                item=tv,
+                title=name,
+                duration_ms=tv.duration,
+                track_number=parse_track_number(track_number),
+                recording_id=tv.recording_id,
             )
-            return tv
+            for tv, name, track_number in rows
+        ]
+        matches = track_matcher.match(files, tracks, release_key=release_id)
+        for f, tv in zip(files, matches):
+            if tv is None:
+                logger.warning(f"No track_version match for '{f.title}' on release {release_id}")
+        return matches
+
+    async def get_release_id_by_discogs_id(self, discogs_release_id: int) -> Optional[str]:
+        """MusicBrainz release id for a Discogs release: imported dump links first, then the API."""
+        result = await self.db.execute(
+            select(DiscogsReleaseLink.musicbrainz_release_id)
+            .where(DiscogsReleaseLink.discogs_release_id == discogs_release_id)
+            .order_by(DiscogsReleaseLink.musicbrainz_release_id)
+            .limit(1)
+        )
+        local = result.scalar_one_or_none()
+        if local:
+            return local
+        return await self.api.get_release_by_discogs_url(discogs_release_id)
 
-        # 4. Failure
-        logger.warning(f"No track_version match for '{title}' on release {release_id}")
-        return None
+    async def _existing_musicbrainz_release(self, musicbrainz_release_id: str) -> Optional[AlbumRelease]:
+        result = await self.db.execute(
+            select(AlbumRelease)
+            .where(AlbumRelease.musicbrainz_release_id == musicbrainz_release_id)
+            .options(selectinload(AlbumRelease.album).selectinload(Album.artists))
+        )
+        return result.scalars().first()
 
     async def get_or_create_album_from_musicbrainz_release(
             self,
             musicbrainz_release_id: str,
             discogs_release_id: int = None,
-            should_take_duration: bool = False
+            should_take_duration: bool = False,
+            defer_images: bool = False,
     ) -> Tuple[Album, AlbumRelease]:
-        result = await self.db.execute(
-            select(AlbumRelease)
-            .where(AlbumRelease.musicbrainz_release_id == musicbrainz_release_id)
-            .options(selectinload(AlbumRelease.album).selectinload(Album.artists))
-        )
-        album_release = result.scalar_one_or_none()
+        """
+        Import a MusicBrainz release (album, release, tracks) unless it is already known.
+        With `defer_images` cover art is left for the cover art backfill job.
+        """
+        album_release = await self._existing_musicbrainz_release(musicbrainz_release_id)
         if album_release:
             return album_release.album, album_release
 
-        release_data = await self.api.get_release(musicbrainz_release_id)
-        release_group = await self.api.get_release_group_by_release_id(musicbrainz_release_id)
-        recordings_data = await self.api.get_recordings_for_release(musicbrainz_release_id)
+        fetched = await self.fetch_musicbrainz_release(musicbrainz_release_id, defer_images)
+        return await self.store_musicbrainz_release(fetched, discogs_release_id, should_take_duration)
 
-        album = await self.get_or_create_album_from_release_group(release_group)
-        album_release = await self.create_album_release(album, release_data, discogs_release_id)
+    async def fetch_musicbrainz_release(self, musicbrainz_release_id: str, defer_images: bool = False) -> FetchedRelease:
+        """
+        Stage 1 of an import, no database access: the three MB calls queue on the
+        shared limiter back to back; cover art is not MB rate limited and runs
+        alongside them.
+        """
+        release_task = asyncio.create_task(self.api.get_release(musicbrainz_release_id))
+        group_task = asyncio.create_task(self.api.get_release_group_by_release_id(musicbrainz_release_id))
+        recordings_task = asyncio.create_task(self.api.get_recordings_for_release(musicbrainz_release_id))
+        art_tasks = []
+        if not defer_images:
+            async def album_art():
+                release_group = await group_task
+                if not release_group:
+                    return None
+                return await cover_art_archive.get_by_release_group(release_group["id"])
+
+            art_tasks = [
+                asyncio.create_task(album_art()),
+                asyncio.create_task(cover_art_archive.get_by_release(musicbrainz_release_id)),
+            ]
+        try:
+            release_data, release_group, recordings_data = await asyncio.gather(
+                release_task, group_task, recordings_task
+            )
+            album_art_data, release_art_data = await asyncio.gather(*art_tasks) if art_tasks else (None, None)
+        except BaseException:
+            for task in (release_task, group_task, recordings_task, *art_tasks):
+                task.cancel()
+            raise
+
+        return FetchedRelease(
+            musicbrainz_release_id, release_data, release_group, recordings_data, album_art_data, release_art_data
+        )
 
-        # add images
-        album = await self.fetch_album_image(album, cover_art_archive)
-        album_release = await self.fetch_album_release_image(album_release, cover_art_archive)
+    async def store_musicbrainz_release(
+            self,
+            fetched: FetchedRelease,
+            discogs_release_id: int = None,
+            should_take_duration: bool = False,
+    ) -> Tuple[Album, AlbumRelease]:
+        """Stage 2 of an import: write everything in one transaction (unless someone else already did)."""
+        album_release = await self._existing_musicbrainz_release(fetched.musicbrainz_release_id)
+        if album_release:
+            return album_release.album, album_release
 
-        for media in release_data.get("media", []):
-            await self.create_tracks_and_versions(
-                album,
-                album_release,
-                media.get("tracks", []),
-                recordings_data,
-                should_take_duration,
-            )
+        release_data = fetched.release
+        album = await self.get_or_create_album_from_release_group(fetched.release_group)
+        album_release = await self.create_album_release(album, release_data, discogs_release_id)
+        self._apply_front_cover(album, fetched.album_art)
+        self._apply_front_cover(album_release, fetched.release_art)
+
+        await self.create_tracks_and_versions(
+            album,
+            album_release,
+            [track for media in release_data.get("media", []) for track in media.get("tracks", [])],
+            fetched.recordings,
+            should_take_duration,
+        )
 
         await self.db.commit()
 
         return album, album_release
 
+    @staticmethod
+    def _front_cover(cover_art: Optional[dict]) -> Optional[tuple[str, str]]:
+        """(large, small) thumbnail urls of the front image in a Cover Art Archive response."""
+        for image in (cover_art or {}).get("images", []):
+            if image.get("front"):
+                thumbnails = image.get("thumbnails", {})
+                return (
+                    thumbnails.get("large") or thumbnails.get("500"),
+                    thumbnails.get("small") or thumbnails.get("250"),
+                )
+        return None
+
+    def _apply_front_cover(self, target: Album | AlbumRelease, cover_art: Optional[dict]):
+        front = self._front_cover(cover_art)
+        if front and not target.image_url:
+            target.image_url, target.image_thumbnail_url = front
+            self.db.add(target)
+
     async def clone_album_release_with_links(self,
             original_album_release_uuid: UUID,
             new_discogs_release_id: int,
@@ -1098,9 +996,11 @@ class MusicBrainzService:
 
         # --- 7. Ensure cover art ---
         if not album.image_url:
-            await self.fetch_album_image(album, cover_art_archive)
+            self._apply_front_cover(
+                album, await cover_art_archive.get_by_release_group(album.musicbrainz_release_group_id)
+            )
         if not album_release.image_url:
-            await self.fetch_album_release_image(album_release, cover_art_archive)
+            self._apply_front_cover(album_release, await cover_art_archive.get_by_release(release_id))
 
         await self.db.commit()
 
@@ -1194,83 +1094,90 @@ class MusicBrainzService:
         # Only flush, never commit inside `session.begin()`
         await self.db.flush()
 
-    async def fetch_album_image(self, album: Album, cover_art_archive: CoverArtArchiveAPI):
-        if not album.musicbrainz_release_group_id:
-            return album
-
-        resp = await cover_art_archive.get_by_release_group(album.musicbrainz_release_group_id)
-        if not resp:
-            return album
-
-        for image in resp["images"]:
-            if image.get("front"):
-                album.image_url = image["thumbnails"].get("large") or image["thumbnails"].get("500")
-                album.image_thumbnail_url = image["thumbnails"].get("small") or image["thumbnails"].get("250")
-                self.db.add(album)
-                await self.db.flush()
-                break
-
-        return album
-
-    async def fetch_album_release_image(self, release: AlbumRelease, cover_art_archive: CoverArtArchiveAPI):
-        if not release.musicbrainz_release_id:
-            return release
-
-        resp = await cover_art_archive.get_by_release(release.musicbrainz_release_id)
-        if not resp:
-            return release
-
-        for image in resp["images"]:
-            if image.get("front"):
-                release.image_url = image["thumbnails"].get("large") or image["thumbnails"].get("500")
-                release.image_thumbnail_url = image["thumbnails"].get("small") or image["thumbnails"].get("250")
-                self.db.add(release)
-                await self.db.flush()
-                break
-
-        return release
-
-    async def gather_images(self):
-        cover_art_archive = CoverArtArchiveAPI()
-
+    async def store_release_groups(self, artist_uuid: UUID, release_groups: list[dict]) -> dict[str, UUID]:
+        """
+        Upsert release groups as (shallow) albums of an artist, set-based: one
+        SELECT, then one multi-row INSERT per table, however long the
+        discography. Returns release group id -> album uuid.
+        """
+        release_groups = [rg for rg in release_groups if rg.get("id")]
+        if not release_groups:
+            return {}
+        rg_ids = {rg["id"] for rg in release_groups}
         result = await self.db.execute(
-            select(Album).where(
-                Album.image_url == None,
-                Album.musicbrainz_release_group_id != None
-            )
+            select(Album.musicbrainz_release_group_id, Album.album_uuid)
+            .where(Album.musicbrainz_release_group_id.in_(rg_ids))
         )
-        albums = result.scalars().all()
-
-        for index, album in enumerate(albums, start=1):
-            logger.info(f"Gathering images for album number {index} of {len(albums)}")
-            await self.fetch_album_image(album, cover_art_archive)
-
-        await self.db.commit()
-
-        release_result = await self.db.execute(
-            select(AlbumRelease).where(
-                AlbumRelease.image_url == None,
-                AlbumRelease.musicbrainz_release_id != None
-            )
+        albums: dict[str, UUID] = {}
+        for rg_id, album_uuid in result.all():
+            albums.setdefault(rg_id, album_uuid)
+
+        new_albums = []
+        for rg in release_groups:
+            if rg["id"] in albums:
+                continue
+            albums[rg["id"]] = uuid4()
+            new_albums.append({
+                "album_uuid": albums[rg["id"]],
+                "title": rg["title"],
+                "musicbrainz_release_group_id": rg["id"],
+                "release_date": parse_date(rg.get("first-release-date")),
+                "quality": "normal",
+            })
+        await self._insert_rows(Album, new_albums)
+        await self._insert_rows(
+            AlbumArtistBridge,
+            [{"album_uuid": album_uuid, "artist_uuid": artist_uuid} for album_uuid in set(albums.values())],
+            ignore_conflicts=True,
         )
-        album_releases = release_result.scalars().all()
 
-        for index, release in enumerate(album_releases, start=1):
-            logger.info(f"Gathering images for album release number {index} of {len(album_releases)}")
-            await self.fetch_album_release_image(release, cover_art_archive)
+        tag_uuids = await entity_cache.tag_uuids({t["name"] for rg in release_groups for t in rg.get("tags", [])})
+        genre_uuids = await entity_cache.genre_uuids({g["name"] for rg in release_groups for g in rg.get("genres", [])})
+        album_tags, album_genres = {}, {}
+        for rg in release_groups:
+            album_uuid = albums[rg["id"]]
+            for tag in rg.get("tags", []):
+                if tag["name"] in tag_uuids:
+                    album_tags[(album_uuid, tag_uuids[tag["name"]])] = tag.get("count", 0)
+            for genre in rg.get("genres", []):
+                if genre["name"] in genre_uuids:
+                    album_genres[(album_uuid, genre_uuids[genre["name"]])] = genre.get("count", 0)
+        await self._insert_rows(
+            AlbumTagBridge,
+            [{"album_uuid": a, "tag_uuid": t, "count": c} for (a, t), c in album_tags.items()],
+            ignore_conflicts=True,
+        )
+        await self._insert_rows(
+            AlbumGenreBridge,
+            [{"album_uuid": a, "genre_uuid": g, "count": c} for (a, g), c in album_genres.items()],
+            ignore_conflicts=True,
+        )
+        return albums
 
-        await self.db.commit()
+    async def sync_artist_discography(self, artist: Artist) -> int:
+        """
+        Store every release group of an artist (browsed 100 at a time, with
+        tags and genres) and mark the artist as synced. Does not commit.
+        """
+        release_groups = await self.api.browse_artist_release_groups(artist.musicbrainz_artist_id)
+        albums = await self.store_release_groups(artist.artist_uuid, release_groups)
+        artist.release_groups_synced_at = datetime.now(timezone.utc)
+        logger.info(f"🎼 Synced {len(albums)} release groups for {artist.name}")
+        return len(albums)
 
     async def get_or_create_artist_by_mbid(
             self,
             musicbrainz_artist_id: str,
             preload_release_groups: bool = True,
             cache: Optional[dict] = None,
+            shallow: bool = False,
     ) -> Artist:
         """
         Get or create an Artist by MusicBrainz MBID.
         If missing, fetch from MusicBrainz API and persist.
-        Optionally preload all release groups (albums).
+        Optionally preload all release groups (albums). With `shallow`, only
+        the release groups embedded in the artist lookup are staged as bare
+        albums; the full discography is synced when the artist page is opened.
         """
 
         # Step 1. cache
@@ -1289,52 +1196,23 @@ class MusicBrainzService:
 
         # Step 3. fetch from MusicBrainz
         data = await self.api.get_artist(
-            musicbrainz_artist_id, include_release_groups=preload_release_groups
+            musicbrainz_artist_id, include_release_groups=preload_release_groups and shallow
         )
         if not data:
             raise ValueError(f"❌ Could not fetch artist {musicbrainz_artist_id} from MusicBrainz")
 
-        # Step 4. try safe insert
-        stmt = (
-            insert(Artist)
-            .values(
-                artist_uuid=uuid4(),
-                name=data.get("name"),
-                musicbrainz_artist_id=musicbrainz_artist_id,
-                profile=data.get("disambiguation"),
-            )
-            .on_conflict_do_nothing(
-                index_elements=["musicbrainz_artist_id"]
-            )
-            .returning(Artist)
-        )
-        result = await self.db.execute(stmt)
-        artist = result.scalar_one_or_none()
-
-        # Step 5. if conflict -> fetch existing
-        if not artist:
-            result = await self.db.execute(
-                select(Artist).where(Artist.musicbrainz_artist_id == musicbrainz_artist_id)
-            )
-            artist = result.scalar_one()
-
-        # Step 6. preload release groups if requested
-        if preload_release_groups:
-            for rg in data.get("release-groups", []):
-                album = await self.get_or_create_album_from_release_group_simple(rg)
-                result = await self.db.execute(
-                    select(AlbumArtistBridge).where(
-                        AlbumArtistBridge.album_uuid == album.album_uuid,
-                        AlbumArtistBridge.artist_uuid == artist.artist_uuid,
-                    )
-                )
-                if not result.scalar_one_or_none():
-                    self.db.add(
-                        AlbumArtistBridge(
-                            album_uuid=album.album_uuid,
-                            artist_uuid=artist.artist_uuid,
-                        )
-                    )
+        # Step 4. safe insert (committed by the entity cache, race-safe on the MBID)
+        credit = (musicbrainz_artist_id, data.get("name"))
+        artist_uuids = await entity_cache.artist_uuids([credit])
+        artist = await self.db.get(Artist, artist_uuids[credit])
+        if not artist.profile:
+            artist.profile = data.get("disambiguation")
+
+        # Step 5. preload release groups if requested
+        if preload_release_groups and shallow:
+            await self.store_release_groups(artist.artist_uuid, data.get("release-groups", []))
+        elif preload_release_groups:
+            await self.sync_artist_discography(artist)
 
         if cache is not None:
             cache[musicbrainz_artist_id] = artist
@@ -0,0 +1,488 @@
+# services/tag_reader.py
+"""Minimal tag reader for the library scan hot path.
+
+The scanner only needs artist/album/title, MusicBrainz ids, track/disc
+numbers, duration and bit depth / sample rate. For FLAC and MP3 this module
+reads just the metadata headers (FLAC STREAMINFO + VORBIS_COMMENT, ID3v2
+frames + the first MPEG frame) and seeks past everything else, e.g.
+embedded pictures. Other formats, and files the fast path cannot handle,
+fall back to mutagen.
+
+read_picture() is the counterpart for cover art extraction: it reads only
+the picture (FLAC PICTURE block / ID3 APIC frame), preferring the front cover.
+"""
+
+import base64
+import logging
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import BinaryIO, Optional
+
+from mutagen import File as MutagenFile
+
+logger = logging.getLogger(__name__)
+
+READ_BUFFER = 16 * 1024
+MPEG_SYNC_WINDOW = 64 * 1024
+
+
+@dataclass
+class AudioInfo:
+    length: Optional[float] = None  # seconds
+    sample_rate: Optional[int] = None
+    bits_per_sample: Optional[int] = None
+    bitrate: Optional[int] = None  # bits per second
+
+
+@dataclass
+class AudioTags:
+    """Mutagen-like result: lower-cased tag names mapped to lists of values."""
+    tags: dict[str, list[str]] = field(default_factory=dict)
+    info: AudioInfo = field(default_factory=AudioInfo)
+
+
+class _Unsupported(Exception):
+    """Raised when the fast path cannot parse a file; mutagen takes over."""
+
+
+def read_tags(path: str) -> Optional[AudioTags]:
+    """Read the tags the scanner needs, using the fast path when possible."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".flac":
+            with open(path, "rb", buffering=READ_BUFFER) as f:
+                return _read_flac(f)
+        if ext == ".mp3":
+            with open(path, "rb", buffering=READ_BUFFER) as f:
+                return _read_mp3(f, os.fstat(f.fileno()).st_size)
+    except _Unsupported as e:
+        logger.debug(f"Fast tag reader fell back to mutagen for {path}: {e}")
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        logger.debug(f"Fast tag reader failed for {path}, falling back to mutagen: {e}")
+
+    return _read_with_mutagen(path)
+
+
+def _read_with_mutagen(path: str) -> Optional[AudioTags]:
+    meta = MutagenFile(path, easy=True)
+    if not meta:
+        return None
+
+    tags = {}
+    if meta.tags:
+        tags = {k.lower(): [str(v) for v in values] for k, values in meta.tags.items()}
+
+    info = getattr(meta, "info", None)
+    return AudioTags(
+        tags=tags,
+        info=AudioInfo(
+            length=getattr(info, "length", None),
+            sample_rate=getattr(info, "sample_rate", None),
+            bits_per_sample=getattr(info, "bits_per_sample", None),
+            bitrate=getattr(info, "bitrate", None),
+        ),
+    )
+
+
+def read_picture(path: str) -> Optional[bytes]:
+    """Return the embedded cover image (front cover if there is one), or None."""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext == ".flac":
+            with open(path, "rb", buffering=READ_BUFFER) as f:
+                return _read_flac_picture(f)
+        if ext == ".mp3":
+            with open(path, "rb", buffering=READ_BUFFER) as f:
+                return _read_id3_picture(f)
+    except _Unsupported as e:
+        logger.debug(f"Fast picture reader fell back to mutagen for {path}: {e}")
+    except (struct.error, ValueError) as e:
+        logger.debug(f"Fast picture reader failed for {path}, falling back to mutagen: {e}")
+
+    return _read_picture_with_mutagen(path)
+
+
+def _read_picture_with_mutagen(path: str) -> Optional[bytes]:
+    meta = MutagenFile(path)
+    if not meta or not meta.tags:
+        return None
+
+    pictures = getattr(meta, "pictures", None)  # FLAC
+    if pictures:
+        return _pick_front_cover([(p.type, p.data) for p in pictures])
+
+    tags = meta.tags
+    if "covr" in tags and tags["covr"]:  # MP4
+        return bytes(tags["covr"][0])
+    if hasattr(tags, "getall"):  # ID3
+        apics = tags.getall("APIC")
+        if apics:
+            return _pick_front_cover([(a.type, a.data) for a in apics])
+    blocks = tags.get("metadata_block_picture") if hasattr(tags, "get") else None
+    if blocks:  # Ogg Vorbis/Opus
+        from mutagen.flac import Picture
+        pictures = [Picture(base64.b64decode(b)) for b in blocks]
+        return _pick_front_cover([(p.type, p.data) for p in pictures])
+    return None
+
+
+PICTURE_FRONT_COVER = 3
+
+
+def _pick_front_cover(pictures: list[tuple[int, bytes]]) -> Optional[bytes]:
+    for picture_type, data in pictures:
+        if picture_type == PICTURE_FRONT_COVER and data:
+            return data
+    return next((data for _, data in pictures if data), None)
+
+
+# --- FLAC -------------------------------------------------------------------
+
+FLAC_STREAMINFO = 0
+FLAC_VORBIS_COMMENT = 4
+FLAC_PICTURE = 6
+
+
+def _seek_flac_blocks(f: BinaryIO):
+    """Position `f` on the first metadata block header."""
+    header = f.read(10)
+    if header[:3] == b"ID3":
+        # ID3v2 in front of a FLAC stream is non-standard but exists in the wild
+        f.seek(10 + _syncsafe(header[6:10]))
+        header = f.read(4)
+    if header[:4] != b"fLaC":
+        raise _Unsupported("missing fLaC marker")
+    f.seek(-len(header) + 4, os.SEEK_CUR)
+
+
+def _read_flac(f: BinaryIO) -> AudioTags:
+    _seek_flac_blocks(f)
+
+    result = AudioTags()
+    have_info = have_comments = False
+    while not (have_info and have_comments):
+        block_header = f.read(4)
+        if len(block_header) < 4:
+            break
+        is_last = block_header[0] & 0x80
+        block_type = block_header[0] & 0x7F
+        length = int.from_bytes(block_header[1:4], "big")
+
+        if block_type == FLAC_STREAMINFO:
+            _parse_streaminfo(f.read(length), result.info)
+            have_info = True
+        elif block_type == FLAC_VORBIS_COMMENT:
+            result.tags = _parse_vorbis_comment(f.read(length))
+            have_comments = True
+        else:
+            # PICTURE, SEEKTABLE, PADDING, ... are never read
+            f.seek(length, os.SEEK_CUR)
+
+        if is_last:
+            break
+
+    if not have_info:
+        raise _Unsupported("no STREAMINFO block")
+    return result
+
+
+def _read_flac_picture(f: BinaryIO) -> Optional[bytes]:
+    _seek_flac_blocks(f)
+
+    pictures: list[tuple[int, bytes]] = []
+    while True:
+        block_header = f.read(4)
+        if len(block_header) < 4:
+            break
+        is_last = block_header[0] & 0x80
+        block_type = block_header[0] & 0x7F
+        length = int.from_bytes(block_header[1:4], "big")
+
+        if block_type == FLAC_PICTURE:
+            picture_type, data = _parse_flac_picture(f.read(length))
+            if picture_type == PICTURE_FRONT_COVER:
+                return data
+            pictures.append((picture_type, data))
+        else:
+            f.seek(length, os.SEEK_CUR)
+
+        if is_last:
+            break
+    return _pick_front_cover(pictures)
+
+
+def _parse_flac_picture(block: bytes) -> tuple[int, bytes]:
+    picture_type, mime_length = struct.unpack_from(">II", block, 0)
+    offset = 8 + mime_length
+    (description_length,) = struct.unpack_from(">I", block, offset)
+    offset += 4 + description_length + 16  # width, height, depth, colors
+    (data_length,) = struct.unpack_from(">I", block, offset)
+    offset += 4
+    return picture_type, block[offset:offset + data_length]
+
+
+def _parse_streaminfo(data: bytes, info: AudioInfo):
+    if len(data) < 18:
+        raise _Unsupported("short STREAMINFO block")
+    sample_rate = (data[10] << 12) | (data[11] << 4) | (data[12] >> 4)
+    bits_per_sample = (((data[12] & 0x01) << 4) | (data[13] >> 4)) + 1
+    total_samples = ((data[13] & 0x0F) << 32) | int.from_bytes(data[14:18], "big")
+
+    info.sample_rate = sample_rate or None
+    info.bits_per_sample = bits_per_sample
+    if sample_rate and total_samples:
+        info.length = total_samples / sample_rate
+
+
+def _parse_vorbis_comment(data: bytes) -> dict[str, list[str]]:
+    tags: dict[str, list[str]] = {}
+    (vendor_length,) = struct.unpack_from("<I", data, 0)
+    offset = 4 + vendor_length
+    (count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    for _ in range(count):
+        (length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        comment = data[offset:offset + length].decode("utf-8", errors="replace")
+        offset += length
+        key, sep, value = comment.partition("=")
+        if sep:
+            tags.setdefault(key.lower(), []).append(value)
+    return tags
+
+
+# --- MP3 --------------------------------------------------------------------
+
+ID3_TEXT_FRAMES = {
+    "TPE1": "artist",
+    "TPE2": "albumartist",
+    "TALB": "album",
+    "TIT2": "title",
+    "TRCK": "tracknumber",
+    "TPOS": "discnumber",
+}
+ID3_TXXX_FRAMES = {
+    "musicbrainz album id": "musicbrainz_albumid",
+    "musicbrainz artist id": "musicbrainz_artistid",
+    "musicbrainz release group id": "musicbrainz_releasegroupid",
+    "musicbrainz release track id": "musicbrainz_releasetrackid",
+}
+ID3_WANTED = set(ID3_TEXT_FRAMES) | {"TXXX", "UFID", "TLEN"}
+ID3_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+MPEG_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1 layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2/2.5 layer III
+}
+MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _split_id3_text(raw: bytes, wide: bool) -> list[bytes]:
+    """Split on NUL terminators; UTF-16 terminators are two bytes on an even offset."""
+    if not wide:
+        return raw.split(b"\x00")
+    values, start = [], 0
+    for i in range(0, len(raw) - 1, 2):
+        if raw[i] == 0 and raw[i + 1] == 0:
+            values.append(raw[start:i])
+            start = i + 2
+    values.append(raw[start:])
+    return values
+
+
+def _decode_id3_text(data: bytes) -> list[str]:
+    if not data:
+        return []
+    encoding = ID3_ENCODINGS.get(data[0])
+    if encoding is None:
+        raise _Unsupported(f"unknown ID3 text encoding {data[0]}")
+    # every UTF-16 value carries its own BOM, so values are decoded one by one
+    values = _split_id3_text(data[1:], wide=data[0] in (1, 2))
+    return [text for text in (v.decode(encoding, errors="replace") for v in values) if text]
+
+
+def _read_mp3(f: BinaryIO, file_size: int) -> AudioTags:
+    result = AudioTags()
+
+    header = f.read(10)
+    if header[:3] != b"ID3":
+        # ID3v1/APE-only files would come back without tags; mutagen reads those
+        raise _Unsupported("no ID3v2 header")
+    major, flags = header[3], header[5]
+    if major not in (3, 4):
+        raise _Unsupported(f"ID3v2.{major}")
+    if flags & 0x80 and major == 3:
+        raise _Unsupported("unsynchronised ID3v2.3 tag")
+    tag_size = _syncsafe(header[6:10])
+    audio_start = 10 + tag_size + (10 if flags & 0x10 else 0)
+    result.tags = _read_id3_frames(f, major, flags, tag_size)
+    f.seek(audio_start)
+
+    tlen = result.tags.pop("_tlen", None)
+    _read_mpeg_info(f, audio_start, file_size, result.info)
+    if not result.info.length and tlen:
+        result.info.length = int(tlen[0]) / 1000
+    return result
+
+
+def _frame_payload(data: bytes, major: int, format_flags: int) -> bytes:
+    """Strip per-frame header extras; frames we can't decode go to mutagen."""
+    if major == 4:
+        if format_flags & 0x0E:  # compressed, encrypted or unsynchronised
+            raise _Unsupported(f"ID3 frame format flags {format_flags:#x}")
+        if format_flags & 0x40:  # grouping identity
+            data = data[1:]
+        if format_flags & 0x01:  # data length indicator
+            data = data[4:]
+    else:
+        if format_flags & 0xC0:  # compressed or encrypted
+            raise _Unsupported(f"ID3 frame format flags {format_flags:#x}")
+        if format_flags & 0x20:  # grouping identity
+            data = data[1:]
+    return data
+
+
+def _read_id3_frames(f: BinaryIO, major: int, flags: int, tag_size: int) -> dict[str, list[str]]:
+    tags: dict[str, list[str]] = {}
+    end = 10 + tag_size
+
+    if flags & 0x40:
+        raw = f.read(4)
+        ext_size = _syncsafe(raw) if major == 4 else int.from_bytes(raw, "big") + 4
+        f.seek(10 + ext_size)
+
+    while f.tell() + 10 <= end:
+        frame_header = f.read(10)
+        frame_id = frame_header[:4].decode("latin-1")
+        if not frame_id.strip("\x00"):
+            break  # padding
+        size = _syncsafe(frame_header[4:8]) if major == 4 else int.from_bytes(frame_header[4:8], "big")
+
+        if frame_id not in ID3_WANTED:
+            f.seek(size, os.SEEK_CUR)
+            continue
+
+        data = _frame_payload(f.read(size), major, frame_header[9])
+
+        if frame_id in ID3_TEXT_FRAMES:
+            tags[ID3_TEXT_FRAMES[frame_id]] = _decode_id3_text(data)
+        elif frame_id == "TLEN":
+            tags["_tlen"] = _decode_id3_text(data)
+        elif frame_id == "TXXX":
+            values = _decode_id3_text(data)
+            if len(values) >= 2:
+                name = ID3_TXXX_FRAMES.get(values[0].lower())
+                if name:
+                    tags[name] = values[1:]
+        elif frame_id == "UFID":
+            owner, _, identifier = data.partition(b"\x00")
+            if owner == b"http://musicbrainz.org":
+                tags["musicbrainz_trackid"] = [identifier.decode("ascii", errors="replace")]
+
+    return tags
+
+
+def _read_id3_picture(f: BinaryIO) -> Optional[bytes]:
+    header = f.read(10)
+    if header[:3] != b"ID3":
+        return None
+    major, flags = header[3], header[5]
+    if major not in (3, 4) or (flags & 0x80 and major == 3):
+        raise _Unsupported(f"ID3v2.{major} with flags {flags:#x}")
+    end = 10 + _syncsafe(header[6:10])
+
+    if flags & 0x40:
+        raw = f.read(4)
+        ext_size = _syncsafe(raw) if major == 4 else int.from_bytes(raw, "big") + 4
+        f.seek(10 + ext_size)
+
+    pictures: list[tuple[int, bytes]] = []
+    while f.tell() + 10 <= end:
+        frame_header = f.read(10)
+        frame_id = frame_header[:4]
+        if not frame_id.strip(b"\x00"):
+            break  # padding
+        size = _syncsafe(frame_header[4:8]) if major == 4 else int.from_bytes(frame_header[4:8], "big")
+        if frame_id != b"APIC":
+            f.seek(size, os.SEEK_CUR)
+            continue
+
+        data = _frame_payload(f.read(size), major, frame_header[9])
+
+        picture_type, image = _parse_apic(data)
+        if picture_type == PICTURE_FRONT_COVER:
+            return image
+        pictures.append((picture_type, image))
+    return _pick_front_cover(pictures)
+
+
+def _parse_apic(data: bytes) -> tuple[int, bytes]:
+    encoding = data[0]
+    mime_end = data.index(b"\x00", 1)
+    picture_type = data[mime_end + 1]
+    offset = mime_end + 2
+    # description is null terminated, two null bytes for UTF-16 encodings
+    if encoding in (1, 2):
+        while offset + 1 < len(data) and data[offset:offset + 2] != b"\x00\x00":
+            offset += 2
+        offset += 2
+    else:
+        offset = data.index(b"\x00", offset) + 1
+    return picture_type, data[offset:]
+
+
+def _read_mpeg_info(f: BinaryIO, audio_start: int, file_size: int, info: AudioInfo):
+    window = f.read(MPEG_SYNC_WINDOW)
+    for i in range(len(window) - 4):
+        if window[i] != 0xFF or (window[i + 1] & 0xE0) != 0xE0:
+            continue
+        b1, b2, b3 = window[i + 1], window[i + 2], window[i + 3]
+        version = (b1 >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        layer = (b1 >> 1) & 0x03  # 1 = layer III
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 0x03
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        break
+    else:
+        raise _Unsupported("no MPEG layer III frame found")
+
+    mpeg1 = version == 3
+    mono = (b3 >> 6) == 3
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    bitrate = MPEG_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    samples_per_frame = 1152 if mpeg1 else 576
+    info.sample_rate = sample_rate
+    info.bitrate = bitrate
+
+    # Xing/Info header right after the side information
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    xing = i + 4 + side_info
+    frames = audio_bytes = None
+    if window[xing:xing + 4] in (b"Xing", b"Info"):
+        (xing_flags,) = struct.unpack_from(">I", window, xing + 4)
+        offset = xing + 8
+        if xing_flags & 0x01:
+            (frames,) = struct.unpack_from(">I", window, offset)
+            offset += 4
+        if xing_flags & 0x02:
+            (audio_bytes,) = struct.unpack_from(">I", window, offset)
+    elif window[i + 36:i + 40] == b"VBRI":
+        audio_bytes, frames = struct.unpack_from(">II", window, i + 36 + 10)
+
+    if frames:
+        info.length = frames * samples_per_frame / sample_rate
+        if audio_bytes and info.length:
+            info.bitrate = int(audio_bytes * 8 / info.length)
+    elif bitrate:
+        # constant bitrate: estimate from the audio payload size
+        info.length = (file_size - audio_start - i) * 8 / bitrate
@@ -0,0 +1,186 @@
+# services/track_matcher.py
+"""
+Release-level matching of audio files to the tracks of a MusicBrainz release.
+
+All files of an album directory are scored against all release tracks in one
+rapidfuzz cdist call. Duration and track number adjust the title score, and
+a globally optimal one-to-one assignment (Hungarian algorithm) is solved, so
+two files can never claim the same track.
+"""
+
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Optional, TypeVar
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.optimize import linear_sum_assignment
+
+MATCH_THRESHOLD = 90  # combined score needed to accept an assignment
+MIN_TITLE_SCORE = 70  # duration and track number can lift a title, not replace it
+DURATION_CLOSE_MS = 2000
+DURATION_NEAR_MS = 5000
+DURATION_FAR_MS = 30000
+TITLE_CACHE_RELEASES = 512
+
+T = TypeVar("T")
+
+
+@dataclass
+class FileCandidate:
+    title: str
+    duration_ms: Optional[int] = None
+    track_number: Optional[int] = None
+    mb_trackid: Optional[str] = None
+
+
+@dataclass
+class ReleaseTrack(Generic[T]):
+    item: T  # what the caller wants back, e.g. the TrackVersion
+    title: str
+    duration_ms: Optional[int] = None
+    track_number: Optional[int] = None
+    recording_id: Optional[str] = None
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize track/album titles for robust matching.
+    - Lowercase
+    - Strip whitespace
+    - Collapse multiple spaces
+    - Remove diacritics
+    - Standardize apostrophes/quotes
+    - Remove punctuation in parentheses like (skit), (intro)
+    - Replace separators (/,&,+,-,–,—,.,,) with spaces
+    - Remove other non-alphanumeric except spaces
+    """
+    if not title:
+        return ""
+
+    # Unicode normalize + strip diacritics
+    s = unicodedata.normalize("NFKD", title)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+
+    # Lowercase
+    s = s.lower()
+
+    # Standardize apostrophes/quotes
+    s = (
+        s.replace("’", "'")
+         .replace("‘", "'")
+         .replace("“", '"')
+         .replace("”", '"')
+    )
+
+    # Remove parentheticals (skit), (intro), etc.
+    s = re.sub(r"\([^)]*\)", "", s)
+
+    # Replace common separators with space
+    s = re.sub(r"[\/&\+\-\–\—,:;]", " ", s)
+
+    # Remove other non-alphanumeric (keep spaces)
+    s = re.sub(r"[^a-z0-9\s]", "", s)
+
+    # Collapse spaces
+    s = re.sub(r"\s+", " ", s).strip()
+
+    return s
+
+
+def parse_track_number(value) -> Optional[int]:
+    """'3', '03', '3/12' -> 3; vinyl sides ('A1') and garbage -> None."""
+    if value is None:
+        return None
+    match = re.match(r"\s*(\d+)", str(value))
+    return int(match.group(1)) if match else None
+
+
+def _adjustments(files: list[FileCandidate], tracks: list[ReleaseTrack]) -> np.ndarray:
+    """Duration and track number bonus/penalty for every (file, track) pair."""
+    file_durations = np.array([f.duration_ms or np.nan for f in files], dtype=np.float64)
+    track_durations = np.array([t.duration_ms or np.nan for t in tracks], dtype=np.float64)
+    diff = np.abs(file_durations[:, None] - track_durations[None, :])  # NaN when unknown: no adjustment
+    adjust = np.select(
+        [diff <= DURATION_CLOSE_MS, diff <= DURATION_NEAR_MS, diff > DURATION_FAR_MS],
+        [10.0, 5.0, -10.0],
+        default=0.0,
+    )
+    file_numbers = np.array([f.track_number if f.track_number is not None else -1 for f in files])
+    track_numbers = np.array([t.track_number if t.track_number is not None else -2 for t in tracks])
+    adjust += 5.0 * (file_numbers[:, None] == track_numbers[None, :])
+    return adjust
+
+
+class TrackMatcher:
+    """Matches files to release tracks; keeps normalized release titles in a small LRU."""
+
+    def __init__(self, cache_size: int = TITLE_CACHE_RELEASES):
+        self.cache_size = cache_size
+        # release key -> raw title -> normalized title; keyed by title, not position,
+        # so a release whose tracks come back in another order still lines up
+        self._titles: OrderedDict[str, dict[str, str]] = OrderedDict()
+
+    def _release_titles(self, release_key: Optional[str], tracks: list[ReleaseTrack]) -> list[str]:
+        if release_key is None:
+            return [normalize_title(t.title) for t in tracks]
+        titles = self._titles.get(release_key)
+        if titles is None:
+            titles = self._titles[release_key] = {}
+            while len(self._titles) > self.cache_size:
+                self._titles.popitem(last=False)
+        else:
+            self._titles.move_to_end(release_key)
+        for t in tracks:
+            if t.title not in titles:
+                titles[t.title] = normalize_title(t.title)
+        return [titles[t.title] for t in tracks]
+
+    def match(
+            self,
+            files: list[FileCandidate],
+            tracks: list[ReleaseTrack[T]],
+            release_key: Optional[str] = None,
+    ) -> list[Optional[T]]:
+        """For every file the matched track's item, or None. Each track is used at most once."""
+        matched: list[Optional[T]] = [None] * len(files)
+        if not files or not tracks:
+            return matched
+
+        # 1. MusicBrainz recording ids are authoritative
+        by_recording = {t.recording_id: i for i, t in enumerate(tracks) if t.recording_id}
+        taken: set[int] = set()
+        for i, f in enumerate(files):
+            j = by_recording.get(f.mb_trackid) if f.mb_trackid else None
+            if j is not None and j not in taken:
+                matched[i] = tracks[j].item
+                taken.add(j)
+
+        open_files = [i for i in range(len(files)) if matched[i] is None]
+        open_tracks = [j for j in range(len(tracks)) if j not in taken]
+        if not open_files or not open_tracks:
+            return matched
+
+        # 2. Score every remaining file against every remaining track in one call
+        release_titles = self._release_titles(release_key, tracks)
+        file_titles = [normalize_title(files[i].title) for i in open_files]
+        title_scores = process.cdist(
+            file_titles, [release_titles[j] for j in open_tracks], scorer=fuzz.ratio, dtype=np.float32
+        )
+
+        scores = title_scores + _adjustments(
+            [files[i] for i in open_files], [tracks[j] for j in open_tracks]
+        )
+
+        # 3. Globally optimal one-to-one assignment
+        rows, cols = linear_sum_assignment(scores, maximize=True)
+        for r, c in zip(rows, cols):
+            if scores[r, c] >= MATCH_THRESHOLD and title_scores[r, c] >= MIN_TITLE_SCORE:
+                matched[open_files[r]] = tracks[open_tracks[c]].item
+        return matched
+
+
+# Singleton instance
+track_matcher = TrackMatcher()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from services.musicbrainz_dump_service import (  # noqa: E402
+    ReleaseFilter,
+    discogs_links,
+    iter_releases,
+    open_dump_lines,
+    release_resolutions,
+)
+
+SAMPLE = Path(__file__).parent / "fixtures" / "musicbrainz_release_sample.jsonl"
+
+BOOKENDS_US = "0a1b2c3d-0000-4000-8000-000000000001"
+BOOKENDS_GB = "0a1b2c3d-0000-4000-8000-000000000002"
+BBC_BOOTLEG = "0a1b2c3d-0000-4000-8000-000000000003"
+SAW_85_92 = "0a1b2c3d-0000-4000-8000-000000000004"
+GARFUNKEL = "4f6ab8bb-6e76-4d6d-9a31-5e8bc7b06a80"
+
+
+@pytest.fixture
+def releases():
+    stats = {}
+    parsed = list(iter_releases(open_dump_lines(str(SAMPLE)), stats))
+    assert stats == {"lines": 6, "bad_lines": 1}
+    return parsed
+
+
+def test_parse_keeps_full_credit_and_skips_tracks_without_recording(releases):
+    bookends = releases[0]
+
+    assert [r.release_id for r in releases] == [BOOKENDS_US, BOOKENDS_GB, BBC_BOOTLEG, SAW_85_92]
+    assert bookends.artist_credit_name == "Simon & Garfunkel"
+    assert [name for _, name in bookends.artists] == ["Simon", "Garfunkel"]
+    assert [t["title"] for t in bookends.media_tracks] == ["Mrs. Robinson"]
+    assert bookends.recordings[0]["tags"] == [{"name": "folk rock", "count": 3}]
+
+
+def test_release_filter(releases):
+    def matching(release_filter):
+        return [r.release_id for r in releases if release_filter.matches(r)]
+
+    assert matching(ReleaseFilter()) == []
+    assert matching(ReleaseFilter(discogs_ids={7654321})) == [BOOKENDS_GB]
+    assert matching(ReleaseFilter(artist_mbids={GARFUNKEL})) == [BOOKENDS_US, BOOKENDS_GB, BBC_BOOTLEG]
+    assert len(matching(ReleaseFilter(import_all=True))) == 4
+
+
+def test_discogs_links(releases):
+    assert discogs_links(releases) == {(1234567, BOOKENDS_US), (7654321, BOOKENDS_GB)}
+
+
+def test_release_resolutions_use_the_scan_key(releases):
+    # the scan keys on normalize(artist tag), normalize(album tag); the artist
+    # tag holds the whole credit, not its first artist
+    assert release_resolutions(releases) == {
+        ("simon & garfunkel", "bookends"): BOOKENDS_US,  # first official release wins, bootleg skipped
+        ("aphex twin", "selected ambient works 85-92"): SAW_85_92,
+    }
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("mutagen")
+
+from services import tag_reader  # noqa: E402
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, no padding: 417 bytes per frame
+MPEG_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def _id3v1(title: str, artist: str, album: str, year: str = "1999") -> bytes:
+    def field(value: str, size: int) -> bytes:
+        return value.encode("latin-1").ljust(size, b"\x00")
+
+    return b"TAG" + field(title, 30) + field(artist, 30) + field(album, 30) + field(year, 4) + field("", 30) + b"\xff"
+
+
+@pytest.fixture
+def id3v1_only_mp3(tmp_path):
+    path = tmp_path / "v1.mp3"
+    path.write_bytes(MPEG_FRAME * 20 + _id3v1("Windowlicker", "Aphex Twin", "Windowlicker"))
+    return str(path)
+
+
+def test_fast_path_refuses_mp3_without_id3v2_header(id3v1_only_mp3):
+    with open(id3v1_only_mp3, "rb") as f:
+        with pytest.raises(tag_reader._Unsupported):
+            tag_reader._read_mp3(f, 0)
+
+
+def test_id3v1_only_mp3_falls_back_to_mutagen(id3v1_only_mp3):
+    result = tag_reader.read_tags(id3v1_only_mp3)
+
+    assert result is not None
+    assert result.tags["title"] == ["Windowlicker"]
+    assert result.tags["artist"] == ["Aphex Twin"]
+    assert result.tags["album"] == ["Windowlicker"]
@@ -3,6 +3,7 @@ import { TableRow, TableCell, Avatar, Typography, IconButton, Box } from "@mui/m
 import { useInView } from "react-intersection-observer";
 import { useNavigate } from "react-router-dom";
 import apiClient from "../utils/apiClient";
+import { albumThumbnailUrl, fallBackTo } from "../utils/albumArt";
 import AlbumIcon from "@mui/icons-material/Album";       // vinyl record
 import ComputerIcon from "@mui/icons-material/Computer"; // digital
 import MusicNoteIcon from "@mui/icons-material/MusicNote"; // alt digital
@@ -64,7 +65,8 @@ const AlbumCard = ({ albumRelease }) => {
         {inView && (
           <Avatar
             variant="square"
-            src={image_thumbnail_url}
+            src={albumThumbnailUrl(album_uuid, image_thumbnail_url)}
+            imgProps={{ onError: fallBackTo(image_thumbnail_url) }}
             alt={title}
             sx={{ width: 56, height: 56 }}
           />
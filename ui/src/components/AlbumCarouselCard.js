@@ -11,6 +11,7 @@ import {
 import { useNavigate } from "react-router-dom";
 import PlayArrowIcon from "@mui/icons-material/PlayArrow";
 import apiClient from "../utils/apiClient";
+import { albumThumbnailUrl, fallBackTo } from "../utils/albumArt";
 
 const CARD_WIDTH = 140;
 const CARD_HEIGHT = 200;
@@ -49,9 +50,10 @@ const AlbumCarouselCard = ({ album }) => {
         <CardMedia
           component="img"
           image={
-            image_thumbnail_url ||
+            albumThumbnailUrl(album_uuid, image_thumbnail_url) ||
             "https://via.placeholder.com/140?text=No+Cover"
           }
+          onError={fallBackTo(image_thumbnail_url)}
           alt={title}
           sx={{
             width: "100%",
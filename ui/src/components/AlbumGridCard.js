@@ -11,6 +11,7 @@ import { useNavigate } from "react-router-dom";
 import PlayArrowIcon from "@mui/icons-material/PlayArrow";
 import QueueMusicIcon from "@mui/icons-material/QueueMusic";
 import apiClient from "../utils/apiClient";
+import { albumThumbnailUrl, fallBackTo } from "../utils/albumArt";
 
 const AlbumGridCard = ({ albumRelease }) => {
   const {
@@ -56,7 +57,8 @@ const AlbumGridCard = ({ albumRelease }) => {
         <CardMedia
           component="img"
           height="150"
-          image={image_thumbnail_url}
+          image={albumThumbnailUrl(album_uuid, image_thumbnail_url)}
+          onError={fallBackTo(image_thumbnail_url)}
           alt={title}
           loading="lazy"
         />
@@ -0,0 +1,13 @@
+const apiUrl = process.env.REACT_APP_API_URL;
+
+// Album art through the API's resize cache (GET /images/{album_uuid}), so grids
+// load 250px thumbnails from our origin instead of hitting the Cover Art Archive.
+export const albumThumbnailUrl = (album_uuid, image_url, size = 250) =>
+  album_uuid && image_url ? `${apiUrl}/images/${album_uuid}?size=${size}` : image_url;
+
+// Falls back to the stored url once when the proxy has nothing for the album.
+export const fallBackTo = (image_url) => (e) => {
+  if (image_url && e.currentTarget.src !== image_url) {
+    e.currentTarget.src = image_url;
+  }
+};